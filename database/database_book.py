@@ -2,6 +2,7 @@ import os
 import logging
 from typing import List, TYPE_CHECKING
 import ommr4all.settings as settings
+from database.database_meta_cache import meta_cache
 import shutil
 import re
 
@@ -30,7 +31,10 @@ class FileExistsException(Exception):
 class DatabaseBook:
     @staticmethod
     def list_available() -> List['DatabaseBook']:
-        return [DatabaseBook(name) for name in os.listdir(settings.PRIVATE_MEDIA_ROOT) if DatabaseBook(name, skip_validation=True).is_valid()]
+        def load():
+            return [name for name in os.listdir(settings.PRIVATE_MEDIA_ROOT) if DatabaseBook(name, skip_validation=True).is_valid()]
+
+        return [DatabaseBook(name) for name in meta_cache.get(settings.PRIVATE_MEDIA_ROOT, load)]
 
     @staticmethod
     def list_available_of_style(notation_style: str) -> List['DatabaseBook']:
@@ -64,22 +68,29 @@ class DatabaseBook:
     def __eq__(self, other):
         return isinstance(other, DatabaseBook) and other.book == self.book
 
+    def __hash__(self):
+        return hash(self.book)
+
+    def __repr__(self):
+        return 'DatabaseBook({!r})'.format(self.book)
+
     def pages(self) -> List['DatabasePage']:
         assert(self.is_valid())
         from database.database_page import DatabasePage
 
-        pages = [DatabasePage(self, p) for p in sorted(os.listdir(self.local_path('pages')))]
-        return [p for p in pages if p.is_valid()]
+        def load():
+            pages = [DatabasePage(self, p) for p in sorted(os.listdir(self.local_path('pages')))]
+            return [p.page for p in pages if p.is_valid()]
+
+        return [DatabasePage(self, p) for p in meta_cache.get(self.local_path('pages'), load)]
 
     def pages_with_lock(self, locks: List['LockState']) -> List['DatabasePage']:
         from database.file_formats.performance.pageprogress import Locks
-        out = []
-        for p in self.pages():
-            pp = p.page_progress()
-            if all([pp.locked.get(Locks(lock.label), False) == lock.lock for lock in locks]):
-                out.append(p)
-
-        return out
+        from database.database_book_page_states import DatabaseBookPageStates
+        pages = self.pages()
+        states = DatabaseBookPageStates(self).page_states(pages)
+        return [p for p in pages
+                if all([states[p.page].locked.get(Locks(lock.label).value, False) == lock.lock for lock in locks])]
 
     def page(self, page):
         from database.database_page import DatabasePage
@@ -127,12 +138,15 @@ class DatabaseBook:
 
         os.mkdir(self.local_path())
         os.mkdir(self.local_path('pages'))
+        meta_cache.invalidate(settings.PRIVATE_MEDIA_ROOT)
         book_meta.to_file(self)
         return True
 
     def delete(self):
         if os.path.exists(self.local_path()):
             shutil.rmtree(self.local_path())
+        meta_cache.invalidate(settings.PRIVATE_MEDIA_ROOT)
+        meta_cache.invalidate_tree(self.local_path())
 
     def get_meta(self):
         from database.database_book_meta import DatabaseBookMeta
@@ -2,6 +2,8 @@ from dataclasses import dataclass, field
 from database.database_book import DatabaseBook
 import os
 from database.database_internal import DEFAULT_MODELS
+from database.database_meta_cache import meta_cache
+from copy import deepcopy
 from datetime import datetime
 from mashumaro import DataClassJSONMixin
 from typing import Optional, Dict
@@ -43,13 +45,16 @@ class DatabaseBookMeta(DataClassJSONMixin):
     @staticmethod
     def load(book: DatabaseBook):
         path = book.local_path('book_meta.json')
-        try:
-            with open(path) as f:
-                d = DatabaseBookMeta.from_book_json(book, f.read())
-        except FileNotFoundError:
-            d = DatabaseBookMeta(id=book.book, name=book.book)
 
-        return d
+        def load():
+            try:
+                with open(path) as f:
+                    return DatabaseBookMeta.from_book_json(book, f.read())
+            except FileNotFoundError:
+                return DatabaseBookMeta(id=book.book, name=book.book)
+
+        # the cached meta is shared
+        return deepcopy(meta_cache.get(path, load))
 
     @staticmethod
     def from_book_json(book: DatabaseBook, json: str):
@@ -71,6 +76,7 @@ class DatabaseBookMeta(DataClassJSONMixin):
         s = self.to_json(indent=2)
         with open(book.local_path('book_meta.json'), 'w') as f:
             f.write(s)
+        meta_cache.invalidate(book.local_path('book_meta.json'))
 
 
 if __name__ == '__main__':
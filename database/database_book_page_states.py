@@ -0,0 +1,169 @@
+from copy import copy
+from dataclasses import dataclass, field
+from typing import Dict, Optional, List, Tuple, TYPE_CHECKING
+from mashumaro import DataClassDictMixin
+import logging
+import json
+import os
+
+from database.database_book import DatabaseBook
+from database.database_meta_cache import meta_cache
+from shared.filelock import file_lock, atomic_write
+
+if TYPE_CHECKING:
+    from database.database_page import DatabasePage
+    from database.file_formats.performance.pageprogress import PageProgress
+
+logger = logging.getLogger(__name__)
+
+# index of the processing states of all pages, within the directory of the book
+PAGE_STATES_FILE = 'page_states.json'
+# entries of another version are recomputed, increase if the summary of the pcgts changes
+PAGE_STATE_VERSION = 1
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+@dataclass
+class PageState(DataClassDictMixin):
+    # summary of the pcgts and page progress of a page, valid as long as the modification times of the files match
+    version: int = 0
+    pcgts_mtime_ns: Optional[int] = None
+    page_progress_mtime_ns: Optional[int] = None
+    n_music_blocks: int = 0
+    n_text_blocks: int = 0
+    n_staves: int = 0
+    n_staff_lines: int = 0
+    n_symbols: int = 0
+    n_note_components: int = 0
+    n_clefs: int = 0
+    n_accids: int = 0
+    n_connections: int = 0
+    verified: bool = False
+    locked: Dict[str, bool] = field(default_factory=dict)
+
+    def update_pcgts(self, pcgts: Optional[dict]):
+        # counted on the json to skip the parsing of the page
+        from database.file_formats.pcgts.page.block import BlockType
+        page = pcgts.get('page', {}) if pcgts else {}
+        blocks = page.get('blocks', [])
+        music_blocks = [b for b in blocks if b.get('type', BlockType.MUSIC.value) == BlockType.MUSIC.value]
+        self.n_music_blocks = len(music_blocks)
+        self.n_text_blocks = len(blocks) - len(music_blocks)
+        music_lines = [l for b in music_blocks for l in b.get('lines', [])]
+        symbol_types = [s.get('type') for l in music_lines for s in l.get('symbols', [])]
+        self.n_staves = len(music_lines)
+        self.n_staff_lines = sum(len(l.get('staffLines', [])) for l in music_lines)
+        self.n_symbols = len(symbol_types)
+        self.n_note_components = symbol_types.count('note')
+        self.n_clefs = symbol_types.count('clef')
+        self.n_accids = symbol_types.count('accid')
+        self.n_connections = len(page.get('annotations', {}).get('connections', []))
+
+    def update_page_progress(self, page_progress: 'PageProgress'):
+        self.verified = page_progress.verified
+        self.locked = {lock.value: value for lock, value in page_progress.locked.items()}
+
+
+class DatabaseBookPageStates:
+    """
+    Index of the processing states of the pages of a book (e.g. whether a page has music blocks or is verified),
+    so that the selection of the unprocessed pages of an algorithm does not load the pcgts of every page.
+
+    The index is updated by the writers of the pcgts and page progress files, entries of files that were modified
+    otherwise are recomputed when accessed.
+    """
+    def __init__(self, book: DatabaseBook):
+        self.book = book
+        self.path = book.local_path(PAGE_STATES_FILE)
+
+    @staticmethod
+    def _mtimes(page: 'DatabasePage') -> Tuple[Optional[int], Optional[int]]:
+        return _mtime_ns(page.file('pcgts').local_path()), _mtime_ns(page.file('page_progress').local_path())
+
+    def _load(self) -> Dict[str, PageState]:
+        def load():
+            try:
+                with open(self.path) as f:
+                    return {name: PageState.from_dict(d) for name, d in json.load(f).items()}
+            except FileNotFoundError:
+                return {}
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning('Invalid page states at {}: {}'.format(self.path, e))
+                return {}
+
+        # shared, do not modify
+        return meta_cache.get(self.path, load)
+
+    def _write(self, states: Dict[str, PageState]):
+        with atomic_write(self.path) as path, open(path, 'w') as f:
+            json.dump({name: s.to_dict() for name, s in states.items()}, f)
+        meta_cache.invalidate(self.path)
+
+    def _updated(self, page: 'DatabasePage', state: Optional[PageState],
+                 pcgts: Optional[dict] = None, page_progress: Optional['PageProgress'] = None) -> PageState:
+        # copy of the state with the given contents, the contents of modified files are reloaded
+        from database.file_formats.pcgts import PcGts
+        from database.file_formats.pcgts.jsonloader import update_pcgts
+        from database.file_formats.performance.pageprogress import PageProgress
+        # stat before loading, if a file is changed meanwhile the state is updated the next time
+        pcgts_mtime_ns, page_progress_mtime_ns = self._mtimes(page)
+        state = copy(state) if state is not None else PageState()
+        if pcgts is not None or state.pcgts_mtime_ns != pcgts_mtime_ns or state.version != PAGE_STATE_VERSION:
+            if pcgts is None and pcgts_mtime_ns is not None:
+                pcgts = PcGts.load_json(page.file('pcgts').local_path())
+                update_pcgts(pcgts)
+            state.pcgts_mtime_ns = pcgts_mtime_ns
+            state.version = PAGE_STATE_VERSION
+            state.update_pcgts(pcgts)
+
+        if page_progress is not None or state.page_progress_mtime_ns != page_progress_mtime_ns:
+            if page_progress is None:
+                page_progress = PageProgress.from_json_file(page.file('page_progress').local_path()) \
+                    if page_progress_mtime_ns is not None else PageProgress()
+            state.page_progress_mtime_ns = page_progress_mtime_ns
+            state.update_page_progress(page_progress)
+
+        return state
+
+    def page_states(self, pages: List['DatabasePage']) -> Dict[str, PageState]:
+        states = self._load()
+        stale = [p for p in pages if p.page not in states or states[p.page].version != PAGE_STATE_VERSION
+                 or (states[p.page].pcgts_mtime_ns, states[p.page].page_progress_mtime_ns) != self._mtimes(p)]
+        if len(stale) > 0:
+            # one write for all outdated pages
+            with file_lock(self.path):
+                states = dict(self._load())
+                for p in stale:
+                    states[p.page] = self._updated(p, states.get(p.page))
+                self._write(states)
+
+        return {p.page: states[p.page] for p in pages}
+
+    def page_state(self, page: 'DatabasePage') -> PageState:
+        return self.page_states([page])[page.page]
+
+    def update(self, page: 'DatabasePage', pcgts: Optional[dict] = None, page_progress: Optional['PageProgress'] = None):
+        # call after writing the pcgts (as json) or the page progress of the page
+        with file_lock(self.path):
+            states = dict(self._load())
+            states[page.page] = self._updated(page, states.get(page.page), pcgts, page_progress)
+            self._write(states)
+
+    def remove(self, page_name: str):
+        if not os.path.exists(self.path):
+            return
+
+        with file_lock(self.path):
+            states = dict(self._load())
+            if states.pop(page_name, None) is not None:
+                self._write(states)
+
+
+def page_state(page: 'DatabasePage') -> PageState:
+    return DatabaseBookPageStates(page.book).page_state(page)
@@ -1,10 +1,11 @@
-from typing import NamedTuple, List
+from typing import NamedTuple, List, Dict
 from PIL import Image
-from multiprocessing import Lock
-from locked_dict.locked_dict import LockedDict
 import numpy as np
 import os
 from database.database_page import DatabasePage
+from database.database_image_cache import image_cache
+from ommr4all.settings import PCGTS_STORAGE_SETTINGS
+from shared.filelock import file_lock, atomic_write
 import logging
 
 
@@ -40,6 +41,10 @@ file_definitions = {
         'meta',
         ['meta.json'],
     ),
+    'image_sizes': DatabaseFileDefinition(
+        'image_sizes',
+        ['image_sizes.json'],
+    ),
     'annotation': DatabaseFileDefinition(
         'annotation',
         ['annotation.json'],
@@ -47,7 +52,7 @@ file_definitions = {
     ),
     'pcgts': DatabaseFileDefinition(
         'pcgts',
-        ['pcgts.json'],
+        ['pcgts.msgpack' if PCGTS_STORAGE_SETTINGS.format == 'msgpack' else 'pcgts.json'],
         requires=['color_original'],
     ),
     'pcgts_backup': DatabaseFileDefinition(
@@ -139,8 +144,6 @@ file_definitions = {
     ),
 }
 
-mutex_dict = LockedDict()
-
 thumbnail_size = (200, 350)
 
 high_res_max_width = 2000
@@ -153,6 +156,25 @@ class DatabaseFile:
     def file_definitions():
         return file_definitions
 
+    @staticmethod
+    def dependency_levels(file_ids: List[str]) -> List[List[str]]:
+        # the files and all their requirements grouped so that a file only requires files of previous levels,
+        # files of the same level can be created concurrently
+        levels: Dict[str, int] = {}
+
+        def level(file_id: str) -> int:
+            if file_id not in levels:
+                levels[file_id] = 1 + max([level(r) for r in file_definitions[file_id].requires], default=-1)
+            return levels[file_id]
+
+        for file_id in file_ids:
+            level(file_id)
+
+        out = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+        for file_id, l in levels.items():
+            out[l].append(file_id)
+        return out
+
     def __init__(self, page: DatabasePage, fileId: str, create_if_not_existing=False):
         self.page = page
         self._fileId = fileId.strip('/')
@@ -194,21 +216,32 @@ class DatabaseFile:
         return all(map(os.path.exists, [self.local_path(i) for i in range(len(self.definition.output))])) \
                and (not self.definition.has_preview or all(map(os.path.exists, [self.local_thumbnail_path(i) for i in range(len(self.definition.output))])))
 
+    def image(self, file_id=-1) -> np.ndarray:
+        # decoded image of the file, shared via the image cache and thus read-only
+        return image_cache.get(self.local_path(file_id))
+
     def delete(self):
         for i in range(len(self.definition.output)):
+            image_cache.invalidate(self.local_path(file_id=i))
             if os.path.exists(self.local_path(file_id=i)):
                 os.remove(self.local_path(file_id=i))
             if os.path.exists(self.local_thumbnail_path(file_id=i)):
                 os.remove(self.local_thumbnail_path(file_id=i))
 
     def _save_and_thumbnail(self, img: Image, idx: int):
-        img.save(self.local_path(idx))
+        with atomic_write(self.local_path(idx)) as path:
+            img.save(path)
+        self.page.update_image_size(self, img.size, idx)
         img.thumbnail(thumbnail_size)
-        img.save(self.local_thumbnail_path(idx))
+        with atomic_write(self.local_thumbnail_path(idx)) as path:
+            img.save(path)
 
     def create(self):
+        if self.exists():
+            return
 
-        with mutex_dict.get(self.local_path(), Lock()):
+        # other threads or processes creating the same file are waited for, they created it meanwhile then
+        with file_lock(self.local_path()):
             if self.exists():
                 # check if exists
                 return
@@ -241,12 +274,19 @@ class DatabaseFile:
                     json.dump({}, f)
             elif self.definition.id == 'pcgts':
                 from database.file_formats.pcgts import PcGts, Page, Meta
-                img = Image.open(DatabaseFile(self.page, 'color_original').local_path())
+                for other in ['pcgts.json', 'pcgts.msgpack']:
+                    if other != self.filename() and os.path.exists(self.page.local_file_path(other)):
+                        # convert the page that is stored in the other format, the old file would become outdated
+                        logger.info('Converting {} to {}'.format(other, self.filename()))
+                        PcGts.from_json(PcGts.load_json(self.page.local_file_path(other)), self.page).to_file(self.local_path())
+                        os.remove(self.page.local_file_path(other))
+                        return
+
                 pcgts = PcGts(
                     meta=Meta(),
                     page=Page(location=self.page),
                 )
-                pcgts.page.image_width, pcgts.page.image_height = img.size
+                pcgts.page.image_width, pcgts.page.image_height = self.page.image_size('color_original')
                 pcgts.to_file(self.local_path())
             elif self.definition.id == 'pcgts_backup':
                 import zipfile
@@ -255,8 +295,10 @@ class DatabaseFile:
             elif self.definition.id == 'color_original':
                 # create preview
                 img = Image.open(self.local_path())
+                self.page.update_image_size(self, img.size)
                 img.thumbnail(thumbnail_size)
-                img.save(self.local_thumbnail_path())
+                with atomic_write(self.local_thumbnail_path()) as path:
+                    img.save(path)
             elif self.definition.id == 'color_highres_preproc':
                 meta = self.page.meta()
                 preproc = Preprocessing()
@@ -272,9 +314,9 @@ class DatabaseFile:
                 self._save_and_thumbnail(g_hr, 1)
                 self._save_and_thumbnail(b_hr, 2)
             elif self.definition.id == 'color_lowres_preproc':
-                c_hr = Image.open(self.page.local_file_path('color_highres_preproc.jpg'))
-                b_hr = Image.open(self.page.local_file_path('binary_highres_preproc.png'))
-                g_hr = Image.open(self.page.local_file_path('gray_highres_preproc.jpg'))
+                c_hr = Image.fromarray(image_cache.get(self.page.local_file_path('color_highres_preproc.jpg')))
+                b_hr = Image.fromarray(image_cache.get(self.page.local_file_path('binary_highres_preproc.png')))
+                g_hr = Image.fromarray(image_cache.get(self.page.local_file_path('gray_highres_preproc.jpg')))
                 w, h = c_hr.size
                 out_w = min(low_res_max_width, w)
                 out_h = (out_w * h) // w
@@ -288,18 +330,18 @@ class DatabaseFile:
                 self._save_and_thumbnail(b_hr, 2)
             elif self.definition.id == 'color_norm':
                 meta = self.page.meta()
-                c_hr = Image.open(self.page.local_file_path('color_highres_preproc.jpg'))
+                c_hr = Image.fromarray(image_cache.get(self.page.local_file_path('color_highres_preproc.jpg')))
                 if meta.preprocessing.auto_line_distance:
                     from omr.steps.preprocessing.scale.scale import LineDistanceComputer
                     ldc = LineDistanceComputer()
-                    low_binary = Image.open(self.page.local_file_path('binary_highres_preproc.png'))
-                    line_distance = ldc.get_line_distance(np.array(low_binary) / 255).line_distance
+                    low_binary = image_cache.get(self.page.local_file_path('binary_highres_preproc.png'))
+                    line_distance = ldc.get_line_distance(low_binary / 255).line_distance
                     meta.preprocessing.average_line_distance = line_distance
                     meta.save(self.page)
                 else:
                     # average_line_distance is expected to be computed on the original image
-                    c_orig = Image.open(self.page.local_file_path('color_original.jpg'))
-                    line_distance = int(np.round(meta.preprocessing.average_line_distance * c_hr.size[0] / c_orig.size[0]))
+                    c_orig_w, _ = self.page.image_size('color_original')
+                    line_distance = int(np.round(meta.preprocessing.average_line_distance * c_hr.size[0] / c_orig_w))
 
                 assert(line_distance > 0)
 
@@ -328,7 +370,7 @@ class DatabaseFile:
                     line_distance = meta.preprocessing.average_line_distance
 
                 assert(line_distance > 0)
-                c_hr = Image.open(self.page.local_file_path('color_highres_preproc.jpg'))
+                c_hr = Image.fromarray(image_cache.get(self.page.local_file_path('color_highres_preproc.jpg')))
 
                 # rescale original image
                 scaling = line_distance / (target_staff_line_distance * 2)
@@ -347,8 +389,8 @@ class DatabaseFile:
             elif self.definition.id == 'connected_components_norm':
                 import pickle
                 from omr.steps.preprocessing.util.connected_compontents import connected_compontents_with_stats
-                binary = np.array(Image.open(DatabaseFile(self.page, 'binary_norm').local_path()))
-                with open(self.local_path(), 'wb') as f:
+                binary = DatabaseFile(self.page, 'binary_norm').image()
+                with atomic_write(self.local_path()) as path, open(path, 'wb') as f:
                     pickle.dump(connected_compontents_with_stats(binary), f)
             else:
                 raise Exception("Cannot create file for {}".format(self.definition.id))
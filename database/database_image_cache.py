@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Tuple, NamedTuple, Callable, Any
+from PIL import Image
+from ommr4all.settings import IMAGE_CACHE_SETTINGS
+import numpy as np
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+ImageStamp = Tuple[int, int]
+
+
+def image_stamp(path: str) -> ImageStamp:
+    # changes if the file is rewritten (files are replaced by atomic_write, so the mtime always changes)
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def decode_image(path: str) -> np.ndarray:
+    with Image.open(path) as img:
+        image = np.array(img)
+    image.setflags(write=False)
+    return image
+
+
+class CachedImage(NamedTuple):
+    stamp: ImageStamp
+    image: Any
+
+
+class DecodedImageCache:
+    """
+    Process wide LRU of decoded images, so that the consumers of the images of a page (e.g. the datasets of
+    consecutive steps on the same page) decode each file only once.
+
+    Entries are keyed by the path and are only valid as long as the modification time and size of the file match.
+    The returned arrays are shared and therefore read-only, copy them before modifying.
+    Eviction happens by the memory of the decoded images. Other representations of a file can be cached by passing
+    another decode function, its results must provide nbytes.
+    """
+    def __init__(self, max_memory_mb: int = IMAGE_CACHE_SETTINGS.max_memory_mb,
+                 decode: Callable[[str], Any] = decode_image):
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.decode = decode
+        self.entries: 'OrderedDict[str, CachedImage]' = OrderedDict()
+        self.memory = 0
+        self.mutex = threading.Lock()
+
+    def get(self, path: str) -> Any:
+        path = os.path.abspath(path)
+        stamp = image_stamp(path)
+        with self.mutex:
+            entry = self.entries.get(path)
+            if entry is not None:
+                if entry.stamp == stamp:
+                    self.entries.move_to_end(path)
+                    return entry.image
+
+                self._remove(path)
+
+        # decode outside of the lock, concurrent misses of the same file only decode it twice
+        image = self.decode(path)
+        if image.nbytes > self.max_memory:
+            return image
+
+        with self.mutex:
+            if path in self.entries:
+                self._remove(path)
+            self.entries[path] = CachedImage(stamp, image)
+            self.memory += image.nbytes
+            self._evict()
+
+        return image
+
+    def invalidate(self, path: str):
+        with self.mutex:
+            path = os.path.abspath(path)
+            if path in self.entries:
+                self._remove(path)
+
+    def clear(self):
+        with self.mutex:
+            self.entries.clear()
+            self.memory = 0
+
+    def _remove(self, path: str):
+        self.memory -= self.entries.pop(path).image.nbytes
+
+    def _evict(self):
+        while self.memory > self.max_memory:
+            path, _ = next(iter(self.entries.items()))
+            logger.debug("Evicting decoded image {}".format(path))
+            self._remove(path)
+
+
+image_cache = DecodedImageCache()
@@ -0,0 +1,62 @@
+from typing import Optional, Tuple, Dict, Any, Callable, TypeVar
+import threading
+import os
+
+T = TypeVar('T')
+
+FileStamp = Optional[Tuple[int, int]]
+
+
+def file_stamp(path: str) -> FileStamp:
+    # changes if a file is rewritten or if entries of a directory are added, removed or renamed, None if missing
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileStampCache:
+    """
+    Process wide cache of values derived from a file or directory (e.g. the parsed meta of a book or the listing of
+    its pages), so that requests do not parse the same files over and over again.
+
+    An entry is only valid as long as the modification time and size of its path match, the writers of the files
+    additionally invalidate the entries. The values are shared, copy mutable values before handing them out.
+    """
+    def __init__(self):
+        self.entries: Dict[str, Tuple[FileStamp, Any]] = {}
+        self.mutex = threading.Lock()
+
+    def get(self, path: str, load: Callable[[], T]) -> T:
+        path = os.path.abspath(path)
+        stamp = file_stamp(path)
+        with self.mutex:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+
+        # the stamp is taken before loading, a concurrent change only leads to a reload on the next access
+        value = load()
+        with self.mutex:
+            self.entries[path] = (stamp, value)
+
+        return value
+
+    def invalidate(self, path: str):
+        with self.mutex:
+            self.entries.pop(os.path.abspath(path), None)
+
+    def invalidate_tree(self, path: str):
+        # path and all entries within it, e.g. of a deleted book
+        path = os.path.abspath(path)
+        with self.mutex:
+            for p in [p for p in self.entries if p == path or p.startswith(path + os.sep)]:
+                del self.entries[p]
+
+    def clear(self):
+        with self.mutex:
+            self.entries.clear()
+
+
+meta_cache = FileStampCache()
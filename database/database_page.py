@@ -3,8 +3,10 @@ from json import JSONDecodeError
 from database.database_book import DatabaseBook, file_name_validator, InvalidFileNameException, FileExistsException
 from django.core.exceptions import EmptyResultSet
 from database.database_permissions import DatabaseBookPermissionFlag
-from typing import Optional
+from database.database_meta_cache import meta_cache
+from typing import Optional, Tuple, List
 import os
+import re
 import shutil
 from typing import TYPE_CHECKING
 import logging
@@ -15,10 +17,24 @@ if TYPE_CHECKING:
     from django.contrib.auth.models import User
     from database.file_formats.pcgts import PcGts
     from database.database_page_meta import DatabasePageMeta
+    from database.database_page_image_sizes import DatabasePageImageSizes
+    from database.database_file import DatabaseFile
     from database.file_formats.performance.pageprogress import PageProgress
     from database.file_formats.performance.statistics import Statistics
 
 
+# lock files (of the user and the sidecars of file_lock) and temporary files of atomic_write
+_transient_file = re.compile(r'(.*\.lock|\..*\.[0-9a-f]{32}(\.\w+)?)')
+
+
+def ignore_derived_files(directory: str, names: List[str]) -> List[str]:
+    # derived and transient files of books and pages that are not copied or exported, usable as ignore of copytree
+    from database.database_book_page_states import PAGE_STATES_FILE
+    from database.database_page_pcgts_backup import PCGTS_BACKUP_DIR
+    from omr.dataset.dataset_cache import DATASET_CACHE_DIR
+    return [n for n in names if n in (DATASET_CACHE_DIR, PCGTS_BACKUP_DIR, PAGE_STATES_FILE) or _transient_file.fullmatch(n)]
+
+
 class DatabasePage:
     def __init__(self, book: DatabaseBook, page: str, skip_validation=False,
                  pcgts: Optional['PcGts'] = None,
@@ -35,22 +51,32 @@ class DatabasePage:
         self._pcgts: Optional['PcGts'] = pcgts
         self._page_progress: Optional['PageProgress'] = page_progress
         self._page_statistics: Optional['Statistics'] = page_statistics
+        self._image_sizes: Optional['DatabasePageImageSizes'] = None
 
     def __eq__(self, other):
         return isinstance(other, DatabasePage) and self.book == other.book and self.page == other.page
 
+    def __hash__(self):
+        return hash((self.book, self.page))
+
+    def __repr__(self):
+        return 'DatabasePage({!r}, {!r})'.format(self.book.book, self.page)
+
     def exists(self):
         return os.path.isdir(self.local_path())
 
     def delete(self):
         if os.path.exists(self.local_path()):
             shutil.rmtree(self.local_path())
+        meta_cache.invalidate(self.book.local_path('pages'))
+        from database.database_book_page_states import DatabaseBookPageStates
+        DatabaseBookPageStates(self.book).remove(self.page)
 
     def rename(self, new_name):
         if not file_name_validator.fullmatch(new_name):
             raise InvalidFileNameException(new_name)
 
-        old_path = self.local_path()
+        old_path, old_name = self.local_path(), self.page
         self.page = new_name
         new_path = self.local_path()
 
@@ -58,6 +84,9 @@ class DatabasePage:
             raise FileExistsException(new_name, new_path)
 
         shutil.move(old_path, new_path)
+        meta_cache.invalidate(self.book.local_path('pages'))
+        from database.database_book_page_states import DatabaseBookPageStates
+        DatabaseBookPageStates(self.book).remove(old_name)
 
     def file(self, fileId, create_if_not_existing=False):
         from database.database_file import DatabaseFile
@@ -112,6 +141,8 @@ class DatabasePage:
             return
 
         self._page_progress.to_json_file(self.file('page_progress').local_path())
+        from database.database_book_page_states import DatabaseBookPageStates
+        DatabaseBookPageStates(self.book).update(self, page_progress=self._page_progress)
         logger.debug('Successfully saved page progress file to {}'.format(self.file('page_progress').local_path()))
 
     def pcgts(self, create_if_not_existing=True) -> 'PcGts':
@@ -135,6 +166,25 @@ class DatabasePage:
         if self._meta:
             self._meta.save(self)
 
+    def image_sizes(self) -> 'DatabasePageImageSizes':
+        if not self._image_sizes:
+            from database.database_page_image_sizes import DatabasePageImageSizes
+            self._image_sizes = DatabasePageImageSizes.load(self)
+        return self._image_sizes
+
+    def image_size(self, fileId, create_if_not_existing=True) -> Tuple[int, int]:
+        # (width, height) of an image file, read from the manifest if it is up to date
+        return self.image_sizes().size(self.file(fileId, create_if_not_existing))
+
+    def update_image_size(self, file: 'DatabaseFile', size: Tuple[int, int], file_id=-1):
+        # reload before writing, the manifest might have been changed by another process
+        from database.database_page_image_sizes import DatabasePageImageSizes
+        from shared.filelock import file_lock
+        with file_lock(self.file('image_sizes').local_path()):
+            self._image_sizes = DatabasePageImageSizes.load(self)
+            self._image_sizes.update(file, size, file_id)
+            self._image_sizes.save(self)
+
     def is_valid(self):
         if not os.path.exists(self.local_path()):
             return True
@@ -153,7 +203,8 @@ class DatabasePage:
         if copy_page.exists():
             shutil.rmtree(copy_page.local_path())
 
-        shutil.copytree(self.local_path(), copy_page.local_path())
+        shutil.copytree(self.local_path(), copy_page.local_path(), ignore=ignore_derived_files)
+        meta_cache.invalidate(database_book.local_path('pages'))
         return copy_page
 
     def is_locked(self):
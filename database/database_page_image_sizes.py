@@ -0,0 +1,64 @@
+from dataclasses import dataclass, field
+from typing import Dict, Tuple, TYPE_CHECKING
+from json import JSONDecodeError
+from database.database_page import DatabasePage
+from mashumaro import DataClassJSONMixin
+from shared.filelock import atomic_write
+import logging
+import os
+
+if TYPE_CHECKING:
+    from database.database_file import DatabaseFile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImageSize(DataClassJSONMixin):
+    width: int
+    height: int
+    mtime_ns: int
+
+
+@dataclass
+class DatabasePageImageSizes(DataClassJSONMixin):
+    """
+    Manifest of the dimensions of the image files of a page, so that loading a page does not need to open images.
+
+    Entries are keyed by the file name and are only valid as long as the modification time of the file matches.
+    """
+    sizes: Dict[str, ImageSize] = field(default_factory=dict)
+
+    @staticmethod
+    def load(page: DatabasePage):
+        path = page.file('image_sizes').local_path()
+        try:
+            with open(path) as f:
+                return DatabasePageImageSizes.from_json(f.read())
+        except FileNotFoundError:
+            return DatabasePageImageSizes()
+        except (JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            # the manifest is only a cache, rebuild it on demand
+            logger.warning('Invalid image size manifest at {}: {}'.format(path, e))
+            return DatabasePageImageSizes()
+
+    def save(self, page: DatabasePage):
+        dump = self.to_json(indent=2)
+        with atomic_write(page.file('image_sizes').local_path()) as path, open(path, 'w') as f:
+            f.write(dump)
+
+    def update(self, file: 'DatabaseFile', size: Tuple[int, int], file_id=-1):
+        self.sizes[file.filename(file_id)] = ImageSize(size[0], size[1], os.stat(file.local_path(file_id)).st_mtime_ns)
+
+    def size(self, file: 'DatabaseFile', file_id=-1) -> Tuple[int, int]:
+        entry = self.sizes.get(file.filename(file_id))
+        if entry is not None and entry.mtime_ns == os.stat(file.local_path(file_id)).st_mtime_ns:
+            return entry.width, entry.height
+
+        # unknown or outdated, read the header of the image once and store it
+        from PIL import Image
+        with Image.open(file.local_path(file_id)) as img:
+            size = img.size
+        self.update(file, size, file_id)
+        file.page.update_image_size(file, size, file_id)
+        return size
@@ -0,0 +1,158 @@
+from typing import Optional, List, Tuple
+from database.database_page import DatabasePage
+from ommr4all.settings import PCGTS_BACKUP_SETTINGS, PcGtsBackupSettings
+from shared.filelock import file_lock
+from shared.jsonpatch import make_patch, apply_patch
+from collections import OrderedDict
+import datetime
+import threading
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+# directory of the backup segments, within the directory of the page
+PCGTS_BACKUP_DIR = 'pcgts_backup'
+
+
+def _dumps(j) -> str:
+    return json.dumps(j, separators=(',', ':'), sort_keys=True)
+
+
+def _last_line(path: str, chunk_size=4096) -> bytes:
+    # last line of a file that ends with a new line, read from the back
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b''
+        pos = end
+        while pos > 0:
+            pos = max(0, end - chunk_size)
+            chunk_size *= 2
+            f.seek(pos)
+            data = f.read(end - pos)
+            start = data.rfind(b'\n', 0, len(data) - 1)
+            if start >= 0:
+                return data[start + 1:]
+        return data
+
+
+# last logged version of recently saved pages (backup dir -> (stamp, json)), so that a save needs not to read it
+_last_versions: 'OrderedDict[str, Tuple[List[int], dict]]' = OrderedDict()
+_last_versions_mutex = threading.Lock()
+MAX_LAST_VERSIONS = 16
+
+
+def pcgts_stamp(page: DatabasePage) -> Optional[List[int]]:
+    # modification time and size of the stored pcgts of a page, None if there is none
+    try:
+        stat = os.stat(page.file('pcgts').local_path())
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class PcGtsBackupLog:
+    """
+    Backup of all saved versions of the pcgts of a page as append-only log.
+
+    The log consists of segments (files with one json entry per line) that start with a snapshot of the page that is
+    followed by json patches, each relative to the previous version. A new segment is started once the patches are
+    larger than max_patch_ratio times the page, only the last max_snapshots segments are kept. Each entry stores the
+    stamp (modification time and size) of the stored pcgts file, a save whose previous file does not match (e.g. the
+    page was changed by an algorithm in between) starts a new segment.
+    """
+    def __init__(self, page: DatabasePage, settings: PcGtsBackupSettings = PCGTS_BACKUP_SETTINGS):
+        self.page = page
+        self.settings = settings
+        self.path = page.local_file_path(PCGTS_BACKUP_DIR)
+
+    def segments(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        return [os.path.join(self.path, f) for f in sorted(os.listdir(self.path)) if f.endswith('.jsonl')]
+
+    def last_version(self, stamp: Optional[List[int]]) -> Optional[dict]:
+        # the last logged version if it is still stored with the given stamp and known by this process
+        with _last_versions_mutex:
+            last = _last_versions.get(self.path)
+        if last is None or stamp is None or last[0] != stamp:
+            return None
+        return last[1]
+
+    def append(self, previous_stamp: Optional[List[int]], current: dict, patch: Optional[List[dict]] = None):
+        # call after current was stored, previous_stamp: the stamp of the pcgts file before
+        # patch: the changes from the previous version to current if known (e.g. sent by the client), else computed
+        stamp = pcgts_stamp(self.page)
+        entry = {
+            'time': str(datetime.datetime.now()),
+            'stamp': stamp,
+        }
+        with file_lock(self.path):
+            segments = self.segments()
+            if previous_stamp is not None and stamp is not None and len(segments) > 0 \
+                    and os.path.getsize(segments[-1]) <= (1 + self.settings.max_patch_ratio) * stamp[1]:
+                try:
+                    last_stamp = json.loads(_last_line(segments[-1]).decode('utf-8')).get('stamp')
+                except (ValueError, UnicodeDecodeError) as e:
+                    logger.warning('Invalid backup segment {}: {}'.format(segments[-1], e))
+                    last_stamp = None
+
+                if last_stamp == previous_stamp:
+                    if patch is None:
+                        previous = self.last_version(previous_stamp)
+                        if previous is None:
+                            # not saved by this process, replay the segment
+                            previous = self._segment_versions(segments[-1])[-1][1]
+                        patch = make_patch(previous, current)
+
+                    # unchanged saves are logged too (as empty patch) to keep track of the stamp
+                    entry['patch'] = patch
+                    with open(segments[-1], 'a') as f:
+                        f.write(_dumps(entry) + '\n')
+                    self._set_last_version(stamp, current)
+                    return
+
+            # new segment that starts with a snapshot
+            os.makedirs(self.path, exist_ok=True)
+            number = int(os.path.splitext(os.path.basename(segments[-1]))[0]) + 1 if segments else 0
+            entry['snapshot'] = current
+            with open(os.path.join(self.path, '{:08d}.jsonl'.format(number)), 'w') as f:
+                f.write(_dumps(entry) + '\n')
+            self._set_last_version(stamp, current)
+
+            for old in segments[:max(0, len(segments) + 1 - self.settings.max_snapshots)]:
+                os.remove(old)
+
+    def _set_last_version(self, stamp: Optional[List[int]], current: dict):
+        with _last_versions_mutex:
+            _last_versions.pop(self.path, None)
+            if stamp is not None:
+                _last_versions[self.path] = (stamp, current)
+                while len(_last_versions) > MAX_LAST_VERSIONS:
+                    _last_versions.popitem(last=False)
+
+    @staticmethod
+    def _segment_versions(segment: str) -> List[Tuple[str, dict]]:
+        # all versions (time, pcgts json) of a segment, unchanged saves are skipped
+        out = []
+        current = None
+        with open(segment) as f:
+            for line in f:
+                entry = json.loads(line)
+                if 'snapshot' in entry:
+                    current = entry['snapshot']
+                elif entry['patch']:
+                    current = apply_patch(current, entry['patch'])
+                else:
+                    continue
+                out.append((entry['time'], current))
+        return out
+
+    def versions(self) -> List[Tuple[str, dict]]:
+        # all stored versions (time, pcgts json), oldest first
+        out = []
+        for segment in self.segments():
+            out += self._segment_versions(segment)
+        return out
@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import Dict, NamedTuple, TYPE_CHECKING, Union
 from enum import IntEnum
+from copy import deepcopy
+from database.database_meta_cache import meta_cache
 import pickle
 
 if TYPE_CHECKING:
@@ -83,16 +85,21 @@ class DatabaseBookPermissions:
     def write(self):
         with open(self.book.local_path(_permissions_file), 'wb') as f:
             pickle.dump(self.permissions, f)
+        meta_cache.invalidate(self.book.local_path(_permissions_file))
 
     @staticmethod
     def load(book: 'DatabaseBook'):
-        try:
-            with open(book.local_path(_permissions_file), 'rb') as f:
-                permissions = pickle.load(f)
-        except FileNotFoundError:
-            permissions = BookPermissionData({}, {}, BookPermissionFlags())
+        path = book.local_path(_permissions_file)
 
-        return DatabaseBookPermissions(book, permissions)
+        def load():
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except FileNotFoundError:
+                return BookPermissionData({}, {}, BookPermissionFlags())
+
+        # the cached permissions are shared
+        return DatabaseBookPermissions(book, deepcopy(meta_cache.get(path, load)))
 
     def __init__(self, book: 'DatabaseBook', permissions: BookPermissionData):
         self.book = book
@@ -0,0 +1,62 @@
+"""
+Compact binary encoding of the json of a PcGts.
+
+The structure is the same as the json, but coordinates are stored as raw little endian float64 buffers instead of
+"x,y x,y" strings. The floats are exactly the ones of the strings, so the conversion is lossless in both directions.
+Loading yields Coords and Point objects that are accepted by the from_json methods instead of strings.
+"""
+
+from typing import Any
+import numpy as np
+from database.file_formats.pcgts.page.coords import Coords, Point
+
+EXT_COORDS = 1
+EXT_POINT = 2
+FLOAT_TYPE = np.dtype('<f8')
+
+
+def _parse_floats(s: str):
+    try:
+        return np.array(s.replace(' ', ',').split(','), dtype=FLOAT_TYPE) if len(s) > 0 else np.zeros((0,), dtype=FLOAT_TYPE)
+    except ValueError:
+        return None
+
+
+def _encode(key: str, value: Any) -> Any:
+    import msgpack
+    if isinstance(value, dict):
+        return {k: _encode(k, v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_encode(key, v) for v in value]
+    elif isinstance(value, str):
+        # coordinates are stored as 'coords' (polyline) and 'coord' (point) strings, anything unexpected stays a string
+        if key == 'coords':
+            floats = _parse_floats(value)
+            if floats is not None and len(floats) % 2 == 0:
+                return msgpack.ExtType(EXT_COORDS, floats.tobytes())
+        elif key == 'coord':
+            floats = _parse_floats(value)
+            if floats is not None and len(floats) == 2:
+                return msgpack.ExtType(EXT_POINT, floats.tobytes())
+
+    return value
+
+
+def _ext_hook(code: int, data: bytes):
+    import msgpack
+    if code == EXT_COORDS:
+        return Coords(np.frombuffer(data, dtype=FLOAT_TYPE).reshape((-1, 2)))
+    elif code == EXT_POINT:
+        return Point(*np.frombuffer(data, dtype=FLOAT_TYPE).tolist())
+
+    return msgpack.ExtType(code, data)
+
+
+def dumps(json: dict) -> bytes:
+    import msgpack
+    return msgpack.packb(_encode('', json), use_bin_type=True)
+
+
+def loads(data: bytes) -> dict:
+    import msgpack
+    return msgpack.unpackb(data, raw=False, ext_hook=_ext_hook, strict_map_key=False)
@@ -5,7 +5,21 @@ from typing import Type, Union
 from mashumaro.types import SerializableType
 
 
+def rotate_points(points: np.ndarray, degree, origin) -> np.ndarray:
+    # rotation of a (N, 2) array of points around the origin
+    radians = degree / 180 * np.pi
+    offset_x, offset_y = origin
+    adjusted_x, adjusted_y = (points[:, 0] - offset_x), (points[:, 1] - offset_y)
+    cos_rad, sin_rad = np.cos(radians), np.sin(radians)
+    qx = offset_x + cos_rad * adjusted_x + sin_rad * adjusted_y
+    qy = offset_y + -sin_rad * adjusted_x + cos_rad * adjusted_y
+
+    return np.stack([qx, qy], axis=-1)
+
+
 class Point:
+    __slots__ = ('p', )
+
     def __init__(self, x: Union[int, float, np.ndarray, 'Size', 'Point'] = 0, y=0):
         if isinstance(x, np.ndarray):
             self.p = x
@@ -18,17 +32,7 @@ class Point:
         return Point(self.x, self.y)
 
     def rotate(self, degree, origin):
-        def rotate_point(xy, radians, origin=(0, 0)):
-            x, y = xy
-            offset_x, offset_y = origin
-            adjusted_x, adjusted_y = (x - offset_x), (y - offset_y)
-            cos_rad, sin_rad = np.cos(radians), np.sin(radians)
-            qx = offset_x + cos_rad * adjusted_x + sin_rad * adjusted_y
-            qy = offset_y + -sin_rad * adjusted_x + cos_rad * adjusted_y
-
-            return qx, qy
-
-        self.p = np.array(rotate_point(self.p, degree / 180 * np.pi, origin))
+        self.p = rotate_points(np.reshape(self.p, (1, 2)), degree, origin)[0]
 
     @property
     def x(self):
@@ -84,6 +88,9 @@ class Point:
 
     @staticmethod
     def from_json(json):
+        if isinstance(json, Point):
+            # already decoded, e.g. by the msgpack loader
+            return json
         return Point.from_string(json)
 
     def to_json(self):
@@ -91,6 +98,8 @@ class Point:
 
 
 class Size:
+    __slots__ = ('p', )
+
     def __init__(self, w: Union[int, float, np.ndarray, 'Size', 'Point'] = 0, h=0):
         if isinstance(w, np.ndarray):
             self.p = w
@@ -160,30 +169,26 @@ class Coords(SerializableType):
         return Coords(self.points * factor)
 
     def rotate(self, degree, origin):
-        def rotate_point(xy, radians, origin=(0, 0)):
-            x, y = xy
-            offset_x, offset_y = origin
-            adjusted_x, adjusted_y = (x - offset_x), (y - offset_y)
-            cos_rad, sin_rad = np.cos(radians), np.sin(radians)
-            qx = offset_x + cos_rad * adjusted_x + sin_rad * adjusted_y
-            qy = offset_y + -sin_rad * adjusted_x + cos_rad * adjusted_y
-
-            return qx, qy
-
-        self.points = np.array([rotate_point(p, degree / 180 * np.pi, origin) for p in self.points])
+        self.points = rotate_points(self.points, degree, origin)
 
     @staticmethod
     def from_string(s):
         if len(s) == 0:
             return Coords()
 
-        return Coords(np.array([list(map(float, p.split(','))) for p in s.split(" ")]))
+        # "x,y x,y ..." parsed at once, the floats are identical to parsing each point
+        return Coords(np.array(list(map(float, s.replace(' ', ',').split(','))), dtype=float).reshape((-1, 2)))
 
     def to_string(self):
-        return " ".join(",".join(map(str, self.points[i])) for i in range(self.points.shape[0]))
+        if len(self.points) == 0:
+            return ""
+        return " ".join(map("{},{}".format, self.points[:, 0].tolist(), self.points[:, 1].tolist()))
 
     @staticmethod
     def from_json(json):
+        if isinstance(json, Coords):
+            # already decoded, e.g. by the msgpack loader
+            return json
         return Coords.from_string(json)
 
     @classmethod
@@ -220,15 +225,7 @@ class Coords(SerializableType):
         if len(self.points) == 0:
             return Rect()
 
-        tl = self.points[0]
-        br = self.points[0]
-        for p in self.points[1:]:
-            tl = np.min([tl, p], axis=0)
-            br = np.max([br, p], axis=0)
-
-        Point(tl)
-
-        return Rect(Point(tl), Point(br))
+        return Rect(Point(self.points.min(axis=0)), Point(self.points.max(axis=0)))
 
     def extract_from_image(self, image: np.ndarray):
         aabb = self.aabb()
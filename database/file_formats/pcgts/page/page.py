@@ -3,7 +3,7 @@ from database.file_formats.pcgts.page import annotations as annotations
 from database.file_formats.pcgts.page.usercomment import UserComments
 from database.file_formats.pcgts.page.readingorder import ReadingOrder
 from database.file_formats.pcgts.page import work as work
-from typing import List, TYPE_CHECKING, Union, Optional, Iterable
+from typing import List, TYPE_CHECKING, Union, Optional, Iterable, Dict
 import numpy as np
 from enum import IntEnum
 
@@ -32,23 +32,128 @@ class PageScaleReference(IntEnum):
 
 
 class Page:
+    """
+    Page of a PcGts.
+
+    Pages loaded by from_json are lazy: the blocks are parsed when they are accessed by blocks_of_type (and the methods
+    based on it, e.g. music_blocks), so that read-only passes only parse the blocks they need. Any other access to the
+    blocks, the annotations, works, comments or reading order (which reference the blocks) materializes the full page.
+    """
     def __init__(self,
                  blocks: List[Block]=None,
                  image_filename="", image_height=0, image_width=0,
                  location: 'DatabasePage' = None):
-        self.blocks: List[Block] = blocks if blocks else []
+        self._blocks: List[Block] = blocks if blocks else []
+        # json of the blocks (or the already parsed blocks) and of the page while not materialized, see from_json
+        self._lazy_blocks: Optional[List[Union[dict, Block]]] = None
+        self._lazy_json: Optional[dict] = None
+        self._note_names_updated = False
         self.image_filename = image_filename
         self.image_height = image_height
         self.image_width = image_width
-        self.annotations = annotations.Annotations(self)
-        self.works = work.Works(self)
-        self.comments = UserComments(self)
-        self.reading_order = ReadingOrder(self)
+        self._annotations = annotations.Annotations(self)
+        self._works = work.Works(self)
+        self._comments = UserComments(self)
+        self._reading_order = ReadingOrder(self)
         self.location = location
         self.page_scale_ratios = {}
 
         self.update_note_names()
 
+    @property
+    def blocks(self) -> List[Block]:
+        self._materialize()
+        return self._blocks
+
+    @blocks.setter
+    def blocks(self, blocks: List[Block]):
+        self._materialize()
+        self._blocks = blocks
+
+    @property
+    def annotations(self) -> 'annotations.Annotations':
+        self._materialize()
+        return self._annotations
+
+    @annotations.setter
+    def annotations(self, a: 'annotations.Annotations'):
+        self._materialize()
+        self._annotations = a
+
+    @property
+    def works(self) -> 'work.Works':
+        self._materialize()
+        return self._works
+
+    @works.setter
+    def works(self, w: 'work.Works'):
+        self._materialize()
+        self._works = w
+
+    @property
+    def comments(self) -> UserComments:
+        self._materialize()
+        return self._comments
+
+    @comments.setter
+    def comments(self, c: UserComments):
+        self._materialize()
+        self._comments = c
+
+    @property
+    def reading_order(self) -> ReadingOrder:
+        self._materialize()
+        return self._reading_order
+
+    @reading_order.setter
+    def reading_order(self, r: ReadingOrder):
+        self._materialize()
+        self._reading_order = r
+
+    def is_materialized(self) -> bool:
+        return self._lazy_blocks is None
+
+    def _parsed_block(self, i: int) -> Block:
+        b = self._lazy_blocks[i]
+        if isinstance(b, dict):
+            b = self._lazy_blocks[i] = Block.from_json(b)
+        return b
+
+    @staticmethod
+    def _json_block_type(b: Union[dict, Block]) -> BlockType:
+        if isinstance(b, Block):
+            return b.block_type
+        return BlockType(b.get('type', BlockType.MUSIC.value))
+
+    def _update_lazy_note_names(self):
+        # the note names depend on the clefs of all music blocks, parse all of them once
+        if not self._note_names_updated:
+            self._note_names_updated = True
+            music_blocks = [self._parsed_block(i) for i, b in enumerate(self._lazy_blocks) if self._json_block_type(b) == BlockType.MUSIC]
+            self._update_note_names(music_blocks)
+
+    def _materialize(self):
+        if self._lazy_blocks is None:
+            return
+
+        self._update_lazy_note_names()
+        self._blocks = [self._parsed_block(i) for i in range(len(self._lazy_blocks))]
+        self._lazy_blocks = None
+
+        # the annotations, works, comments and reading order reference the blocks
+        json, self._lazy_json = self._lazy_json, None
+        if 'annotations' in json:
+            self._annotations = annotations.Annotations.from_json(json['annotations'], self)
+
+        if 'comments' in json:
+            self._comments = UserComments.from_json(json['comments'], self)
+
+        if 'readingOrder' in json:
+            self._reading_order = ReadingOrder.from_json(json['readingOrder'], self)
+
+        if 'works' in json:
+            self._works = work.Works.from_json(json['works'], self)
+
     def syllable_by_id(self, syllable_id):
         for b in self.blocks:
             r = b.syllable_by_id(syllable_id)
@@ -60,25 +165,15 @@ class Page:
     @staticmethod
     def from_json(json: dict, location: Optional['DatabasePage']):
         page = Page(
-            [Block.from_json(t) for t in json.get('blocks', [])],
+            None,
             json.get('imageFilename', ""),
             json.get('imageHeight', 0),
             json.get('imageWidth', 0),
             location=location,
         )
-        if 'annotations' in json:
-            page.annotations = annotations.Annotations.from_json(json['annotations'], page)
-
-        if 'comments' in json:
-            page.comments = UserComments.from_json(json['comments'], page)
-
-        if 'readingOrder' in json:
-            page.reading_order = ReadingOrder.from_json(json['readingOrder'], page)
-
-        if 'works' in json:
-            page.works = work.Works.from_json(json['works'], page)
-
-        page.update_note_names()
+        # parsed on demand
+        page._lazy_blocks = list(json.get('blocks', []))
+        page._lazy_json = json
         return page
 
     def to_json(self):
@@ -96,9 +191,16 @@ class Page:
     def blocks_of_type(self, block_type: Union[BlockType, Iterable[BlockType]]) -> List[Block]:
         try:
             block_types = list(block_type)
-            return [b for b in self.blocks if b.block_type in block_types]
         except TypeError:
-            return [b for b in self.blocks if b.block_type == block_type]
+            block_types = [block_type]
+
+        if self._lazy_blocks is not None:
+            # only parse the requested blocks of a lazy page
+            if BlockType.MUSIC in block_types:
+                self._update_lazy_note_names()
+            return [self._parsed_block(i) for i, b in enumerate(self._lazy_blocks) if self._json_block_type(b) in block_types]
+
+        return [b for b in self.blocks if b.block_type in block_types]
 
     def clear_blocks_of_type(self, block_type: BlockType):
         self.blocks = [b for b in self.blocks if b.block_type != block_type]
@@ -123,7 +225,7 @@ class Page:
         return None
 
     def text_blocks(self):
-        return [b for b in self.blocks if b.block_type != BlockType.MUSIC]
+        return self.blocks_of_type([t for t in BlockType if t != BlockType.MUSIC])
 
     def block_by_id(self, id: str) -> Optional[Block]:
         for b in self.blocks:
@@ -226,9 +328,7 @@ class Page:
 
     def page_scale_size(self, ref: PageScaleReference):
         if ref not in self.page_scale_ratios:
-            from PIL import Image
-            img = Image.open(self.location.file(ref.file(), create_if_not_existing=True).local_path())
-            self.page_scale_ratios[ref] = img.size
+            self.page_scale_ratios[ref] = self.location.image_size(ref.file())
 
         return self.page_scale_ratios[ref]
 
@@ -260,7 +360,11 @@ class Page:
         self.blocks.sort(key=lambda block: block.aabb.top())
 
     def update_note_names(self):
+        self._update_note_names(self.music_blocks())
+
+    @staticmethod
+    def _update_note_names(music_blocks: List[Block]):
         current_clef = None
-        for b in sorted(self.music_blocks(), key=lambda b: b.aabb.top()):
+        for b in sorted(music_blocks, key=lambda b: b.aabb.top()):
             current_clef = b.update_note_names(current_clef)
 
@@ -1,8 +1,8 @@
 from database.file_formats.pcgts.meta import Meta, MEIheadMeta
 from database.file_formats.pcgts.page import Page
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING
 import logging
-from PIL import Image
+import os
 
 if TYPE_CHECKING:
     from database import DatabaseFile, DatabasePage
@@ -22,6 +22,8 @@ class PcGts:
         self.page: Page = page
         self.mei_head_meta: MEIheadMeta = mei_head_meta
         self.version = version
+        # modification time and size of the stored file of the page this pcgts was loaded from or saved to
+        self.file_stamp: Optional[Tuple[int, int]] = None
         assert(version == PcGts.VERSION)
 
     def dataset_page(self) -> 'DatabasePage':
@@ -32,12 +34,10 @@ class PcGts:
         from database import DatabaseFile
         filename = file.local_path()
         try:
-            if filename.endswith(".json"):
-                import json
-                with open(filename, 'r') as f:
-                    pcgts = PcGts.from_json(json.load(f), file.page)
-            else:
-                raise Exception("Invalid file extension of file '{}'".format(filename))
+            # before reading, a later change of the file must not be attributed to the loaded version
+            stat = os.stat(filename)
+            pcgts = PcGts.from_json(PcGts.load_json(filename), file.page)
+            pcgts.file_stamp = stat.st_mtime_ns, stat.st_size
 
             if len(pcgts.page.image_filename) == 0:
                 pcgts.page.image_filename = DatabaseFile.file_definitions()['color_norm'].output[0]
@@ -46,16 +46,48 @@ class PcGts:
             logger.error("Error parsing PcGts of file {}".format(filename))
             raise e
 
-    def to_file(self, filename):
+    @staticmethod
+    def load_json(filename) -> dict:
+        # the json of a pcgts file in any of the storage formats
+        if filename.endswith(".json"):
+            import json
+            with open(filename, 'r') as f:
+                return json.load(f)
+        elif filename.endswith(".msgpack"):
+            from database.file_formats.pcgts.msgpackloader import loads
+            with open(filename, 'rb') as f:
+                return loads(f.read())
+        else:
+            raise Exception("Invalid file extension of file '{}'".format(filename))
+
+    def to_file(self, filename, j: Optional[dict] = None):
+        # j: the json of this pcgts if already computed
+        if j is None:
+            j = self.to_json()
         if filename.endswith(".json"):
             import json
             # first dump to keep file if an error occurs
-            s = json.dumps(self.to_json(), indent=2)
+            s = json.dumps(j, indent=2)
             with open(filename, 'w') as f:
                 f.write(s)
+        elif filename.endswith(".msgpack"):
+            from database.file_formats.pcgts.msgpackloader import dumps
+            b = dumps(j)
+            with open(filename, 'wb') as f:
+                f.write(b)
         else:
             raise Exception("Invalid file extension of file '{}'".format(filename))
 
+        page = self.page.location
+        if page is not None and os.path.abspath(filename) == os.path.abspath(page.file('pcgts').local_path()):
+            from database.database_book_page_states import DatabaseBookPageStates
+            from omr.dataset.dataset_cache import clear_dataset_cache
+            stat = os.stat(filename)
+            self.file_stamp = stat.st_mtime_ns, stat.st_size
+            DatabaseBookPageStates(page.book).update(page, pcgts=j)
+            # the extracted lines of the datasets are outdated
+            clear_dataset_cache(page)
+
     @staticmethod
     def from_json(json: dict, location: Optional['DatabasePage']):
         from database.file_formats.pcgts.jsonloader import update_pcgts
@@ -69,8 +101,7 @@ class PcGts:
             json.get('version', None),
         )
         if location:
-            image_shape = Image.open(location.file('color_original', True).local_path()).size
-            pcgts.page.image_width, pcgts.page.image_height = image_shape
+            pcgts.page.image_width, pcgts.page.image_height = location.image_size('color_original')
         return pcgts
 
     def to_json(self):
@@ -60,9 +60,15 @@ class Model:
     def exists(self, file: str = None) -> bool:
         return os.path.exists(self.local_file(file if file is not None else Model.META_FILE))
 
+    def invalidate_predictors(self):
+        # loaded predictors of other processes are invalidated by the changed modification time of the model
+        from omr.steps.predictorcache import predictor_cache
+        predictor_cache.invalidate(self.id())
+
     def delete(self):
         if self.exists(''):
             shutil.rmtree(self.path)
+            self.invalidate_predictors()
 
     def copy_to(self, target_model: 'Model', override=True):
         if not self.exists():
@@ -76,4 +82,5 @@ class Model:
         shutil.rmtree(target_model.path, ignore_errors=True)
         shutil.copytree(self.path, target_model.path)
         copyied_model.save_meta()
+        target_model.invalidate_predictors()
 
@@ -1,5 +1,6 @@
-from dataclasses import dataclass
-from typing import List
+from collections import Counter
+from dataclasses import dataclass, fields
+from typing import List, Iterable, TYPE_CHECKING
 
 from dataclasses_json import dataclass_json, LetterCase
 
@@ -8,6 +9,9 @@ from database.file_formats import PcGts
 from database.file_formats.pcgts import SymbolType
 from abc import ABC, abstractmethod
 
+if TYPE_CHECKING:
+    from database.database_book_page_states import PageState
+
 
 @dataclass_json(letter_case=LetterCase.CAMEL)
 @dataclass
@@ -20,6 +24,10 @@ class Counts:
     n_clefs: int = 0
     n_accids: int = 0
 
+    def add(self, other: 'Counts'):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
 
 class Callback(ABC):
     @abstractmethod
@@ -28,33 +36,67 @@ class Callback(ABC):
 
 
 def compute_books_statistics(books: List[DatabaseBook], ignore_page: List[str] = None, callback: Callback = None) -> Counts:
+    from database.database_book_page_states import DatabaseBookPageStates
     ignore_page = ignore_page if ignore_page else []
-    pages = sum([[page.pcgts() for page in book.pages() if not any([s in page.page for s in ignore_page])] for book in books], [])
-    return get_counts(pages, callback)
+    book_pages = [(book, [page for page in book.pages() if not any([s in page.page for s in ignore_page])]) for book in books]
+    n_pages = sum(len(pages) for _, pages in book_pages)
+    counts = Counts()
+
+    if callback:
+        callback.updated(counts, 0, n_pages)
+
+    # read from the page states index of each book, only pages whose pcgts changed are loaded
+    n_processed = 0
+    for book, pages in book_pages:
+        for state in DatabaseBookPageStates(book).page_states(pages).values():
+            counts.add(page_state_counts(state))
+            n_processed += 1
+            if callback:
+                callback.updated(counts, n_processed, n_pages)
+
+    return counts
 
 
 def compute_book_statistics(book: DatabaseBook, ignore_page: List[str] = None, callback: Callback = None) -> Counts:
     return compute_books_statistics([book], ignore_page, callback)
 
 
-def get_counts(pages: List[PcGts], callback: Callback = None) -> Counts:
+def page_state_counts(state: 'PageState') -> Counts:
+    return Counts(
+        n_pages=1,
+        n_staves=state.n_staves,
+        n_staff_lines=state.n_staff_lines,
+        n_symbols=state.n_symbols,
+        n_note_components=state.n_note_components,
+        n_clefs=state.n_clefs,
+        n_accids=state.n_accids,
+    )
+
+
+def pcgts_counts(pcgts: PcGts) -> Counts:
+    counts = Counts(n_pages=1)
+    mls = pcgts.page.all_music_lines()
+    counts.n_staves += len(mls)
+    for ml in mls:
+        counts.n_staff_lines += len(ml.staff_lines)
+        counts.n_symbols += len(ml.symbols)
+        types = Counter(s.symbol_type for s in ml.symbols)
+        counts.n_note_components += types[SymbolType.NOTE]
+        counts.n_clefs += types[SymbolType.CLEF]
+        counts.n_accids += types[SymbolType.ACCID]
+
+    return counts
+
+
+def get_counts(pages: Iterable[PcGts], callback: Callback = None) -> Counts:
+    pages = list(pages) if callback else pages
     counts = Counts()
 
     if callback:
         callback.updated(counts, 0, len(pages))
 
     for i, pcgts in enumerate(pages):
-        p = pcgts.page
-        counts.n_pages += 1
-        mls = p.all_music_lines()
-        counts.n_staves += len(mls)
-        for ml in mls:
-            counts.n_staff_lines += len(ml.staff_lines)
-            counts.n_symbols += len(ml.symbols)
-            counts.n_note_components += len([s for s in ml.symbols if s.symbol_type == SymbolType.NOTE])
-            counts.n_clefs += len([s for s in ml.symbols if s.symbol_type == SymbolType.CLEF])
-            counts.n_accids += len([s for s in ml.symbols if s.symbol_type == SymbolType.ACCID])
-
+        counts.add(pcgts_counts(pcgts))
         if callback:
             callback.updated(counts, i + 1, len(pages))
 
@@ -0,0 +1,80 @@
+from typing import List, Tuple, Optional, Callable
+from queue import Queue
+import multiprocessing
+import logging
+
+from database.database_page import DatabasePage
+from database.database_file import DatabaseFile
+
+logger = logging.getLogger(__name__)
+
+
+# derived images of the original that are required by the algorithms
+preprocessed_files = ['color_norm', 'color_norm_x2', 'color_highres_preproc', 'color_lowres_preproc', 'connected_components_norm']
+
+
+def _create_file(args: Tuple[DatabasePage, str]):
+    page, file_id = args
+    DatabaseFile(page, file_id).create()
+
+
+def create_derived_files(pages: List[DatabasePage],
+                         file_ids: List[str] = None,
+                         n_processes: int = 4,
+                         callback: Optional[Callable[[int, int], None]] = None,
+                         ) -> List[Tuple[DatabasePage, str, Exception]]:
+    """
+    Create the missing files of the pages (and their requirements) in a process pool.
+
+    The files of a page are created level by level of their dependencies, files of a level (e.g. the normalized and
+    the low res images) and files of different pages are created concurrently.
+    The callback receives the number of processed and total files, errors are returned instead of raised so that
+    the remaining pages are still processed.
+    """
+    levels = DatabaseFile.dependency_levels(file_ids if file_ids is not None else preprocessed_files)
+    n_total = len(pages) * sum(map(len, levels))
+    n_processed = 0
+    errors: List[Tuple[DatabasePage, str, Exception]] = []
+    if n_total == 0:
+        return errors
+
+    # the callbacks of the pool run in its result thread, results are passed to this thread
+    done: 'Queue[Tuple[int, str, Optional[Exception]]]' = Queue()
+    page_level = [0] * len(pages)
+    n_remaining = [0] * len(pages)
+
+    with multiprocessing.Pool(processes=n_processes) as pool:
+        def submit(page_idx: int):
+            level = levels[page_level[page_idx]]
+            n_remaining[page_idx] = len(level)
+            for file_id in level:
+                pool.apply_async(_create_file, ((pages[page_idx], file_id),),
+                                 callback=lambda _, p=page_idx, f=file_id: done.put((p, f, None)),
+                                 error_callback=lambda e, p=page_idx, f=file_id: done.put((p, f, e)))
+
+        for i in range(len(pages)):
+            submit(i)
+
+        n_running = len(pages)
+        while n_running > 0:
+            page_idx, file_id, error = done.get()
+            n_processed += 1
+            n_remaining[page_idx] -= 1
+            if error is not None:
+                logger.error('Could not create file {} of page {}: {}'.format(file_id, pages[page_idx].local_path(), error))
+                errors.append((pages[page_idx], file_id, error))
+
+            if n_remaining[page_idx] == 0:
+                failed = any(e[0] is pages[page_idx] for e in errors)
+                if failed or page_level[page_idx] + 1 == len(levels):
+                    # skip the files that require the failed ones
+                    n_processed += sum(map(len, levels[page_level[page_idx] + 1:]))
+                    n_running -= 1
+                else:
+                    page_level[page_idx] += 1
+                    submit(page_idx)
+
+            if callback:
+                callback(n_processed, n_total)
+
+    return errors
@@ -1,8 +1,14 @@
-from channels.routing import ProtocolTypeRouter
+from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
+from django.urls import path
+
+from restapi.consumers import TaskStatusConsumer
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     # (http->django views is added by default)
     'http': get_asgi_application(),
-})
\ No newline at end of file
+    'websocket': URLRouter([
+        path('api/tasks/status', TaskStatusConsumer.as_asgi()),
+    ]),
+})
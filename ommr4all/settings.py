@@ -67,6 +67,15 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ommr4all.wsgi.application'
 ASGI_APPLICATION = 'ommr4all.routing.application'
+TEST_RUNNER = 'ommr4all.testrunner.TestRunner'
+
+# The status of tasks is pushed to the WebSocket consumers of each process, by the dispatcher of the task queue and in
+# the other processes by polling the task store, so a layer per process suffices
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
@@ -251,3 +260,98 @@ class TaskOperationWatcherSettings(NamedTuple):
 TASK_OPERATION_WATCHER_SETTINGS = TaskOperationWatcherSettings(
     -1,  # Default off, set to time > 0 to enable
 )
+
+
+class PredictorCacheSettings(NamedTuple):
+    max_entries: int
+    max_memory_mb: int
+
+
+PREDICTOR_CACHE_SETTINGS = PredictorCacheSettings(
+    4,      # Number of loaded predictors kept per worker process, set to 0 to disable warm workers
+    4096,   # Memory budget of the loaded predictors per worker process, set to <= 0 for no limit
+)
+
+
+class DerivedFilesSettings(NamedTuple):
+    n_processes: int
+    on_upload: bool
+
+
+DERIVED_FILES_SETTINGS = DerivedFilesSettings(
+    4,      # Number of processes that create the derived images of the pages (e.g. binarization) concurrently
+    True,   # Create the derived images of uploaded pages in the background instead of on their first request
+)
+
+
+class PcGtsStorageSettings(NamedTuple):
+    format: str
+
+
+PCGTS_STORAGE_SETTINGS = PcGtsStorageSettings(
+    'json',     # 'json' or 'msgpack' (compact, coordinates as binary floats), pages in the other format are converted when loaded
+)
+
+
+class DatasetCacheSettings(NamedTuple):
+    enabled: bool
+    max_page_size_mb: float
+
+
+DATASET_CACHE_SETTINGS = DatasetCacheSettings(
+    True,   # Store the extracted line images of the datasets next to the pages, so that training and prediction on unchanged pages skip the extraction
+    500,    # Maximum size of the cached datasets of a page, the least recently written datasets are removed first
+)
+
+
+class DatasetStreamingSettings(NamedTuple):
+    max_buffer_memory_mb: int
+
+
+DATASET_STREAMING_SETTINGS = DatasetStreamingSettings(
+    1024,   # Memory budget of the pages of a streamed dataset kept for random access (e.g. shuffled training samples), least recently used pages are loaded again
+)
+
+
+class ImageCacheSettings(NamedTuple):
+    max_memory_mb: int
+    max_component_index_memory_mb: int
+
+
+IMAGE_CACHE_SETTINGS = ImageCacheSettings(
+    512,    # Memory budget of the decoded page images (e.g. gray_norm, binary_norm) kept per process, set to 0 to disable
+    64,     # Memory budget of the connected component indices of the pages edited with the component selector
+)
+
+
+class PcGtsBackupSettings(NamedTuple):
+    max_patch_ratio: float
+    max_snapshots: int
+
+
+PCGTS_BACKUP_SETTINGS = PcGtsBackupSettings(
+    1.0,    # A new snapshot of a page is stored once the patches since the last snapshot are larger than this ratio of the page
+    20,     # Number of snapshots (each with its following patches) kept per page, older ones are deleted
+)
+
+
+class TaskStoreSettings(NamedTuple):
+    backend: str
+    path: str
+    poll_interval: float
+
+
+TASK_STORE_SETTINGS = TaskStoreSettings(
+    'sqlite',   # 'sqlite' to share the task queue between all processes of the server on this host, 'memory' for a single process
+    os.path.join(BASE_DIR, 'tasks.sqlite3'),    # Database of the 'sqlite' backend
+    0.5,        # Interval in seconds in which the dispatcher checks for tasks put or stopped by other processes
+)
+
+
+class TaskStatusPushSettings(NamedTuple):
+    min_interval: float
+
+
+TASK_STATUS_PUSH_SETTINGS = TaskStatusPushSettings(
+    0.5,    # Minimum interval in seconds between two status updates of a task pushed over WebSockets (e.g. training progress), final states are pushed immediately
+)
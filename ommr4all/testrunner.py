@@ -0,0 +1,13 @@
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runner of the tests (manage.py test) that overrides the settings of a server the tests must not use, before the
+    test modules (and thus the operation worker) are imported.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        import ommr4all.settings as settings
+        # the tests run in a single process and must neither share nor persist the task queue of a server
+        settings.TASK_STORE_SETTINGS = settings.TASK_STORE_SETTINGS._replace(backend='memory')
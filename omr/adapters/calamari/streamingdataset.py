@@ -0,0 +1,42 @@
+from calamari_ocr.ocr.datasets.dataset import DataSet, DataSetMode, DatasetGenerator
+from typing import Iterable, Tuple, Optional, Generator
+import numpy as np
+import tempfile
+import os
+
+
+class StreamingLineDataSetGenerator(DatasetGenerator):
+    def _load_sample(self, sample, text_only) -> Generator[Tuple[Optional[np.ndarray], str], None, None]:
+        if text_only:
+            yield None, sample['text']
+        else:
+            yield np.load(sample['image_file']), sample['text']
+
+
+class StreamingLineDataSet(DataSet):
+    """
+    Calamari dataset whose line images are stored in temporary .npy files and are only read by the data generator.
+
+    Unlike the RawDataSet, the samples (which are sent to the generator process) only hold the file names, so that
+    neither this nor the generator process keeps all images in memory. Train with preload_training=False.
+    """
+    def __init__(self, mode: DataSetMode, lines: Iterable[Tuple[np.ndarray, Optional[str]]]):
+        super().__init__(mode)
+        # removed with this dataset
+        self.tmp_dir = tempfile.TemporaryDirectory(prefix='ommr4all_lines_')
+        for i, (image, text) in enumerate(lines):
+            image_file = os.path.join(self.tmp_dir.name, '{}.npy'.format(i))
+            np.save(image_file, image)
+            self.add_sample({
+                'image_file': image_file,
+                'text': text,
+                'id': str(i),
+            })
+
+        if len(self) == 0:
+            raise Exception("Empty data set provided.")
+
+        self.loaded = True
+
+    def create_generator(self, mp_context, output_queue) -> DatasetGenerator:
+        return StreamingLineDataSetGenerator(mp_context, output_queue, self.mode, self.samples())
@@ -3,7 +3,7 @@ from types import MappingProxyType
 
 from database.file_formats.pcgts import PcGts, Line, PageScaleReference, Point
 import numpy as np
-from typing import List, Tuple, Generator, Union, Optional, Any
+from typing import List, Tuple, Generator, Union, Optional, Any, Sequence
 from omr.dataset import RegionLineMaskData
 from tqdm import tqdm
 import logging
@@ -15,6 +15,7 @@ from dataclasses import dataclass, field
 from mashumaro import DataClassJSONMixin
 from enum import Enum
 
+import multiprocessing
 import json
 
 
@@ -94,6 +95,8 @@ class DatasetParams(DataClassJSONMixin):
     pad: Optional[List[int]] = None
     pad_power_of_2: Optional[int] = 3
     image_input: ImageInput = ImageInput.LINE_IMAGE
+    processes: int = 1  # number of processes that extract the lines of the pages
+    streaming: bool = False  # load the lines of training data on demand instead of keeping all in memory
 
     # staff line detection
     full_page: bool = True
@@ -144,13 +147,24 @@ class Dataset(ABC):
         self.files = pcgts
         self.loaded: Optional[List[Tuple[Line, np.ndarray]]] = None
         self.image_ops = self.__class__.create_image_operation_list(self.params)
+        from omr.dataset.dataset_cache import DatasetCache
+        self.cache = DatasetCache(self.__class__.__name__, self.image_ops, self.params)
 
     def local_to_global_pos(self, p: Point, params: List[Any]) -> Point:
         return self.image_ops.local_to_global_pos(p, params)
 
+    def local_to_global_points(self, points: np.ndarray, params: List[Any]) -> np.ndarray:
+        return self.image_ops.local_to_global_points(points, params)
+
     def to_page_segmentation_dataset(self, callback: Optional[DatasetCallback] = None):
         if self.params.origin_staff_line_distance == self.params.target_staff_line_distance:
             from ocr4all_pixel_classifier.lib.dataset import Dataset, SingleData
+            if self.params.streaming:
+                from omr.dataset.streaming import LazySingleData
+                lines = self.lines(callback)
+                return Dataset([LazySingleData(lines, i, self.params.image_input == ImageInput.LINE_IMAGE, self.params.origin_staff_line_distance)
+                                for i in range(len(lines))], {})
+
             return Dataset([SingleData(image=d.line_image if self.params.image_input == ImageInput.LINE_IMAGE else d.region,
                                        binary=((d.line_image < 125) * 255).astype(np.uint8),
                                        mask=d.mask,
@@ -165,7 +179,6 @@ class Dataset(ABC):
 
     def to_calamari_dataset(self, train=False, callback: Optional[DatasetCallback] = None):
         from calamari_ocr.ocr.datasets.dataset import RawDataSet, DataSetMode
-        marked_symbols = self.load(callback)
 
         def get_input_image(d: RegionLineMaskData):
             if self.params.cut_region:
@@ -177,16 +190,25 @@ class Dataset(ABC):
             else:
                 return d.region.transpose()
 
+        def get_gt(d: RegionLineMaskData):
+            if self.params.neume_types_only:
+                return d.calamari_sequence(self.params.calamari_codec).calamari_neume_types_str
+            else:
+                return d.calamari_sequence(self.params.calamari_codec).calamari_str
+
+        if train and self.params.streaming:
+            from omr.adapters.calamari.streamingdataset import StreamingLineDataSet
+            return StreamingLineDataSet(DataSetMode.TRAIN, ((get_input_image(d).astype(np.uint8), get_gt(d)) for d in self._load(callback)))
+
+        marked_symbols = self.load(callback)
         images = [get_input_image(d).astype(np.uint8) for d in marked_symbols]
-        if self.params.neume_types_only:
-            gts = [d.calamari_sequence(self.params.calamari_codec).calamari_neume_types_str for d in marked_symbols]
-        else:
-            gts = [d.calamari_sequence(self.params.calamari_codec).calamari_str for d in marked_symbols]
+        gts = [get_gt(d) for d in marked_symbols]
         return RawDataSet(DataSetMode.TRAIN if train else DataSetMode.PREDICT, images=images, texts=gts)
 
-    def to_text_line_calamari_dataset(self, train=False, callback: Optional[DatasetCallback] = None):
+    def to_text_line_calamari_dataset(self, train=False, callback: Optional[DatasetCallback] = None,
+                                      lines: Optional[List[RegionLineMaskData]] = None):
+        # lines: a subset of the lines (e.g. of one page) instead of all lines of the dataset
         from calamari_ocr.ocr.datasets.dataset import RawDataSet, DataSetMode
-        lines = self.load(callback)
 
         def get_input_image(d: RegionLineMaskData):
             if self.params.cut_region:
@@ -201,6 +223,12 @@ class Dataset(ABC):
             text = data.operation.text_line.text(with_drop_capital=False)
             return LyricsNormalizationProcessor(self.params.lyrics_normalization).apply(text)
 
+        if train and self.params.streaming:
+            from omr.adapters.calamari.streamingdataset import StreamingLineDataSet
+            return StreamingLineDataSet(DataSetMode.TRAIN, ((255 - get_input_image(d).astype(np.uint8), extract_text(d)) for d in self._load(callback)))
+
+        if lines is None:
+            lines = self.load(callback)
         images = [255 - get_input_image(d).astype(np.uint8) for d in lines]
         gts = [extract_text(d) for d in lines]
         return RawDataSet(DataSetMode.TRAIN if train else DataSetMode.PREDICT, images=images, texts=gts)
@@ -211,19 +239,84 @@ class Dataset(ABC):
 
         return self.loaded
 
+    def lines(self, callback: Optional[DatasetCallback] = None) -> Sequence[RegionLineMaskData]:
+        # all lines, loaded on demand in streaming mode
+        if self.params.streaming and self.loaded is None:
+            from omr.dataset.streaming import LazyLines
+            return LazyLines(self, callback)
+
+        return self.load(callback)
+
+    def page_lines(self, callback: Optional[DatasetCallback] = None) -> Generator[List[RegionLineMaskData], None, None]:
+        # the lines of each page in order, only one page is held at a time
+        for outputs in self.iter_pages([self.cache.key(f) for f in self.files], callback):
+            yield [RegionLineMaskData(output) for output in outputs]
+
     def _load(self, callback: Optional[DatasetCallback]) -> Generator[RegionLineMaskData, None, None]:
+        for lines in self.page_lines(callback):
+            yield from lines
+
+    def iter_pages(self, keys: List[Optional[str]], callback: Optional[DatasetCallback] = None) -> Generator[List[ImageOperationData], None, None]:
+        # the outputs of each page in order, the keys are those of the dataset cache
         def wrapper(g):
             if callback:
                 return callback.apply(g, total=len(self.files))
             return g
 
-        for f in tqdm(wrapper(self.files), total=len(self.files), desc="Loading Dataset"):
-            try:
-                input = ImageOperationData([], self.params.page_scale_reference, page=f.page, pcgts=f)
-                for outputs in self.image_ops.apply_single(input):
-                    yield RegionLineMaskData(outputs)
-            except (NoStaffsAvailable, NoStaffLinesAvailable):
-                pass
-            except Exception as e:
-                logger.exception("Exception during processing of page: {}".format(f.page.location.local_path()))
-                raise e
+        if self.params.processes > 1 and self.image_ops.cache_key() is not None:
+            pages = self._load_pages_parallel(keys)
+        else:
+            # operations that can not be cached (e.g. applying a model) hold a state, apply them in this process
+            pages = self._load_pages(keys)
+
+        yield from tqdm(wrapper(pages), total=len(self.files), desc="Loading Dataset")
+
+    def load_page(self, page_idx: int, key: Optional[str]) -> List[ImageOperationData]:
+        f = self.files[page_idx]
+        outputs = self.cache.load(f, key, self.params.page_scale_reference)
+        if outputs is None:
+            outputs = _apply_image_ops(self.image_ops, self.params.page_scale_reference, f)
+            self.cache.save(f, key, outputs)
+
+        return outputs
+
+    def _load_pages(self, keys: List[Optional[str]]) -> Generator[List[ImageOperationData], None, None]:
+        for page_idx, key in enumerate(keys):
+            yield self.load_page(page_idx, key)
+
+    def _load_pages_parallel(self, keys: List[Optional[str]]) -> Generator[List[ImageOperationData], None, None]:
+        from omr.dataset.dataset_cache import attach_outputs
+        scale_reference = self.params.page_scale_reference
+        cached = [self.cache.load(f, key, scale_reference) for f, key in zip(self.files, keys)]
+        missing = [f for f, outputs in zip(self.files, cached) if outputs is None]
+        if len(missing) <= 1:
+            yield from self._load_pages(keys)
+            return
+
+        # the outputs are transferred in their detached form and attached to the pcgts of this process, the order
+        # of the pages is kept
+        with multiprocessing.Pool(processes=min(self.params.processes, len(missing))) as pool:
+            results = pool.imap(_apply_image_ops_detached, [(self.image_ops, scale_reference, f) for f in missing])
+            for f, key, outputs in zip(self.files, keys, cached):
+                if outputs is None:
+                    data, arrays = next(results)
+                    self.cache.save_detached(f, key, data, arrays)
+                    outputs = attach_outputs(data, arrays.__getitem__, f, scale_reference)
+
+                yield outputs
+
+
+def _apply_image_ops(image_ops: ImageOperationList, scale_reference: PageScaleReference, f: PcGts) -> List[ImageOperationData]:
+    try:
+        input = ImageOperationData([], scale_reference, page=f.page, pcgts=f)
+        return image_ops.apply_single(input)
+    except (NoStaffsAvailable, NoStaffLinesAvailable):
+        return []
+    except Exception as e:
+        logger.exception("Exception during processing of page: {}".format(f.page.location.local_path()))
+        raise e
+
+
+def _apply_image_ops_detached(args: Tuple[ImageOperationList, PageScaleReference, PcGts]) -> Tuple[List[dict], List[np.ndarray]]:
+    from omr.dataset.dataset_cache import detach_outputs
+    return detach_outputs(_apply_image_ops(*args))
@@ -0,0 +1,228 @@
+from typing import List, Optional, Tuple, Callable, TYPE_CHECKING
+import numpy as np
+import hashlib
+import logging
+import pickle
+import shutil
+import json
+import uuid
+import os
+
+from database.file_formats.pcgts import PcGts, PageScaleReference
+from omr.imageoperations import ImageOperationList, ImageOperationData, ImageData
+from ommr4all.settings import DATASET_CACHE_SETTINGS
+
+if TYPE_CHECKING:
+    from database import DatabasePage
+    from omr.dataset import DatasetParams
+
+logger = logging.getLogger(__name__)
+
+# directory of the cached outputs of a page, within the directory of the page
+DATASET_CACHE_DIR = 'dataset_cache'
+
+# part of every key, increase whenever the outputs of the image operations or datasets change
+DATASET_CACHE_VERSION = 1
+
+
+def clear_dataset_cache(page: 'DatabasePage'):
+    shutil.rmtree(page.local_file_path(DATASET_CACHE_DIR), ignore_errors=True)
+
+
+def _dir_size(path: str) -> int:
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for f in files:
+            try:
+                size += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return size
+
+
+def _remove_entries(path: str, keep: Optional[str] = None):
+    # remove all entries in path except keep, and the temporary directories that are still written
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return
+
+    for name in names:
+        if name != keep and not name.startswith('.'):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def limit_dataset_cache(page: 'DatabasePage', max_size_mb: float, keep: Optional[str] = None):
+    # remove the least recently written entries of the datasets until the cache of the page fits in max_size_mb
+    cache_dir = page.local_file_path(DATASET_CACHE_DIR)
+    try:
+        slots = [os.path.join(cache_dir, s) for s in os.listdir(cache_dir) if not s.startswith('.')]
+    except FileNotFoundError:
+        return
+
+    sizes = {s: _dir_size(s) for s in slots}
+    total = sum(sizes.values())
+    for slot in sorted(slots, key=lambda s: os.stat(s).st_mtime_ns):
+        if total <= max_size_mb * 1024 * 1024:
+            break
+        if os.path.basename(slot) == keep:
+            continue
+
+        shutil.rmtree(slot, ignore_errors=True)
+        total -= sizes[slot]
+
+
+def detach_outputs(outputs: List[ImageOperationData]) -> Tuple[List[dict], List[np.ndarray]]:
+    # picklable form of the outputs that refers to the arrays by index and to the lines and blocks by their id
+    arrays: List[np.ndarray] = []
+    indices = {}
+
+    def array(a: Optional[np.ndarray]) -> Optional[int]:
+        if a is None:
+            return None
+        if id(a) not in indices:
+            # arrays shared by outputs (e.g. the page image) are stored once
+            indices[id(a)] = len(arrays)
+            arrays.append(np.asarray(a))
+        return indices[id(a)]
+
+    def line_id(l):
+        return l.id if l is not None else None
+
+    return [{
+        'images': [(array(d.image), d.nearest_neighbour_rescale) for d in o.images],
+        'params': o.params,
+        'page_image': array(o.page_image),
+        'music_region': line_id(o.music_region),
+        'music_line': line_id(o.music_line),
+        'music_lines': [l.id for l in o.music_lines] if o.music_lines is not None else None,
+        'text_line': line_id(o.text_line),
+    } for o in outputs], arrays
+
+
+def attach_outputs(data: List[dict], array: Callable[[int], np.ndarray], pcgts: PcGts,
+                   scale_reference: PageScaleReference) -> List[ImageOperationData]:
+    # inverse of detach_outputs, lines and blocks are resolved in the given pcgts
+    page = pcgts.page
+    return [ImageOperationData(
+        images=[ImageData(array(i), nn) for i, nn in o['images']],
+        scale_reference=scale_reference,
+        params=o['params'],
+        pcgts=pcgts,
+        page=page,
+        page_image=array(o['page_image']) if o['page_image'] is not None else None,
+        music_region=page.block_by_id(o['music_region']) if o['music_region'] else None,
+        music_line=page.line_by_id(o['music_line']) if o['music_line'] else None,
+        music_lines=[page.line_by_id(l) for l in o['music_lines']] if o['music_lines'] is not None else None,
+        text_line=page.line_by_id(o['text_line']) if o['text_line'] else None,
+    ) for o in data]
+
+
+class DatasetCache:
+    """
+    On disk cache of the outputs of the image operations of a dataset for each page.
+
+    An entry is identified by a hash of the stored pcgts (its modification time and size, the content if it was not
+    loaded from the file of its page), the modification times of the images read by the operations, the dataset params,
+    the operations and DATASET_CACHE_VERSION, so any change of these leads to a new entry. Changes of a loaded pcgts must
+    be saved before its dataset is loaded.
+    Only the latest entry of a dataset (params and operations) is kept per page, the least recently written datasets
+    are removed if the cache of a page exceeds DATASET_CACHE_SETTINGS.max_page_size_mb.
+    The images of an entry are stored as .npy files and are loaded as copy-on-write memory maps.
+    """
+    def __init__(self, name: str, image_ops: ImageOperationList, params: 'DatasetParams'):
+        self.image_ops = image_ops
+        ops_key = image_ops.cache_key()
+        if ops_key is None or not DATASET_CACHE_SETTINGS.enabled:
+            self.base_key = None
+        else:
+            # the codec is extended during training, none of these affect the images
+            params_dict = params.to_dict()
+            for k in ['calamari_codec', 'processes', 'streaming']:
+                params_dict.pop(k, None)
+            dataset_key = name + json.dumps(params_dict, sort_keys=True, default=str) + ops_key
+            self.base_key = '{}:{}'.format(DATASET_CACHE_VERSION, dataset_key)
+            # directory of the entries of this dataset, independent of the version so that new entries replace old ones
+            self.slot = hashlib.sha1(dataset_key.encode('utf-8')).hexdigest()
+
+    def key(self, pcgts: PcGts) -> Optional[str]:
+        if self.base_key is None or pcgts.page.location is None:
+            return None
+
+        page = pcgts.page.location
+        h = hashlib.sha1(self.base_key.encode('utf-8'))
+        if pcgts.file_stamp is not None:
+            h.update('pcgts:{}:{}'.format(*pcgts.file_stamp).encode('utf-8'))
+        else:
+            h.update(json.dumps(pcgts.to_json(), sort_keys=True).encode('utf-8'))
+        for file_id in self.image_ops.page_files():
+            h.update('{}:{}'.format(file_id, os.stat(page.file(file_id, create_if_not_existing=True).local_path()).st_mtime_ns).encode('utf-8'))
+        return os.path.join(self.slot, h.hexdigest())
+
+    @staticmethod
+    def _path(pcgts: PcGts, key: str) -> str:
+        return pcgts.page.location.local_file_path(os.path.join(DATASET_CACHE_DIR, key))
+
+    def load(self, pcgts: PcGts, key: Optional[str], scale_reference: PageScaleReference) -> Optional[List[ImageOperationData]]:
+        if key is None:
+            return None
+
+        path = self._path(pcgts, key)
+        try:
+            with open(os.path.join(path, 'outputs.pkl'), 'rb') as f:
+                outputs = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning('Invalid dataset cache entry at {}: {}'.format(path, e))
+            return None
+
+        arrays = {}
+
+        def array(i: int) -> np.ndarray:
+            if i not in arrays:
+                file = os.path.join(path, '{}.npy'.format(i))
+                try:
+                    arrays[i] = np.load(file, mmap_mode='c')
+                except ValueError:
+                    # empty arrays can not be mapped
+                    arrays[i] = np.load(file)
+            return arrays[i]
+
+        return attach_outputs(outputs, array, pcgts, scale_reference)
+
+    def save(self, pcgts: PcGts, key: Optional[str], outputs: List[ImageOperationData]):
+        if key is None:
+            return
+
+        self.save_detached(pcgts, key, *detach_outputs(outputs))
+
+    def save_detached(self, pcgts: PcGts, key: Optional[str], data: List[dict], arrays: List[np.ndarray]):
+        if key is None:
+            return
+
+        path = self._path(pcgts, key)
+        if os.path.exists(path):
+            return
+
+        # write to a temporary directory that is renamed when complete
+        slot_path, entry = os.path.split(path)
+        tmp_path = os.path.join(slot_path, '.{}.{}'.format(entry, uuid.uuid4().hex))
+        os.makedirs(tmp_path)
+        try:
+            for i, a in enumerate(arrays):
+                np.save(os.path.join(tmp_path, '{}.npy'.format(i)), a)
+            with open(os.path.join(tmp_path, 'outputs.pkl'), 'wb') as f:
+                pickle.dump(data, f)
+
+            os.rename(tmp_path, path)
+
+            # the previous entries of this dataset are outdated
+            _remove_entries(slot_path, keep=entry)
+            limit_dataset_cache(pcgts.page.location, DATASET_CACHE_SETTINGS.max_page_size_mb,
+                                keep=os.path.basename(slot_path))
+        except Exception as e:
+            # e.g. written concurrently by another process, the cache must not break the loading of the dataset
+            logger.warning('Could not write dataset cache entry at {}: {}'.format(path, e))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
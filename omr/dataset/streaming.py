@@ -0,0 +1,129 @@
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional, TYPE_CHECKING
+import numpy as np
+
+from omr.dataset.datastructs import RegionLineMaskData
+from ommr4all.settings import DATASET_STREAMING_SETTINGS
+
+if TYPE_CHECKING:
+    from omr.dataset.dataset import Dataset, DatasetCallback
+
+
+def _page_bytes(lines: List[RegionLineMaskData]) -> int:
+    # memory of the images of the lines of a page, arrays shared by the lines (e.g. the page image) are counted once
+    arrays = {}
+    for l in lines:
+        for a in [d.image for d in l.operation.images] + [l.operation.page_image]:
+            if a is not None:
+                arrays[id(a)] = a.nbytes
+    return sum(arrays.values())
+
+
+class LazyLines(Sequence):
+    """
+    The lines of a dataset, loaded on demand instead of keeping all of them in memory.
+
+    The pages are processed once to index their lines (which also fills the dataset cache). Afterwards the least
+    recently used pages are kept in memory up to max_buffer_memory_mb, so that random access (e.g. the shuffled samples
+    of a training) rarely loads a page again. Pages in the dataset cache are memory mapped, others are processed again.
+    Iterating goes in page order and prefetches the next buffer_size pages in a background thread.
+    """
+    def __init__(self, dataset: 'Dataset', callback: Optional['DatasetCallback'] = None, buffer_size: int = 4,
+                 max_buffer_memory_mb: float = DATASET_STREAMING_SETTINGS.max_buffer_memory_mb):
+        self.dataset = dataset
+        self.buffer_size = max(1, buffer_size)
+        self.max_buffer_memory_mb = max_buffer_memory_mb
+        self.keys = [dataset.cache.key(f) for f in dataset.files]
+        self.index: List[Tuple[int, int]] = []
+        for page_idx, outputs in enumerate(dataset.iter_pages(self.keys, callback)):
+            self.index += [(page_idx, i) for i in range(len(outputs))]
+
+        self.buffer: 'OrderedDict[int, Tuple[List[RegionLineMaskData], int]]' = OrderedDict()   # lines and their size
+        self.buffer_bytes = 0
+
+    def _load_page(self, page_idx: int) -> List[RegionLineMaskData]:
+        return list(map(RegionLineMaskData, self.dataset.load_page(page_idx, self.keys[page_idx])))
+
+    def page(self, page_idx: int) -> List[RegionLineMaskData]:
+        if page_idx in self.buffer:
+            self.buffer.move_to_end(page_idx)
+            return self.buffer[page_idx][0]
+
+        lines = self._load_page(page_idx)
+        size = _page_bytes(lines)
+        self.buffer[page_idx] = lines, size
+        self.buffer_bytes += size
+        # the requested page is always kept
+        while len(self.buffer) > 1 and self.buffer_bytes > self.max_buffer_memory_mb * 1024 * 1024:
+            _, (_, evicted) = self.buffer.popitem(last=False)
+            self.buffer_bytes -= evicted
+
+        return lines
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i: int) -> RegionLineMaskData:
+        page_idx, line_idx = self.index[i]
+        return self.page(page_idx)[line_idx]
+
+    def __iter__(self):
+        # pages that are buffered are not loaded again
+        def load(page_idx: int) -> List[RegionLineMaskData]:
+            buffered = self.buffer.get(page_idx)
+            return buffered[0] if buffered is not None else self._load_page(page_idx)
+
+        pages = sorted(set(page_idx for page_idx, _ in self.index))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futures = deque(executor.submit(load, p) for p in pages[:self.buffer_size])
+            for next_page in pages[self.buffer_size:] + [None] * len(futures):
+                lines = futures.popleft().result()
+                if next_page is not None:
+                    futures.append(executor.submit(load, next_page))
+
+                yield from lines
+
+
+class LazySingleData:
+    """
+    Sample of the pixel classifier (see SingleData of ocr4all_pixel_classifier) whose images are loaded on access.
+    """
+    def __init__(self, lines: LazyLines, i: int, line_image_input: bool, line_height_px: Optional[int]):
+        self.lines = lines
+        self.i = i
+        self.line_image_input = line_image_input
+        self._line_height_px = line_height_px
+        self.orig_binary = None
+        self.image_path = None
+        self.binary_path = None
+        self.mask_path = None
+        self.output_path = None
+
+    @property
+    def user_data(self) -> RegionLineMaskData:
+        return self.lines[self.i]
+
+    @property
+    def image(self) -> np.ndarray:
+        d = self.user_data
+        return d.line_image if self.line_image_input else d.region
+
+    @property
+    def binary(self) -> np.ndarray:
+        return ((self.user_data.line_image < 125) * 255).astype(np.uint8)
+
+    @property
+    def mask(self) -> np.ndarray:
+        return self.user_data.mask
+
+    @property
+    def original_shape(self) -> Tuple[int, int]:
+        return self.user_data.line_image.shape
+
+    @property
+    def line_height_px(self) -> int:
+        if self._line_height_px is not None:
+            return self._line_height_px
+        return self.user_data.operation.page.avg_staff_line_distance()
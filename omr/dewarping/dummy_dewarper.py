@@ -97,6 +97,69 @@ def transform(point, staffs: List[List[Coords]]):
 
 
 def transform_grid(dst_grid, staves: List[List[Coords]], shape):
+    # vectorized version of applying transform to all inner vertices of the grid, the result is identical
+    src_grid = dst_grid.copy()
+    x, y = src_grid[:, :, 0], src_grid[:, :, 1]
+    inner = (shape[0] - 1 > x) & (x > 0) & (shape[1] - 1 > y) & (y > 0)
+    if not inner.any():
+        return src_grid
+
+    if len(staves) == 0:
+        raise NoStaffsAvailable
+
+    staff_lines = [staff_line for staff in staves for staff_line in staff]
+    if len(staff_lines) == 0:
+        raise NoStaffLinesAvailable
+
+    x, y = x[inner], y[inner]
+    lines_y = np.stack([staff_line.interpolate_y(x) for staff_line in staff_lines])   # n_lines x n_vertices
+    centers_y = np.array([staff_line.center_y() for staff_line in staff_lines])
+
+    # closest line above and below (the first one on ties), distances are capped as in transform
+    with np.errstate(invalid='ignore'):
+        top_d = np.where(lines_y < y, y - lines_y, np.inf)
+        bot_d = np.where(lines_y > y, lines_y - y, np.inf)
+    top_idx, bot_idx = np.argmin(top_d, axis=0), np.argmin(bot_d, axis=0)
+    top_d, bot_d = np.min(top_d, axis=0), np.min(bot_d, axis=0)
+    top_found, bot_found = top_d < 10000000, bot_d < 10000000
+
+    # missing lines are replaced by the other one
+    use_bot = top_d > 1000000
+    use_top = ~use_bot & (bot_d > 1000000)
+    top_idx, top_found = np.where(use_bot, bot_idx, top_idx), np.where(use_bot, bot_found, top_found)
+    bot_idx, bot_found = np.where(use_top, top_idx, bot_idx), np.where(use_top, top_found, bot_found)
+    if not (top_found & bot_found).all():
+        raise NoStaffLinesAvailable
+
+    vertices = np.arange(len(x))
+    top_y, bot_y = lines_y[top_idx, vertices], lines_y[bot_idx, vertices]
+    top_offset, bot_offset = centers_y[top_idx] - top_y, centers_y[bot_idx] - bot_y
+
+    # np.interp(y, [top_y, bot_y], [top_offset, bot_offset]) evaluated the same way numpy does
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (bot_offset - top_offset) / (bot_y - top_y)
+        interp_y = np.where(y >= bot_y, bot_offset,
+                            np.where(y <= top_y, top_offset, slope * (y - top_y) + top_offset))
+
+    src_grid[:, :, 1][inner] = y - interp_y
+    return src_grid
+
+
+def grid_to_mesh(src_grid, dst_grid):
+    assert(src_grid.shape == dst_grid.shape)
+    # vertices of all quads (top left, bottom left, bottom right, top right), in row major order of the cells
+    def quads(grid):
+        return np.concatenate([grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]], axis=-1).reshape(-1, 8)
+
+    src_quads, dst_quads = quads(src_grid), quads(dst_grid)
+    assert((dst_quads[:, 0] == dst_quads[:, 2]).all() and (dst_quads[:, 1] == dst_quads[:, 7]).all()
+           and (dst_quads[:, 4] == dst_quads[:, 6]).all() and (dst_quads[:, 3] == dst_quads[:, 5]).all())
+    dst_rects = dst_quads[:, [0, 1, 4, 3]]
+    return [[tuple(dst_rect), src_quad] for dst_rect, src_quad in zip(dst_rects.tolist(), src_quads.tolist())]
+
+
+def transform_grid_iterative(dst_grid, staves: List[List[Coords]], shape):
+    # reference implementation of transform_grid
     src_grid = dst_grid.copy()
 
     for idx in np.ndindex(src_grid.shape[:2]):
@@ -108,7 +171,8 @@ def transform_grid(dst_grid, staves: List[List[Coords]], shape):
     return src_grid
 
 
-def grid_to_mesh(src_grid, dst_grid):
+def grid_to_mesh_iterative(src_grid, dst_grid):
+    # reference implementation of grid_to_mesh
     assert(src_grid.shape == dst_grid.shape)
     mesh = []
     for i in range(src_grid.shape[0] - 1):
@@ -27,3 +27,10 @@ class ImageApplyFCN(ImageOperation):
 
     def local_to_global_pos(self, p, params):
         return p
+
+    def local_to_global_points(self, points, params):
+        return points
+
+    def cache_key(self):
+        # the model might be retrained under the same path
+        return None
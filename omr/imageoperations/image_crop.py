@@ -27,30 +27,34 @@ class ImageCropToSmallestBoxOperation(ImageOperation):
         elif isinstance(pad, int):
             self.pad = (pad, pad, pad, pad)
         elif pad is None:
-            self.pad = 0
+            self.pad = (0, 0, 0, 0)
         else:
             raise TypeError("Invalid type of pad: {}. Only int or tuple is supported".format(type(pad)))
 
-    def apply_single(self, data: ImageOperationData) -> OperationOutput:
-        def smallestbox(a, datas) -> Tuple[List[np.ndarray], Rect]:
-            r = a.any(1)
-            m, n = a.shape
-            c = a.any(0)
-            q, w, e, r = (r.argmax(), m - r[::-1].argmax(), c.argmax(), n - c[::-1].argmax())
-            q = max(0, q - self.pad[0])
-            w = min(m, w + self.pad[2])
-            e = max(0, e - self.pad[3])
-            r = min(n, r + self.pad[1])
-            return [d[q:w, e:r] for d in datas], Rect(q, w, e, r)
-
-        imgs, r = smallestbox(data.images[0].image, [d.image for d in data])
-        data.images = [ImageData(i, d.nearest_neighbour_rescale) for d, i in zip(data, imgs)]
-        data.params = r
+    def padded_rect(self, t: int, b: int, l: int, r: int, shape) -> Rect:
+        # rect of the box (exclusive bottom and right) including the padding, clipped to the image of the shape
+        m, n = shape[0:2]
+        return Rect(max(0, t - self.pad[0]), min(m, b + self.pad[2]), max(0, l - self.pad[3]), min(n, r + self.pad[1]))
+
+    def crop(self, data: ImageOperationData, rect: Rect) -> OperationOutput:
+        # the cropped images are views of the original ones
+        data.images = [ImageData(d.image[rect.t:rect.b, rect.l:rect.r], d.nearest_neighbour_rescale) for d in data]
+        data.params = rect
         return [data]
 
+    def apply_single(self, data: ImageOperationData) -> OperationOutput:
+        a = data.images[0].image
+        rows, cols = a.any(1), a.any(0)
+        m, n = a.shape
+        return self.crop(data, self.padded_rect(rows.argmax(), m - rows[::-1].argmax(), cols.argmax(), n - cols[::-1].argmax(), a.shape))
+
     def local_to_global_pos(self, p: Point, params: Any) -> Point:
         r: Rect = params
-        return Point(p.x + r.l, p.y + p.t)
+        return Point(p.x + r.l, p.y + r.t)
+
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        r: Rect = params
+        return points + (r.l, r.t)
 
 
 def calculate_padding(image: np.ndarray, scaling_factor: int) -> Tuple[Tuple[int, int], Tuple[int, int]]:
@@ -83,9 +87,13 @@ class ImagePadToPowerOf2(ImageOperation):
                 return ImageData(np.pad(d.image, p + ((0, 0), ), 'edge'), d.nearest_neighbour_rescale)
 
         pad = calculate_padding(data.images[0].image, 2 ** self.power)
-        data.images = [pad_image(d, pad) for d in data]
+        if pad != ((0, 0), (0, 0)):
+            data.images = [pad_image(d, pad) for d in data]
         data.params = pad
         return [data]
 
     def local_to_global_pos(self, p: Point, params: Any) -> Point:
         return p  # added at bottom right, thus position does not change
+
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        return points
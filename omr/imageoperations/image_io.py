@@ -1,8 +1,6 @@
 from . import ImageOperation, ImageOperationData, OperationOutput, ImageData
 from copy import copy
-from PIL import Image
 import numpy as np
-import PIL.ImageOps
 from typing import List, Tuple
 
 
@@ -18,13 +16,20 @@ class ImageLoadFromPageOperation(ImageOperation):
         book_page = data.page.location
         d.images = []
         for file, nn_rescale in self.files:
-            img = Image.open(book_page.file(file, create_if_not_existing=True).local_path())
+            # shared decoded image, read-only unless inverted
+            img = book_page.file(file, create_if_not_existing=True).image()
             if self.invert:
-                img = PIL.ImageOps.invert(img)
+                img = np.invert(img)
 
-            d.images.append(ImageData(np.array(img), nn_rescale))
+            d.images.append(ImageData(img, nn_rescale))
         d.params = None
         return [d]
 
     def local_to_global_pos(self, p, params):
         return p
+
+    def local_to_global_points(self, points, params):
+        return points
+
+    def page_files(self) -> List[str]:
+        return [file for file, _ in self.files]
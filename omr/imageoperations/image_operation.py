@@ -44,6 +44,28 @@ class ImageOperation(ABC):
     def local_to_global_pos(self, p: Point, params: Any) -> Point:
         return p
 
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        # local_to_global_pos of all (x, y) rows of a (N, 2) array, operations override this with a vectorized version
+        return np.array([self.local_to_global_pos(Point(p), params).p for p in points], dtype=float).reshape((-1, 2))
+
+    def cache_key(self) -> Optional[str]:
+        # description of the operation that determines its outputs (for the dataset cache), None if not cacheable
+        def key(v):
+            if isinstance(v, ImageOperation):
+                return v.cache_key()
+            elif isinstance(v, (set, frozenset)):
+                return repr(sorted(map(repr, v)))
+            return repr(v)
+
+        values = {k: key(v) for k, v in vars(self).items()}
+        if any(v is None for v in values.values()):
+            return None
+        return '{}({})'.format(self.__class__.__name__, ', '.join('{}={}'.format(k, v) for k, v in sorted(values.items())))
+
+    def page_files(self) -> List[str]:
+        # ids of the files of the page that are read by this operation
+        return []
+
 
 class ImageOperationList(ImageOperation):
     def __init__(self, operations: List[ImageOperation]):
@@ -56,8 +78,10 @@ class ImageOperationList(ImageOperation):
         for op in self.operations:
             out = []
             for d in data:
-                for o in op.apply_single(copy(d)):
-                    o.params = d.params + [o.params]
+                # the intermediate data is owned by this list, so the operation may modify and return it without a copy
+                params = d.params
+                for o in op.apply_single(d):
+                    o.params = params + [o.params]
                     out.append(o)
 
             data = out
@@ -70,5 +94,20 @@ class ImageOperationList(ImageOperation):
 
         return p
 
+    def local_to_global_points(self, points: np.ndarray, params: List[Any]) -> np.ndarray:
+        for op, param in zip(reversed(self.operations), reversed(params)):
+            points = op.local_to_global_points(points, param)
+
+        return points
+
+    def cache_key(self) -> Optional[str]:
+        keys = [op.cache_key() for op in self.operations]
+        if any(k is None for k in keys):
+            return None
+        return '[{}]'.format(', '.join(keys))
+
+    def page_files(self) -> List[str]:
+        return sum([op.page_files() for op in self.operations], [])
+
 
 
@@ -1,4 +1,4 @@
-from . import ImageOperation, ImageOperationData, OperationOutput
+from . import ImageOperation, ImageOperationData, OperationOutput, ImageData
 from database.file_formats.pcgts import BlockType
 from copy import copy
 from typing import List
@@ -17,6 +17,8 @@ class ImageDrawRegions(ImageOperation):
 
         if self.music_region or len(self.block_types) > 0:
             page = data.page
+            # the loaded images might be shared (read-only), draw on copies
+            d.images = [ImageData(i.image.copy(), i.nearest_neighbour_rescale) for i in d.images]
             for image_data in d.images:
                 image = image_data.image
                 if self.music_region:
@@ -34,3 +36,6 @@ class ImageDrawRegions(ImageOperation):
 
     def local_to_global_pos(self, p, params):
         return p
+
+    def local_to_global_points(self, points, params):
+        return points
@@ -19,6 +19,9 @@ class ImageScaleOperation(ImageOperation):
     def local_to_global_pos(self, p: Point, params: Any) -> Point:
         return Point(p.x / self.factor, p.y / self.factor)
 
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        return points / self.factor
+
 
 class ImageRescaleToHeightOperation(ImageOperation):
     def __init__(self, height):
@@ -36,6 +39,10 @@ class ImageRescaleToHeightOperation(ImageOperation):
         scale, = params
         return Point(p.x / scale, p.y / scale)
 
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        scale, = params
+        return points / scale
+
     @staticmethod
     def scale_to_h(img, target_height, order=1, cval=0):
         assert(img.dtype == np.uint8)
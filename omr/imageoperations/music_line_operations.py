@@ -3,6 +3,7 @@ from omr.imageoperations.image_crop import ImageCropToSmallestBoxOperation
 from typing import Tuple, List, Any, Optional
 from database.file_formats.pcgts import Page, PageScaleReference, Line, MusicSymbol, ClefType, AccidType, GraphicalConnectionType, Coords, SymbolType
 import numpy as np
+from scipy.ndimage import find_objects
 from PIL import Image
 from copy import copy
 from enum import IntEnum
@@ -117,6 +118,13 @@ class ImageExtractStaffLineImages(ImageOperation):
             # default operations
             return Point(p.x + l, t + p.y)
 
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        if self.full_page:
+            return points
+        else:
+            i, (t, b, l, r) = params
+            return points + (l, t)
+
 
 class ImageExtractDewarpedStaffLineImages(ImageOperation):
     def __init__(self, dewarp, cut_region, pad, center, staff_lines_only):
@@ -170,28 +178,33 @@ class ImageExtractDewarpedStaffLineImages(ImageOperation):
             ax[1].imshow(dew_labels)
             plt.show()
 
+        # bounding boxes of all labels in one pass, the masks are only computed within these boxes
+        boxes = find_objects(dew_labels)
+
         i = 1
         out = []
         for mr in data.page.music_blocks():
             for ml in mr.lines:
-                mask = dew_labels == i
-                if np.sum(mask) != 0:  # empty mask, skip
+                box = boxes[i - 1] if i <= len(boxes) else None
+                if box is not None:  # empty mask, skip
+                    rect = self.cropper.padded_rect(box[0].start, box[0].stop, box[1].start, box[1].stop, dew_labels.shape)
+                    t, b, l, r = rect
                     img_data = copy(data)
                     img_data.page_image = image
                     img_data.music_region = mr
                     img_data.music_line = ml
-                    img_data.images = [ImageData(mask, True), ImageData(dew_page, False), ImageData(dew_symbols, True)]
-                    cropped = self.cropper.apply_single(img_data)[0]
+                    # views of the dewarped page
+                    img_data.images = [ImageData(dew_labels[t:b, l:r] == i, True), ImageData(dew_page[t:b, l:r], False), ImageData(dew_symbols[t:b, l:r], True)]
                     self._extract_image_op(img_data)
                     if self.center:
                         coords = extract_transformed_coords(ml)
-                        r = self._resize_to_height(cropped.images, coords, rect=cropped.params)
+                        r = self._resize_to_height(img_data.images, coords, rect=rect)
                         if r is not None:  # Invalid resize (probably no staff lines present)
                             img_data.images, r_params = r
-                            img_data.params = (i, cropped.params, r_params, s, dewarper)
+                            img_data.params = (i, rect, r_params, s, dewarper)
                             out.append(img_data)
                     else:
-                        img_data.params = (i, cropped.params, (0, ), s, dewarper)
+                        img_data.params = (i, rect, (0, ), s, dewarper)
                         out.append(img_data)
 
                 i += 1
@@ -231,17 +244,19 @@ class ImageExtractDewarpedStaffLineImages(ImageOperation):
         bot_to_add = pre_out_height - top_to_add - height
 
         def single(t: ImageData) -> ImageData:
-            fill_value = t.image.mean()
             out = copy(t)
-            if top_to_add < 0:
-                out.image = out.image[-top_to_add:, :]
-            elif top_to_add > 0:
-                out.image = np.vstack((np.full((top_to_add, width), fill_value, dtype=out.image.dtype), out.image))
-
-            if bot_to_add < 0:
-                out.image = out.image[:bot_to_add, :]
-            elif bot_to_add > 0:
-                out.image = np.vstack((out.image, np.full((bot_to_add, width), fill_value, dtype=out.image.dtype)))
+            if top_to_add <= 0 and bot_to_add <= 0:
+                # only cut, a view suffices
+                out.image = out.image[-top_to_add:height + bot_to_add]
+            else:
+                # fill a preallocated output once instead of stacking the padding
+                src = t.image[max(0, -top_to_add):height + min(0, bot_to_add)]
+                out.image = np.empty((pre_out_height, ) + t.image.shape[1:], dtype=t.image.dtype)
+                fill_value = t.image.mean()
+                top = max(0, top_to_add)
+                out.image[:top] = fill_value
+                out.image[top:top + len(src)] = src
+                out.image[top + len(src):] = fill_value
 
             if out.image.shape[0] != pre_out_height:
                 raise Exception('Shape mismatch: {} != {}'.format(out.image.shape[0], pre_out_height))
@@ -302,6 +317,14 @@ class ImageExtractDewarpedStaffLineImages(ImageOperation):
         else:
             return p
 
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        if self.dewarp:
+            # the dewarping transforms single points
+            return super().local_to_global_points(points, params)
+
+        i, (t, b, l, r), (top, ), mls, dewarper = params
+        return points + (l, t - top)
+
 
 if __name__ == "__main__":
     print(len(SymbolLabel))
@@ -4,6 +4,7 @@ from omr.imageoperations.image_crop import ImageCropToSmallestBoxOperation
 from typing import Tuple, List, NamedTuple, Any, Optional, Set
 from database.file_formats.pcgts.page import BlockType, Block, Line
 import numpy as np
+from scipy.ndimage import find_objects
 from PIL import Image
 from copy import copy
 from enum import IntEnum
@@ -98,24 +99,28 @@ class ImageExtractTextLineImages(ImageOperation):
 
         out = []
 
+        # bounding boxes of all labels in one pass, the masks are only computed within these boxes
+        boxes = find_objects(marked_regions)
+
         i = 1
         for tr in text_blocks:
             for tl in tr.lines:
-                mask = marked_regions == i
                 if len(tl.text()) == 0:
                     continue
 
-                if np.sum(mask) == 0:  # empty mask, skip
+                box = boxes[i - 1] if i <= len(boxes) else None
+                if box is None:  # empty mask, skip
                     continue
                 else:
+                    rect = self.cropper.padded_rect(box[0].start, box[0].stop, box[1].start, box[1].stop, marked_regions.shape)
+                    t, b, l, r = rect
                     img_data = copy(data)
                     img_data.page_image = image
                     img_data.text_line = tl
-                    img_data.images = [ImageData(mask, True), ImageData(image, True)]
-                    cropped = self.cropper.apply_single(img_data)[0]
+                    img_data.images = [ImageData(marked_regions[t:b, l:r] == i, True), ImageData(image[t:b, l:r], True)]
                     self._extract_image_op(img_data)
 
-                    img_data.params = (i, cropped.params)
+                    img_data.params = (i, rect)
                     out.append(img_data)
 
                 i += 1
@@ -132,3 +137,7 @@ class ImageExtractTextLineImages(ImageOperation):
         i, (t, b, l, r) = params
         # default operations
         return Point(p.x + l, t + p.y)
+
+    def local_to_global_points(self, points: np.ndarray, params: Any) -> np.ndarray:
+        i, (t, b, l, r) = params
+        return points + (l, t)
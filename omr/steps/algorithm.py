@@ -150,6 +150,7 @@ class AlgorithmTrainer(ABC):
         self._post_train(target_book)
 
         self.settings.model.save_meta()
+        self.settings.model.invalidate_predictors()
 
     @abstractmethod
     def _train(self, target_book: Optional[DatabaseBook] = None, callback: Optional[TrainerCallback] = None):
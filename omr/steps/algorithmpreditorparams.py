@@ -48,6 +48,9 @@ class AlgorithmPredictorParams(DataClassJSONMixin):
     minNumberOfStaffLines: Optional[int] = None
     maxNumberOfStaffLines: Optional[int] = None
 
+    # symbol detection
+    symbolsBatchSize: int = 8   # lines of the same shape classified at once by the pixel classifier, 1 to classify each line on its own
+
     # ocr
     ctcDecoder: SerializableCTCDecoderParams = field(default_factory=lambda: SerializableCTCDecoderParams())
 
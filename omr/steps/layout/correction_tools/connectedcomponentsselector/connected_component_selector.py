@@ -1,7 +1,8 @@
 from database.file_formats.pcgts import *
-from omr.steps.preprocessing.util.connected_compontents import ConnectedComponents
+from omr.steps.preprocessing.util.connected_compontents import ConnectedComponents, ComponentIndex
+from collections import defaultdict
 import numpy as np
-from typing import List
+from typing import List, Union
 import cv2
 from scipy import spatial
 from skimage.measure import approximate_polygon
@@ -64,41 +65,30 @@ def alpha_shape(points, alpha, only_outer=True):
     """
     assert points.shape[0] > 3, "Need at least four points"
 
-    def add_edge(edges, i, j):
-        """
-        Add an edge between the i-th and j-th points,
-        if not in the list already
-        """
-        if (i, j) in edges or (j, i) in edges:
-            # already added
-            assert (j, i) in edges, "Can't go twice over same directed edge right?"
-            if only_outer:
-                # if both neighboring triangles are in shape, it's not a boundary edge
-                edges.remove((j, i))
-            return
-        edges.add((i, j))
-
     tri = spatial.Delaunay(points)
-    edges = set()
-    # Loop over triangles:
-    # ia, ib, ic = indices of corner points of the triangle
-    for ia, ib, ic in tri.simplices:
-        pa = points[ia]
-        pb = points[ib]
-        pc = points[ic]
-        # Computing radius of triangle circumcircle
-        # www.mathalino.com/reviewer/derivation-of-formulas/derivation-of-formula-for-radius-of-circumcircle
-        a = np.sqrt((pa[0] - pb[0]) ** 2 + (pa[1] - pb[1]) ** 2)
-        b = np.sqrt((pb[0] - pc[0]) ** 2 + (pb[1] - pc[1]) ** 2)
-        c = np.sqrt((pc[0] - pa[0]) ** 2 + (pc[1] - pa[1]) ** 2)
-        s = (a + b + c) / 2.0
+    # radii of the circumcircles of all triangles
+    # www.mathalino.com/reviewer/derivation-of-formulas/derivation-of-formula-for-radius-of-circumcircle
+    pa, pb, pc = (points[tri.simplices[:, k]].astype(float) for k in range(3))
+    a = np.linalg.norm(pa - pb, axis=1)
+    b = np.linalg.norm(pb - pc, axis=1)
+    c = np.linalg.norm(pc - pa, axis=1)
+    s = (a + b + c) / 2.0
+    with np.errstate(divide='ignore', invalid='ignore'):
         area = np.sqrt(s * (s - a) * (s - b) * (s - c))
         circum_r = a * b * c / (4.0 * area)
-        if circum_r < alpha:
-            add_edge(edges, ia, ib)
-            add_edge(edges, ib, ic)
-            add_edge(edges, ic, ia)
-    return edges
+
+    # directed edges (ia, ib), (ib, ic), (ic, ia) of the triangles within the shape
+    simplices = tri.simplices[circum_r < alpha]
+    directed = np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [2, 0]]])
+    if len(directed) == 0:
+        return set()
+
+    # an edge shared by two triangles of the shape is no boundary edge
+    _, first, counts = np.unique(np.sort(directed, axis=1), axis=0, return_index=True, return_counts=True)
+    if only_outer:
+        first = first[counts == 1]
+    return set(map(tuple, directed[first].tolist()))
+
 
 def find_edges_with(i, edge_set):
     i_first = [j for (x,j) in edge_set if x==i]
@@ -107,90 +97,66 @@ def find_edges_with(i, edge_set):
 
 
 def polygons(edges):
-    if len(edges) == 0:
-        return []
-
-    edges = list(edges.copy())
-
+    # chain the edges to closed paths of point indices, each edge is visited once
+    edges = list(edges)
+    adjacent_edges = defaultdict(list)
+    for idx, (i, j) in enumerate(edges):
+        adjacent_edges[i].append(idx)
+        adjacent_edges[j].append(idx)
+
+    used = [False] * len(edges)
     shapes = []
-
-    initial = edges[0][0]
-    current = edges[0][1]
-    points = [initial]
-    del edges[0]
-    while len(edges) > 0:
-        found = False
-        for idx, (i, j) in enumerate(edges):
-            if i == current:
-                points.append(i)
-                current = j
-                del edges[idx]
-                found = True
-                break
-            if j == current:
-                points.append(j)
-                current = i
-                del edges[idx]
-                found = True
+    for idx, (initial, current) in enumerate(edges):
+        if used[idx]:
+            continue
+
+        used[idx] = True
+        points = [initial]
+        while True:
+            # drop the used edges of the current point, each edge is dropped at most twice
+            candidates = adjacent_edges[current]
+            while len(candidates) > 0 and used[candidates[-1]]:
+                candidates.pop()
+            if len(candidates) == 0:
                 break
 
-        if not found:
-            shapes.append(points)
-            initial = edges[0][0]
-            current = edges[0][1]
-            points = [initial]
-            del edges[0]
+            next_idx = candidates.pop()
+            used[next_idx] = True
+            i, j = edges[next_idx]
+            points.append(current)
+            current = j if i == current else i
 
-    if len(points) > 1:
-        shapes.append(points)
+        if len(points) > 1:
+            shapes.append(points)
 
     return shapes
 
 
-def reduceImageCC(cc: ConnectedComponents, central_text_line: np.ndarray, filter_sigma=5):
+def reduceImageCC(cc: ComponentIndex, central_text_line: np.ndarray, filter_sigma=5):
     if len(central_text_line) == 0:
         return None
 
     central_text_line = np.int32(central_text_line[np.lexsort((central_text_line[:, 0],))])
-    num_labels, labels, stats, centroids = cc
-
-
-    intersections = set()
+    height, width = cc.shape
 
-    x_s = np.arange(max(0, central_text_line[0][0]), min(cc.labels.shape[1], central_text_line[-1][0]))
-    y_s = np.interp(x_s, central_text_line[:,0], central_text_line[:, 1])
-    for x, y in zip(x_s, y_s):
-        x, y = int(x), int(y)
-        if 0 <= x < labels.shape[1] and 0 <= y < labels.shape[0] and labels[y, x] > 0:
-            intersections.add(labels[y, x])
+    # components along the line
+    x_s = np.arange(max(0, central_text_line[0][0]), min(width, central_text_line[-1][0]))
+    y_s = np.interp(x_s, central_text_line[:, 0], central_text_line[:, 1]).astype(int)
+    inside = (y_s >= 0) & (y_s < height)
+    intersections = np.unique(cc.labels_at(x_s[inside], y_s[inside]))
+    intersections = intersections[intersections > 0]
 
     if len(intersections) == 0:
         return None
 
-    min_x, min_y, max_x, max_y = 10000, 10000, 0, 0
-    for cp in intersections:
-        w = stats[cp, cv2.CC_STAT_WIDTH]
-        h = stats[cp, cv2.CC_STAT_HEIGHT]
-        a = stats[cp, cv2.CC_STAT_AREA]
-        y = stats[cp, cv2.CC_STAT_TOP]
-        l = stats[cp, cv2.CC_STAT_LEFT]
-
-        min_x = min(min_x, l)
-        min_y = min(min_y, y)
-        max_x = max(max_x, l + w)
-        max_y = max(max_y, y + h)
-
-    min_x = max(0, min_x - 2)
-    max_x = min(labels.shape[1], max_x + 2)
-    min_y = max(0, min_y - 2)
-    max_y = min(labels.shape[0], max_y + 2)
-
-    cc_image = labels[min_y:max_y, min_x:max_x]
-    intersection_image = np.zeros(cc_image.shape, dtype=bool)
-
-    for cp in intersections:
-        intersection_image |= cc_image == cp
+    stats = cc.stats[intersections]
+    min_x = max(0, stats[:, cv2.CC_STAT_LEFT].min() - 2)
+    min_y = max(0, stats[:, cv2.CC_STAT_TOP].min() - 2)
+    max_x = min(width, (stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH]).max() + 2)
+    max_y = min(height, (stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT]).max() + 2)
 
+    cc_image = cc.labels(min_x, min_y, max_x, max_y)
+    intersection_image = np.isin(cc_image, intersections)
     intersection_image = intersection_image.astype(np.uint8)
     cv2.polylines(intersection_image, [(central_text_line - (min_x, min_y)).astype(np.int32)], False, (1, ), 8)
 
@@ -202,12 +168,14 @@ def reduceImageCC(cc: ConnectedComponents, central_text_line: np.ndarray, filter
     return intersection_image, (min_x, min_y)
 
 
-def extract_components(cc: ConnectedComponents, central_text_line: Coords, staff_lines: List[Coords] = None, debug=False) -> List[Coords]:
+def extract_components(cc: Union[ComponentIndex, ConnectedComponents], central_text_line: Coords, staff_lines: List[Coords] = None, debug=False) -> List[Coords]:
     if staff_lines is None:
         staff_lines = []
+    if isinstance(cc, ConnectedComponents):
+        cc = ComponentIndex.from_components(cc)
+    page_cc = cc
 
     central_text_line = central_text_line.points
-    canvas = (cc.labels > 0) * 255
 
     result = reduceImageCC(cc, central_text_line, filter_sigma=0 if len(staff_lines) > 0 else 2)
     offset = np.array((0, 0))
@@ -222,7 +190,7 @@ def extract_components(cc: ConnectedComponents, central_text_line: Coords, staff
         for sl in staff_lines:
             Coords(sl.points - offset).draw(intersection_image, (0, ), 2)
 
-        cc = ConnectedComponents(*cv2.connectedComponentsWithStats(intersection_image, 4, cv2.CV_32S))
+        cc = ComponentIndex.from_components(ConnectedComponents(*cv2.connectedComponentsWithStats(intersection_image, 4, cv2.CV_32S)))
         result = reduceImageCC(cc, central_text_line - offset, filter_sigma=2)
 
         if result is None:
@@ -244,6 +212,7 @@ def extract_components(cc: ConnectedComponents, central_text_line: Coords, staff
 
     if debug:
         import matplotlib.pyplot as plt
+        canvas = (page_cc.labels(0, 0, page_cc.shape[1], page_cc.shape[0]) > 0) * 255
         canvas = np.stack(((canvas).astype(np.uint8),) * 3, -1)
         cv2.polylines(canvas, [central_text_line.astype(np.int32)], False, [255, 0, 0], thickness=4)
         cv2.polylines(canvas, polys, True, [0, 255, 0])
@@ -2,6 +2,7 @@ from omr.steps.algorithm import AlgorithmPredictor, AlgorithmPredictorSettings,
 from database import DatabasePage
 from typing import List, Optional, NamedTuple
 from .connected_component_selector import extract_components
+from omr.steps.preprocessing.util.connected_compontents import load_component_index
 from .meta import Meta
 from database.file_formats.pcgts import Coords, PageScaleReference
 
@@ -41,15 +42,14 @@ class Predictor(AlgorithmPredictor):
 
     def predict_single(self, page: DatabasePage) -> Result:
         pcgts = page.pcgts()
-        import pickle
         staff_lines: List[Coords] = []
-        pcgts = pcgts
         for mr in pcgts.page.music_blocks():
             for ml in mr.lines:
                 staff_lines += [pcgts.page.page_to_image_scale(s.coords, PageScaleReference.NORMALIZED) for s in ml.staff_lines]
 
-        with open(page.file('connected_components_norm', create_if_not_existing=True).local_path(), 'rb') as pkl:
-            polys = extract_components(pickle.load(pkl), pcgts.page.page_to_image_scale(self.initial_line, PageScaleReference.NORMALIZED), staff_lines)
-            polys = [pcgts.page.image_to_page_scale(c, PageScaleReference.NORMALIZED) for c in polys]
+        # the index of the components is kept in memory while the page is edited
+        cc = load_component_index(page.file('connected_components_norm', create_if_not_existing=True).local_path())
+        polys = extract_components(cc, pcgts.page.page_to_image_scale(self.initial_line, PageScaleReference.NORMALIZED), staff_lines)
+        polys = [pcgts.page.image_to_page_scale(c, PageScaleReference.NORMALIZED) for c in polys]
 
         return Result(polys)
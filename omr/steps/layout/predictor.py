@@ -2,6 +2,7 @@ from abc import abstractmethod
 from typing import List, Generator, NamedTuple, Dict, Optional
 from database.file_formats.pcgts import *
 from database import DatabasePage
+from database.database_book_page_states import page_state
 from omr.steps.algorithm import AlgorithmPredictor, PredictionCallback, AlgorithmPredictorSettings, AlgorithmPredictionResult, AlgorithmPredictionResultGenerator
 import logging
 
@@ -69,7 +70,7 @@ class LayoutAnalysisPredictor(AlgorithmPredictor):
 
     @classmethod
     def unprocessed(cls, page: DatabasePage) -> bool:
-        return len(page.pcgts().page.text_blocks()) == 0
+        return page_state(page).n_text_blocks == 0
 
     def predict(self, pages: List[DatabasePage], callback: Optional[PredictionCallback] = None) -> AlgorithmPredictionResultGenerator:
         pcgts_files = [p.pcgts() for p in pages]
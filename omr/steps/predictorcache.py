@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from typing import Type, Tuple, Optional, NamedTuple, TYPE_CHECKING
+from ommr4all.settings import PREDICTOR_CACHE_SETTINGS
+from .algorithmtypes import AlgorithmTypes
+import threading
+import hashlib
+import logging
+import gc
+import os
+
+if TYPE_CHECKING:
+    from .algorithm import AlgorithmMeta, AlgorithmPredictor
+    from .algorithmpreditorparams import AlgorithmPredictorSettings
+    from database.model import Model
+
+logger = logging.getLogger(__name__)
+
+
+PredictorCacheKey = Tuple[AlgorithmTypes, Optional[str], str]
+
+
+def _resident_memory() -> int:
+    # resident set size of this process in bytes, 0 if it can not be determined (non linux)
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def model_stamp(model: Optional['Model']) -> Optional[Tuple[int, int]]:
+    # modification stamp of a model directory, changes if the model is deleted or a trainer writes new files
+    if model is None:
+        return None
+
+    try:
+        mtimes = [e.stat().st_mtime_ns for e in os.scandir(model.path)]
+        return len(mtimes), max(mtimes + [os.stat(model.path).st_mtime_ns])
+    except FileNotFoundError:
+        return None
+
+
+class CachedPredictor(NamedTuple):
+    predictor: 'AlgorithmPredictor'
+    model: Optional['Model']
+    model_id: Optional[str]
+    stamp: Optional[Tuple[int, int]]
+    memory: int
+
+
+class PredictorCache:
+    """
+    LRU of loaded predictors, so that consecutive tasks in a long living worker process do not load the model again.
+
+    Entries are keyed by (algorithm type, model id, params hash) and are dropped if the model directory changed
+    since loading. Eviction happens by the number of entries and by the (estimated) memory of the predictors.
+    """
+    def __init__(self, max_entries: int = PREDICTOR_CACHE_SETTINGS.max_entries,
+                 max_memory_mb: int = PREDICTOR_CACHE_SETTINGS.max_memory_mb):
+        self.max_entries = max_entries
+        self.max_memory = max_memory_mb * 1024 * 1024
+        self.entries: 'OrderedDict[PredictorCacheKey, CachedPredictor]' = OrderedDict()
+        self.mutex = threading.Lock()
+
+    @staticmethod
+    def key(meta: Type['AlgorithmMeta'], settings: 'AlgorithmPredictorSettings') -> PredictorCacheKey:
+        params_hash = hashlib.sha1(settings.params.to_json().encode('utf-8')).hexdigest()
+        return meta.type(), settings.model.id() if settings.model else None, params_hash
+
+    def memory(self) -> int:
+        return sum(e.memory for e in self.entries.values())
+
+    def get(self, meta: Type['AlgorithmMeta'], settings: 'AlgorithmPredictorSettings') -> 'AlgorithmPredictor':
+        if self.max_entries <= 0:
+            return meta.create_predictor(settings)
+
+        key = PredictorCache.key(meta, settings)
+        with self.mutex:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry.stamp == model_stamp(entry.model):
+                    self.entries.move_to_end(key)
+                    logger.debug("Reusing loaded predictor for {}".format(key))
+                    return entry.predictor
+
+                logger.info("Model {} changed, reloading predictor".format(entry.model_id))
+                self._remove(key)
+
+            mem_before = _resident_memory()
+            predictor = meta.create_predictor(settings)
+            model = settings.model  # the predictor might have replaced the model by the one of its params
+            self.entries[key] = CachedPredictor(predictor,
+                                                model,
+                                                model.id() if model else None,
+                                                model_stamp(model),
+                                                max(0, _resident_memory() - mem_before))
+            self._evict()
+            return predictor
+
+    def invalidate(self, model_id: Optional[str] = None, algorithm_type: Optional[AlgorithmTypes] = None):
+        # drop all entries of the model and/or algorithm, everything if both are None
+        with self.mutex:
+            for key, entry in list(self.entries.items()):
+                if (model_id is None or entry.model_id == model_id) and (algorithm_type is None or key[0] == algorithm_type):
+                    self._remove(key)
+
+    def clear(self):
+        self.invalidate()
+
+    def _remove(self, key: PredictorCacheKey):
+        del self.entries[key]
+        gc.collect()
+
+    def _evict(self):
+        # always keep the most recent entry, even if it exceeds the memory budget by itself
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or 0 < self.max_memory < self.memory()):
+            key = next(iter(self.entries))
+            logger.debug("Evicting predictor {}".format(key))
+            self._remove(key)
+
+
+predictor_cache = PredictorCache()
@@ -4,13 +4,14 @@ import logging
 from typing import List, Optional, Tuple
 from omr.steps.preprocessing.meta import Meta
 from omr.steps.algorithm import AlgorithmPredictor, PredictionCallback, AlgorithmPredictorSettings, AlgorithmPredictorParams, AlgorithmPredictionResult, AlgorithmPredictionResultGenerator
+from database.tools.derived_files import preprocessed_files
 import multiprocessing
 
 
 logger = logging.getLogger(__name__)
 
 
-files = ['color_norm', 'color_norm_x2', 'color_highres_preproc', 'color_lowres_preproc', 'connected_components_norm']
+files = preprocessed_files
 
 
 def _process_single(args: Tuple[DatabasePage, AlgorithmPredictorParams]):
@@ -1,6 +1,10 @@
 import cv2
 from collections import namedtuple
 import numpy as np
+import pickle
+
+from database.database_image_cache import DecodedImageCache
+from ommr4all.settings import IMAGE_CACHE_SETTINGS
 
 ConnectedComponents = namedtuple('ConnectedComponents', ['num_labels', 'labels', 'stats', 'centroids'])
 
@@ -8,3 +12,72 @@ ConnectedComponents = namedtuple('ConnectedComponents', ['num_labels', 'labels',
 def connected_compontents_with_stats(binary: np.ndarray):
     return ConnectedComponents(*cv2.connectedComponentsWithStats(255 - binary, 8, cv2.CV_32S))
 
+
+class ComponentIndex:
+    """
+    Compact form of the connected components of a page: the label image is stored as horizontal runs of equal labels
+    (sorted by row and column), so that the labels at single points and of small regions are looked up without the
+    full label image.
+    """
+    def __init__(self, shape, stats: np.ndarray, run_row: np.ndarray, run_start: np.ndarray, run_end: np.ndarray,
+                 run_label: np.ndarray):
+        self.shape = shape
+        self.stats = stats
+        self.run_row = run_row
+        self.run_start = run_start
+        self.run_end = run_end
+        self.run_label = run_label
+        # position of the start of each run in the flattened image, for binary searches
+        self.run_key = run_row.astype(np.int64) * (shape[1] + 1) + run_start
+
+    @staticmethod
+    def from_components(cc: ConnectedComponents) -> 'ComponentIndex':
+        labels = cc.labels
+        padded = np.zeros((labels.shape[0], labels.shape[1] + 2), dtype=labels.dtype)
+        padded[:, 1:-1] = labels
+        change = padded[:, 1:] != padded[:, :-1]
+        # a run starts where the label changes to a component and ends where a component changes to another label
+        run_row, run_start = np.nonzero(change & (padded[:, 1:] > 0))
+        _, run_end = np.nonzero(change & (padded[:, :-1] > 0))
+        return ComponentIndex(labels.shape, cc.stats, run_row.astype(np.int32), run_start.astype(np.int32),
+                              run_end.astype(np.int32), labels[run_row, run_start].astype(np.int32))
+
+    @staticmethod
+    def from_file(path: str) -> 'ComponentIndex':
+        with open(path, 'rb') as f:
+            return ComponentIndex.from_components(pickle.load(f))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in [self.stats, self.run_row, self.run_start, self.run_end, self.run_label, self.run_key])
+
+    def labels_at(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        # labels at the points (xs, ys) that must be within the image
+        idx = np.searchsorted(self.run_key, ys.astype(np.int64) * (self.shape[1] + 1) + xs, side='right') - 1
+        valid = idx >= 0
+        idx = np.maximum(idx, 0)
+        valid &= (self.run_row[idx] == ys) & (self.run_end[idx] > xs)
+        return np.where(valid, self.run_label[idx], 0)
+
+    def labels(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        # label image of the region [y0, y1) x [x0, x1)
+        a, b = np.searchsorted(self.run_row, [y0, y1])
+        row, start, end, label = self.run_row[a:b], self.run_start[a:b], self.run_end[a:b], self.run_label[a:b]
+        inside = (end > x0) & (start < x1)
+        row, label = row[inside] - y0, label[inside]
+        start = np.clip(start[inside] - x0, 0, x1 - x0)
+        end = np.clip(end[inside] - x0, 0, x1 - x0)
+
+        # runs do not overlap, so the cumulated sum of the label changes is the label image
+        changes = np.zeros((y1 - y0, x1 - x0 + 1), dtype=np.int32)
+        np.add.at(changes, (row, start), label)
+        np.add.at(changes, (row, end), -label)
+        return np.cumsum(changes, axis=1, dtype=np.int32)[:, :-1]
+
+
+# indices of the pages edited with the component selector, valid as long as the file is unchanged
+component_index_cache = DecodedImageCache(IMAGE_CACHE_SETTINGS.max_component_index_memory_mb, decode=ComponentIndex.from_file)
+
+
+def load_component_index(path: str) -> ComponentIndex:
+    return component_index_cache.get(path)
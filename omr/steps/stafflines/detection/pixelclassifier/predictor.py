@@ -29,15 +29,18 @@ class StaffLinePredictorParameters(NamedTuple):
 
 
 class PCPredictionCallback(LineDetectionCallback):
-    def __init__(self, callback: LineDetectionPredictorCallback):
+    def __init__(self, callback: LineDetectionPredictorCallback, page_idx: int = 0, n_pages: int = 1):
+        # the pages are detected one by one, the progress of the current page is mapped to the total progress
         self.callback = callback
+        self.page_idx = page_idx
+        self.n_pages = n_pages
         super().__init__()
 
     def changed(self):
         self.callback.progress_updated(
-            self.get_progress(),
-            self.get_total_pages(),
-            self.get_processed_pages(),
+            (self.page_idx + self.get_progress()) / self.n_pages,
+            self.n_pages,
+            self.page_idx,
         )
 
 
@@ -71,27 +74,30 @@ class BasicStaffLinePredictor(StaffLinePredictor):
     def predict(self, pages: List[DatabasePage], callback: Optional[LineDetectionPredictorCallback] = None) -> AlgorithmPredictionResultGenerator:
         pcgts_files = [p.pcgts() for p in pages]
         pc_dataset = PCDataset(pcgts_files, self.dataset_params)
-        dataset = pc_dataset.to_line_detection_dataset()
-        gray_images = [(255 - data.line_image).astype(np.uint8) for data in dataset]
-        if callback:
-            # TODO: Line detection callback of line-detection not as class member variable
-            self.line_detection.callback = PCPredictionCallback(callback)
-
-        predictions = self.line_detection.detect(gray_images)
-        for i, (data, r) in enumerate(zip(dataset, predictions)):
-            rlmd: RegionLineMaskData = data
-            page: Page = rlmd.operation.page
-            logger.debug("Predicted {}/{}. File {}".format(i + 1, len(dataset), rlmd.operation.page.location.local_path()))
-            if len(r) == 0:
-                logger.warning('No staff lines detected.')
-                yield PredictionResult([], [], rlmd)
-            else:
-                def transform_points(yx_points):
-                    return Coords(np.array([pc_dataset.local_to_global_pos(Point(p[1], p[0]), rlmd.operation.params).p for p in yx_points]))
-
-                ml_global = [Line(staff_lines=StaffLines([StaffLine(page.image_to_page_scale(transform_points(list(pl)), rlmd.operation.scale_reference)) for pl in l])) for l in r]
-                ml_local = [Line(staff_lines=StaffLines([StaffLine(page.image_to_page_scale(Coords(np.array(pl)[:, ::-1]), rlmd.operation.scale_reference)) for pl in l])) for l in r]
-                yield PredictionResult(ml_global, ml_local, rlmd)
+        keys = [pc_dataset.cache.key(f) for f in pcgts_files]
+
+        # stream the pages through the detection, only the images of the current page are kept in memory
+        for page_idx, outputs in enumerate(pc_dataset.iter_pages(keys)):
+            if callback:
+                # TODO: Line detection callback of line-detection not as class member variable
+                self.line_detection.callback = PCPredictionCallback(callback, page_idx, len(pcgts_files))
+
+            dataset = [RegionLineMaskData(o) for o in outputs]
+            predictions = self.line_detection.detect([(255 - data.line_image).astype(np.uint8) for data in dataset])
+            for data, r in zip(dataset, predictions):
+                rlmd: RegionLineMaskData = data
+                page: Page = rlmd.operation.page
+                logger.debug("Predicted page {}/{}. File {}".format(page_idx + 1, len(pcgts_files), page.location.local_path()))
+                if len(r) == 0:
+                    logger.warning('No staff lines detected.')
+                    yield PredictionResult([], [], rlmd)
+                else:
+                    def transform_points(yx_points):
+                        return Coords(pc_dataset.local_to_global_points(np.array(yx_points, dtype=float).reshape((-1, 2))[:, ::-1], rlmd.operation.params))
+
+                    ml_global = [Line(staff_lines=StaffLines([StaffLine(page.image_to_page_scale(transform_points(pl), rlmd.operation.scale_reference)) for pl in l])) for l in r]
+                    ml_local = [Line(staff_lines=StaffLines([StaffLine(page.image_to_page_scale(Coords(np.array(pl)[:, ::-1]), rlmd.operation.scale_reference)) for pl in l])) for l in r]
+                    yield PredictionResult(ml_global, ml_local, rlmd)
 
 
 if __name__ == '__main__':
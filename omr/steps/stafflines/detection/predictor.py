@@ -4,6 +4,7 @@ from typing import NamedTuple, List, Generator, Optional
 from omr.dataset import RegionLineMaskData
 from omr.steps.algorithm import AlgorithmPredictor, AlgorithmPredictorSettings, AlgorithmPredictionResult, AlgorithmPredictionResultGenerator
 from database.database_page import DatabasePage
+from database.database_book_page_states import page_state
 
 
 class PredictionResultMeta(NamedTuple.__class__, AlgorithmPredictionResult.__class__):
@@ -60,4 +61,4 @@ class StaffLinePredictor(AlgorithmPredictor, ABC):
 
     @classmethod
     def unprocessed(cls, page: DatabasePage) -> bool:
-        return len(page.pcgts().page.music_blocks()) == 0
+        return page_state(page).n_music_blocks == 0
@@ -3,6 +3,7 @@ from typing import NamedTuple, List, Optional, Generator
 import numpy as np
 
 from database import DatabasePage
+from database.database_book_page_states import page_state
 from database.file_formats import PcGts
 from database.file_formats.pcgts import Page
 from database.file_formats.pcgts.page import Syllable, Annotations, SymbolType, GraphicalConnectionType
@@ -74,9 +75,8 @@ class PredictionResult(AlgorithmPredictionResult, NamedTuple, metaclass=Predicti
         }
 
     def store_to_page(self):
-        page = self.page()
-        page.annotations.connections.clear()
-        raise NotImplementedError()
+        self.page().annotations = self.annotations
+        self.pcgts().to_file(self.ds_page().file('pcgts').local_path())
 
 
 class SyllablesPredictor(AlgorithmPredictor, ABC):
@@ -85,9 +85,7 @@ class SyllablesPredictor(AlgorithmPredictor, ABC):
 
     @classmethod
     def unprocessed(cls, page: DatabasePage) -> bool:
-        if not page.pcgts():
-            return True
-        return len(page.pcgts().page.annotations.connections) == 0
+        return page_state(page).n_connections == 0
 
     def predict(self, pages: List[DatabasePage], callback: Optional[PredictionCallback] = None) -> AlgorithmPredictionResultGenerator:
         for pr in self._predict(pages, callback):
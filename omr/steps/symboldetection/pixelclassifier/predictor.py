@@ -4,8 +4,9 @@ if __name__ == '__main__':
     os.environ['DJANGO_SETTINGS_MODULE'] = 'ommr4all.settings'
     django.setup()
 
-from typing import List, Optional, Generator
-from ocr4all_pixel_classifier.lib.predictor import Predictor, PredictSettings
+from typing import List, Optional, Generator, Dict
+from ocr4all_pixel_classifier.lib.predictor import Predictor, PredictSettings, Prediction
+from ocr4all_pixel_classifier.lib.dataset import SingleData
 from database.file_formats.pcgts import *
 from omr.steps.symboldetection.dataset import SymbolDetectionDataset
 from omr.dataset import RegionLineMaskData
@@ -49,6 +50,13 @@ def render_prediction_labels(labels, img=None):
     return out.clip(0, 255).astype(np.uint8)
 
 
+def component_labels(cc: np.ndarray, labels: np.ndarray, n_components: int) -> np.ndarray:
+    # the most frequent (non background) label of each connected component, ties are broken by the lower label
+    # counts of each label per component by a single bincount over the (component, label) pairs
+    label_counts = np.bincount((cc * len(SymbolLabel) + labels).ravel(), minlength=n_components * len(SymbolLabel)).reshape(n_components, len(SymbolLabel))
+    return np.argmax(label_counts[:, 1:], axis=-1) + 1
+
+
 class PCPredictor(SymbolsPredictor):
     @staticmethod
     def meta() -> Meta.__class__:
@@ -62,9 +70,48 @@ class PCPredictor(SymbolsPredictor):
         )
         self.predictor = Predictor(settings)
 
+    def _predict_batched(self, data: List[SingleData], batch_size: int) -> Generator[Prediction, None, None]:
+        # lines of the same shape are classified together, lines are not padded since the convolutions at the border
+        # would see the padding and change the prediction, the predictions are yielded in the order of the data
+        from scipy.special import softmax
+        from ocr4all_pixel_classifier.lib.model import Architecture
+        from ocr4all_pixel_classifier.lib.util import gray_to_rgb
+        network = self.predictor.network
+        architecture = network.architecture if network.model.name == 'model' else network.model.name
+        preprocess, rgb = Architecture(architecture).preprocess()
+
+        def channels(img: np.ndarray) -> np.ndarray:
+            return img[:, :, np.newaxis] if img.ndim == 2 else img
+
+        by_shape: Dict[tuple, List[int]] = {}
+        for i, d in enumerate(data):
+            by_shape.setdefault(d.image.shape[:2], []).append(i)
+        batches = [indices[start:start + batch_size] for indices in by_shape.values()
+                   for start in range(0, len(indices), batch_size)]
+
+        done: Dict[int, Prediction] = {}
+        next_to_yield = 0
+        for indices in sorted(batches):
+            batch = [data[i] for i in indices]
+            images = np.stack([channels(preprocess(gray_to_rgb(d.image) if rgb else d.image)) for d in batch])
+            binaries = np.stack([channels(d.binary) for d in batch])
+            logits = network.model.predict_on_batch([images, binaries])
+            for i, d, logit in zip(indices, batch, logits):
+                done[i] = Prediction(np.argmax(logit, -1), softmax(logit, -1), d)
+
+            while next_to_yield in done:
+                yield done.pop(next_to_yield)
+                next_to_yield += 1
+
     def _predict(self, pcgts_files: List[PcGts], callback: Optional[PredictionCallback] = None) -> Generator[SingleLinePredictionResult, None, None]:
         dataset = SymbolDetectionDataset(pcgts_files, self.dataset_params)
-        for p in self.predictor.predict(dataset.to_page_segmentation_dataset()):
+        ps_dataset = dataset.to_page_segmentation_dataset()
+        if self.params.symbolsBatchSize > 1:
+            predictions = self._predict_batched(ps_dataset.data, self.params.symbolsBatchSize)
+        else:
+            predictions = self.predictor.predict(ps_dataset)
+
+        for p in predictions:
             m: RegionLineMaskData = p.data.user_data
             symbols = SingleLinePredictionResult(self.exract_symbols(p.probabilities, p.labels, m, dataset), p.data.user_data)
             if False:
@@ -90,24 +137,19 @@ class PCPredictor(SymbolsPredictor):
         p = (np.argmax(probs[:,:,1:], axis=-1) + 1) * (probs[:,:,0] < 0.5)
         n_labels, cc, stats, centroids = cv2.connectedComponentsWithStats(p.astype(np.uint8))
         symbols = []
+        cc_labels = component_labels(cc, p, n_labels)
         sorted_labels = sorted(range(1, n_labels), key=lambda i: (centroids[i, 0], -centroids[i, 1]))
         centroids_canvas = np.zeros(p.shape, dtype=np.uint8)
         for i in sorted_labels:
-            w = stats[i, cv2.CC_STAT_WIDTH]
-            h = stats[i, cv2.CC_STAT_HEIGHT]
             a = stats[i, cv2.CC_STAT_AREA]
             if a <= 4:
                 continue
-            y = stats[i, cv2.CC_STAT_TOP]
-            x = stats[i, cv2.CC_STAT_LEFT]
             c = Point(x=centroids[i, 0], y=centroids[i, 1])
             coord = dataset.local_to_global_pos(c, m.operation.params)
             coord = m.operation.page.image_to_page_scale(coord, m.operation.scale_reference)
             #coord = coord.round().astype(int)
 
-            # compute label this the label with the hightest frequency of the connected component
-            area = p[y:y+h, x:x+w] * (cc[y:y+h, x:x+w] == i)
-            label = SymbolLabel(int(np.argmax([np.sum(area == v + 1) for v in range(len(SymbolLabel) - 1)])) + 1)
+            label = SymbolLabel(int(cc_labels[i]))
             centroids_canvas[int(np.round(c.y)), int(np.round(c.x))] = label
             position_in_staff = m.operation.music_line.compute_position_in_staff(coord)
             if label == SymbolLabel.NOTE_START:
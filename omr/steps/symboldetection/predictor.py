@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import List, Generator, NamedTuple, Optional
 from database import DatabasePage
+from database.database_book_page_states import page_state
 from database.file_formats.pcgts import *
 from omr.dataset import RegionLineMaskData
 from omr.steps.algorithm import AlgorithmPredictor, AlgorithmPredictorSettings, AlgorithmPredictionResultGenerator, AlgorithmPredictionResult, PredictionCallback
@@ -42,7 +43,7 @@ class SymbolsPredictor(AlgorithmPredictor, ABC):
 
     @classmethod
     def unprocessed(cls, page: DatabasePage) -> bool:
-        return all([len(l.symbols) == 0 for l in page.pcgts().page.all_music_lines()])
+        return page_state(page).n_symbols == 0
 
     def predict(self, pages: List[DatabasePage], callback: Optional[PredictionCallback] = None) -> AlgorithmPredictionResultGenerator:
         pcgts_files = [p.pcgts() for p in pages]
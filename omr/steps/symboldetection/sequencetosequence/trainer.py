@@ -132,8 +132,8 @@ class OMRTrainer(SymbolDetectionTrainer):
                 data_augmenter=SimpleDataAugmenter(),
                 weights=None if not self.params.model_to_load() else self.params.model_to_load().local_file(
                     params.early_stopping_best_model_prefix + '.ckpt'),
-                preload_training=True,
-                preload_validation=True,
+                preload_training=not self.settings.dataset_params.streaming,
+                preload_validation=not self.settings.dataset_params.streaming,
                 codec=Codec(self.settings.dataset_params.calamari_codec.codec.values()),
             )
             trainer.train()
@@ -61,16 +61,21 @@ class CalamariPredictor(TextPredictor):
             normalization=dataset.params.lyrics_normalization,
         )
         """
-        try:
-            for marked_symbols, (r, sample) in zip(dataset.load(), self.predictor.predict_dataset(dataset.to_text_line_calamari_dataset())):
-                prediction = self.voter.vote_prediction_result(r)
-                hyphenated = hyphen.apply_to_sentence(prediction.sentence)
-                yield SingleLinePredictionResult(self.extract_symbols(dataset, prediction, marked_symbols), marked_symbols, hyphenated)
-        except Exception as e:
-            if str(e) == 'Empty data set provided.':
-                return
-
-            raise e
+        # the lines are loaded and predicted page by page
+        for lines in dataset.page_lines():
+            if len(lines) == 0:
+                continue
+
+            try:
+                for marked_symbols, (r, sample) in zip(lines, self.predictor.predict_dataset(dataset.to_text_line_calamari_dataset(lines=lines))):
+                    prediction = self.voter.vote_prediction_result(r)
+                    hyphenated = hyphen.apply_to_sentence(prediction.sentence)
+                    yield SingleLinePredictionResult(self.extract_symbols(dataset, prediction, marked_symbols), marked_symbols, hyphenated)
+            except Exception as e:
+                if str(e) == 'Empty data set provided.':
+                    continue
+
+                raise e
 
     def extract_symbols(self, dataset: TextDataset, p, m: RegionLineMaskData) -> List[Tuple[str, Point]]:
         def i2p(p):
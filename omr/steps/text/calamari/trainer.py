@@ -128,8 +128,8 @@ class CalamariTrainer(TextTrainerBase):
                 n_augmentations=self.params.data_augmentation_factor if self.params.data_augmentation_factor else 0,
                 data_augmenter=SimpleDataAugmenter(),
                 weights=None if not self.params.model_to_load() else self.params.model_to_load().local_file('text_best.ckpt'),
-                preload_training=True,
-                preload_validation=True,
+                preload_training=not self.settings.dataset_params.streaming,
+                preload_validation=not self.settings.dataset_params.streaming,
             )
             trainer.train(training_callback=calamari_callback,
                           auto_compute_codec=True,
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import List, Generator, NamedTuple, Tuple, Optional
 
 from database import DatabasePage
+from database.database_book_page_states import page_state
 from database.file_formats.pcgts import *
 from omr.dataset import RegionLineMaskData
 
@@ -49,18 +50,32 @@ class TextPredictor(AlgorithmPredictor, ABC):
 
     @classmethod
     def unprocessed(cls, page: DatabasePage) -> bool:
-        return all([len(l.symbols) == 0 for l in page.pcgts().page.all_music_lines()])
+        return page_state(page).n_symbols == 0
 
     def predict(self, pages: List[DatabasePage], callback: Optional[PredictionCallback] = None) -> AlgorithmPredictionResultGenerator:
         pcgts_files = [p.pcgts() for p in pages]
         dataset = TextDataset(pcgts_files, self.dataset_params)
-        page_results = [PredictionResult(pcgts, pcgts.page.location, []) for pcgts in pcgts_files]
+        page_indices = {id(pcgts): i for i, pcgts in enumerate(pcgts_files)}
+        n_finished = 0
+
+        def finish_pages(n: int):
+            # yield the results of all pages before page n
+            nonlocal n_finished
+            while n_finished < n:
+                pcgts = pcgts_files[n_finished]
+                n_finished += 1
+                if callback:
+                    callback.progress_updated(n_finished / len(pcgts_files), n_pages=len(pcgts_files), n_processed_pages=n_finished)
+                yield PredictionResult(pcgts, pcgts.page.location, text_lines.pop(id(pcgts), []))
+
+        # the lines are predicted in the order of the pages, a page is finished once a line of a later page arrives
+        text_lines = {}
         for line_results in self._predict(dataset, callback):
-            page_result = [p for p in page_results if p.pcgts == line_results.line.operation.pcgts][0]
-            page_result.text_lines.append(line_results)
+            pcgts = line_results.line.operation.pcgts
+            yield from finish_pages(page_indices[id(pcgts)])
+            text_lines.setdefault(id(pcgts), []).append(line_results)
 
-        for page_result in page_results:
-            yield page_result
+        yield from finish_pages(len(pcgts_files))
 
     @abstractmethod
     def _predict(self, dataset: TextDataset, callback: Optional[PredictionCallback]) -> Generator[SingleLinePredictionResult, None, None]:
@@ -0,0 +1,99 @@
+from urllib.parse import parse_qs
+from typing import Optional, List, Tuple
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.contrib.auth.models import AnonymousUser
+
+from database import DatabaseBook, DatabaseBookPermissionFlag
+from restapi.operationworker import operation_worker
+from restapi.operationworker.taskstatuspublisher import TaskStatusUpdate, task_group, book_group, book_of
+
+logger = logging.getLogger(__name__)
+
+
+def user_from_token(token: Optional[str]):
+    # the JWT of the rest api, passed as query parameter since browsers can not set headers of WebSockets
+    if not token:
+        return AnonymousUser()
+
+    from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+    from rest_framework_jwt.settings import api_settings
+    from rest_framework.exceptions import AuthenticationFailed
+    import jwt
+    try:
+        return JSONWebTokenAuthentication().authenticate_credentials(api_settings.JWT_DECODE_HANDLER(token))
+    except (jwt.InvalidTokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class TaskStatusConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket that pushes the status of tasks, instead of polling the operation views.
+
+    The client subscribes with {"subscribe": {"task": task_id}} or {"subscribe": {"book": book}} (and unsubscribes
+    likewise), both require the read permission on the book, a task must exist in the queue. The status of each task is sent as
+    {"task": task_id, "book": book, "status": status} when subscribed and on every update.
+    """
+    async def connect(self):
+        token = parse_qs(self.scope.get('query_string', b'').decode()).get('token', [None])[0]
+        self.user = await database_sync_to_async(user_from_token)(token)
+        self.subscriptions = set()
+        operation_worker.attach_consumers(asyncio.get_event_loop())
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in self.subscriptions:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    def _resolve(self, target: dict) -> Tuple[Optional[str], List[TaskStatusUpdate]]:
+        # the group of the target and the current states of its tasks, no group if access is denied
+        if 'task' in target:
+            task_id = str(target['task'])
+            task = operation_worker.queue.task(task_id)
+            if task is None:
+                # the permissions of unknown tasks can not be checked
+                return None, []
+
+            book = book_of(task.task_runner)
+            updates = [TaskStatusUpdate(task_id, book, task.task_status)]
+            group = task_group(task_id)
+        elif 'book' in target:
+            book = DatabaseBook(str(target['book'])).book
+            updates = [TaskStatusUpdate(t.task_id, book, t.task_status) for t in operation_worker.queue.list_tasks()
+                       if book_of(t.task_runner) == book]
+            group = book_group(book)
+        else:
+            return None, []
+
+        if book is not None and not DatabaseBook(book).resolve_user_permissions(self.user).has(DatabaseBookPermissionFlag.READ):
+            return None, []
+
+        return group, updates
+
+    async def receive_json(self, content, **kwargs):
+        for action in ['subscribe', 'unsubscribe']:
+            if action not in content:
+                continue
+
+            try:
+                group, updates = await database_sync_to_async(self._resolve)(content[action])
+            except Exception as e:
+                logger.warning('Invalid subscription {}: {}'.format(content, e))
+                group, updates = None, []
+
+            if group is None:
+                await self.send_json({'error': 'Invalid or unauthorized subscription', action: content[action]})
+            elif action == 'subscribe':
+                await self.channel_layer.group_add(group, self.channel_name)
+                self.subscriptions.add(group)
+                for update in updates:
+                    await self.task_status(update.message())
+            else:
+                await self.channel_layer.group_discard(group, self.channel_name)
+                self.subscriptions.discard(group)
+
+    async def task_status(self, event):
+        await self.send_json({'task': event['task'], 'book': event['book'], 'status': event['status']})
@@ -37,6 +37,8 @@ class ErrorCodes(IntEnum):
     PAGE_EXISTS = 44001
     PAGE_INVALID_NAME = 44002
     PAGE_NOT_LOCKED = 44003
+    PAGE_INVALID_PATCH = 44004
+    PAGE_PATCH_CONFLICT = 44005
 
     # Page progress
     PAGE_PROGRESS_VERIFICATION_REQUIRES_ALL_PROGRESS_LOCKS = 44101
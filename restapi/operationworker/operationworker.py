@@ -1,13 +1,16 @@
 from typing import Optional, TYPE_CHECKING
-from .taskqueue import TaskQueue, TaskStatus
+from .taskqueue import TaskQueue, TaskStatus, TaskStatusCodes
+from .taskstore import TaskStore, default_task_store
+from .taskstatuspublisher import TaskStatusPublisher, TaskStatusPoller, book_of
 from .taskcommunicator import TaskCommunicator
 from uuid import uuid4
 from .taskresources import Resources, default_resources
 from .taskrunners.taskrunner import TaskRunner
 import logging
+import os
 from .taskcreator import TaskCreator
 from .taskwatcher import TaskWatcher
-from ommr4all.settings import TASK_OPERATION_WATCHER_SETTINGS
+from ommr4all.settings import TASK_OPERATION_WATCHER_SETTINGS, TASK_STATUS_PUSH_SETTINGS, TASK_STORE_SETTINGS
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +24,21 @@ class TaskIDGenerator:
 
 
 class OperationWorker:
-    def __init__(self, resources: Resources = None, watcher_interval=TASK_OPERATION_WATCHER_SETTINGS.interval):
-        self.queue = TaskQueue()
+    """
+    Entry point to the task queue of the server.
+
+    All processes that share the store of the queue see the same tasks, the first one that accesses the queue
+    becomes the dispatcher and runs the tasks on its resources.
+    The dispatcher publishes the status updates to its WebSocket consumers, the other processes poll the store once
+    their first consumer connected.
+    """
+    def __init__(self, resources: Resources = None, watcher_interval=TASK_OPERATION_WATCHER_SETTINGS.interval,
+                 store: TaskStore = None, publisher: TaskStatusPublisher = None,
+                 status_poll_interval=TASK_STORE_SETTINGS.poll_interval):
+        self.queue = TaskQueue(store if store else default_task_store())
+        self.publisher = publisher     # pushes the status updates to the WebSocket consumers if set
+        self.status_poller = TaskStatusPoller(self.queue, publisher, status_poll_interval, self.is_dispatcher) \
+            if publisher else None
         self.resources = resources if resources else default_resources()
         self._task_communicator: Optional[TaskCommunicator] = None
         self._task_creator: Optional[TaskCreator] = None
@@ -32,33 +48,52 @@ class OperationWorker:
 
     def task_communicator(self) -> TaskCommunicator:
         if not self._task_communicator:
-            self._task_communicator = TaskCommunicator(self.queue)
+            self._task_communicator = TaskCommunicator(self.queue, self.publisher)
         return self._task_communicator
 
-    def task_creator(self) -> TaskCreator:
-        if not self._task_creator:
+    def task_creator(self) -> Optional[TaskCreator]:
+        # None if another process is the dispatcher, checked again on every access since it may have terminated
+        if not self._task_creator and self.queue.store.acquire_dispatcher():
+            logger.info("Process {} is the dispatcher of the task queue".format(os.getpid()))
+            self.queue.requeue_running()
             self._task_creator = TaskCreator(self.queue, self.task_communicator(), self.resources)
         return self._task_creator
 
+    def is_dispatcher(self) -> bool:
+        return self.task_creator() is not None
+
+    def attach_consumers(self, loop):
+        # a WebSocket consumer connected to the event loop of this process
+        if self.publisher:
+            self.publisher.attach(loop)
+            self.status_poller.start()
+
     def id_by_task_runner(self, task_runner: TaskRunner):
+        self.task_creator()
         return self.queue.id_by_runner(task_runner)
 
     def stop(self, task_id: str):
-        task = self.queue.remove(task_id)
-        if task is not None:
-            self.task_creator().stop(task)
+        self.task_creator()
+        task = self.queue.stop(task_id)
+        # if this process is no dispatcher its poller publishes the change like the ones of the other processes
+        if task is not None and self.publisher and self.is_dispatcher():
+            self.publisher.publish(task_id, book_of(task.task_runner), TaskStatus())
 
     def put(self, task_runner: TaskRunner, creator: 'User') -> str:
-        self.task_creator()  # require creation
+        self.task_creator()
         task_id = self.id_generator.gen()
         self.queue.put(task_id, task_runner, creator)
+        if self.publisher and self.is_dispatcher():
+            self.publisher.publish(task_id, book_of(task_runner), TaskStatus(TaskStatusCodes.QUEUED))
         return task_id
 
     def pop_result(self, task_id: str) -> dict:
+        self.task_creator()
         return self.queue.pop_result(task_id)
 
     def status(self, task_id) -> Optional[TaskStatus]:
+        self.task_creator()
         return self.queue.status_of_task(task_id)
 
 
-operation_worker = OperationWorker()
+operation_worker = OperationWorker(publisher=TaskStatusPublisher(TASK_STATUS_PUSH_SETTINGS.min_interval))
@@ -1,6 +1,6 @@
 from enum import IntEnum
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, Union, Optional, NamedTuple, List, Sequence, TypeVar
 from mashumaro import DataClassDictMixin
 
 if TYPE_CHECKING:
@@ -50,6 +50,19 @@ class TaskStatus(DataClassDictMixin):
     n_total: int = 0
 
 
+T = TypeVar('T')
+
+
+class TaskShard(NamedTuple):
+    index: int
+    count: int
+
+    def select(self, items: Sequence[T]) -> List[T]:
+        # contiguous chunk of the items, so that the results of all shards keep the original order
+        n = len(items)
+        return list(items[self.index * n // self.count:(self.index + 1) * n // self.count])
+
+
 @dataclass
 class Task:
     task_id: str
@@ -57,3 +70,4 @@ class Task:
     task_status: TaskStatus
     task_result: Union[dict, Exception]
     creator: 'User'
+    shard: Optional[TaskShard] = None     # set if this task only processes a part of the task with task_id
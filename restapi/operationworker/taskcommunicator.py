@@ -1,6 +1,7 @@
-from typing import NamedTuple, Union
+from typing import NamedTuple, Union, Optional
 from .task import Task, TaskStatus, TaskNotFoundException
 from .taskqueue import TaskQueue
+from .taskstatuspublisher import TaskStatusPublisher, book_of
 from multiprocessing import Queue
 import threading
 import logging
@@ -10,13 +11,14 @@ logger = logging.getLogger(__name__)
 
 class TaskCommunicationData(NamedTuple):
     task: Task
-    status: TaskStatus
+    status: Optional[TaskStatus]    # None only signals that the process is ready for the next task
     data: Union[dict, Exception] = None
 
 
 class TaskCommunicator:
-    def __init__(self, task_queue: TaskQueue):
+    def __init__(self, task_queue: TaskQueue, publisher: Optional[TaskStatusPublisher] = None):
         self.task_queue: TaskQueue = task_queue
+        self.publisher = publisher
         self.queue = Queue()
         # use thread to be in same memory pool as task queue
         self.thread = threading.Thread(target=self.run, args=(), name='task_communicator')
@@ -28,7 +30,12 @@ class TaskCommunicator:
         while True:
             try:
                 com: TaskCommunicationData = self.queue.get()
-                self.task_queue.update_status(com.task.task_id, com.status, com.data)
+                if com.status is None:
+                    self.task_queue.notify()
+                else:
+                    status = self.task_queue.update_status(com.task.task_id, com.status, com.data, com.task.shard)
+                    if self.publisher:
+                        self.publisher.publish(com.task.task_id, book_of(com.task.task_runner), status)
             except TaskNotFoundException:
                 pass
             except EOFError:
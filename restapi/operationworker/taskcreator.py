@@ -1,33 +1,28 @@
 import threading
-from multiprocessing import Queue
 import logging
-from queue import Empty
-import time
 
 from .taskqueue import TaskQueue
 from .taskcommunicator import TaskCommunicator
-from typing import NamedTuple, List
+from typing import List, Optional
 from .taskworkerthread import TaskWorkerThread
 from .taskresources import Resources
+from .taskworkergroup import TaskWorkerGroup
+from .task import TaskShard, TaskStatus, TaskNotFoundException
 
 
 logger = logging.getLogger(__name__)
 
 
-class IntraComData(NamedTuple):
-    op: int
-    data: any
-
-
 class TaskCreator:
-    OP_STOP = 0
-
+    """
+    Dispatcher that starts the queued tasks on the free resources, only one process of a shared queue runs it.
+    """
     def __init__(self, task_queue: TaskQueue, task_communicator: TaskCommunicator, resources: Resources):
         self.task_queue: TaskQueue = task_queue
         self.task_communicator: TaskCommunicator = task_communicator
         self.resources: Resources = resources
-        self.sleep = 0.1
-        self.intra_com = Queue()
+        # dispatching is triggered by changes of the queue, polling is only a fallback for processes that crashed
+        self.poll_interval = 1.0
         self.thread = threading.Thread(target=self.run, args=(), name='task_communicator')
         self.thread.daemon = True       # daemon thread to stop automatically on shutdown
         self.thread.start()
@@ -35,11 +30,15 @@ class TaskCreator:
     def is_alive(self):
         return self.thread.is_alive()
 
-    def stop(self, task):
-        self.intra_com.put(IntraComData(TaskCreator.OP_STOP, task.task_id))
-
     def run(self):
         from .task import TaskStatusCodes
+        task_queue = self.task_queue
+
+        def status_of(task_id: str) -> Optional[TaskStatus]:
+            try:
+                return task_queue.status_of_task(task_id)
+            except TaskNotFoundException:
+                return None
 
         class TaskList:
             def __init__(self):
@@ -47,18 +46,24 @@ class TaskCreator:
 
             def cleanup(self):
                 for task in self.tasks[:]:
-                    if task.finished():
+                    status = status_of(task.task.task_id)
+                    if task.finished(status):
+                        self.remove(task)
+                    elif task.shard is not None and status is not None and status.code == TaskStatusCodes.ERROR:
+                        # another shard of the task failed, the result is an error anyway
+                        task.cancel()
                         self.remove(task)
 
             def cancel(self, task_id: str):
-                for task in self.tasks:
+                found = False
+                for task in self.tasks[:]:
                     if task.task.task_id == task_id:
                         task.cancel()
                         logger.debug("Canceled task with id {} of type {}".format(task.task.task_id, type(task.task.task_runner)))
                         self.remove(task)
-                        return True
+                        found = True
 
-                return False
+                return found
 
             def remove(self, task: TaskWorkerThread):
                 if task not in self.tasks:
@@ -78,28 +83,35 @@ class TaskCreator:
         resources = self.resources
         tasks = TaskList()
 
+        n_changes = self.task_queue.changes()
         while True:
-            # check for tasks
-            try:
-                data: IntraComData = self.intra_com.get_nowait()
-                if data.op == TaskCreator.OP_STOP:
-                    tasks.cancel(data.data)
-            except Empty:
-                pass
+            # cancel the tasks that were stopped by any process
+            for task_id in self.task_queue.pop_stopped():
+                tasks.cancel(task_id)
 
             # cleanup threads that are stopped or do not exist anymore to free resources
             tasks.cleanup()
 
-            # check if new tasks are available
-            queued = self.task_queue.list_queued()
-            for task in queued:
-                for tg in task.task_runner.task_group:
-                    available_resources_for_group = [r for r in resources.resources if r.group == tg and not r.used]
-                    if len(available_resources_for_group) > 0:
-                        task.task_status.code = TaskStatusCodes.RUNNING
-                        r = available_resources_for_group[0]
-                        tasks.append(TaskWorkerThread(r, task, self.task_communicator.queue))
-                        break
-
-            time.sleep(self.sleep)
+            # start the oldest queued task of all groups with free resources until no more task can be started
+            while True:
+                free_groups = [g for g in TaskWorkerGroup if resources.free_of_group(g)]
+                task = self.task_queue.next_queued(free_groups)
+                if task is None:
+                    break
+
+                if not self.task_queue.start(task.task_id):
+                    continue
+
+                tg = next(tg for tg in task.task_runner.task_group if tg in free_groups)
+                n_shards = min(resources.n_free_of_group(tg), task.task_runner.max_shards())
+                if n_shards <= 1:
+                    tasks.append(TaskWorkerThread(resources.free_of_group(tg), task, self.task_communicator.queue))
+                else:
+                    # split the task and occupy all free resources of the group
+                    self.task_queue.set_shards(task.task_id, n_shards)
+                    for i in range(n_shards):
+                        tasks.append(TaskWorkerThread(resources.free_of_group(tg), task, self.task_communicator.queue,
+                                                      TaskShard(i, n_shards)))
+
+            n_changes = self.task_queue.wait_for_change(n_changes, self.poll_interval)
 
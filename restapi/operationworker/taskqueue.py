@@ -1,9 +1,10 @@
-from typing import List, Optional, NamedTuple, Dict, TYPE_CHECKING
-from .task import Task, \
-    TaskAlreadyQueuedException, TaskNotFinishedException, TaskNotFoundException, \
-    TaskStatusCodes, TaskStatus
+from typing import List, Optional, NamedTuple, Dict, Union, Type, TYPE_CHECKING
+from .task import Task, TaskShard, TaskNotFinishedException, TaskNotFoundException, TaskStatusCodes, TaskStatus
+from dataclasses import replace
 from .taskrunners.taskrunner import TaskRunner
-from multiprocessing import Lock
+from .taskworkergroup import TaskWorkerGroup
+from .taskstore import TaskStore, MemoryTaskStore
+from threading import Condition
 
 if TYPE_CHECKING:
     from django.contrib.auth.models import User
@@ -14,87 +15,193 @@ class TaskQueueStatus(NamedTuple):
     n_in_state: Dict[TaskStatusCodes, int]
 
 
+class ShardState(NamedTuple):
+    status: TaskStatus
+    result: Union[dict, Exception, None] = None
+
+
 class TaskQueue:
-    def __init__(self):
-        self.tasks: List[Task] = []
-        self.mutex = Lock()
-        
+    """
+    Queue of all tasks, the tasks themselves are kept in a TaskStore that may be shared by several processes.
+
+    The condition is notified whenever a change could allow a new task to start (put, stop, task finished), changes
+    by other processes are polled.
+    Tasks that are split into shards report per shard to the dispatcher, their states are merged into the status of
+    the task.
+    """
+    def __init__(self, store: Optional[TaskStore] = None):
+        self.store: TaskStore = store if store else MemoryTaskStore()
+        self.shards: Dict[str, List[ShardState]] = {}
+        self.mutex = Condition()
+        self.n_changes = 0
+
+    def _changes(self) -> int:
+        return self.n_changes + self.store.n_changes()
+
+    def _changed(self):
+        self.mutex.notify_all()
+
+    def notify(self):
+        with self.mutex:
+            self.n_changes += 1
+            self._changed()
+
+    def changes(self) -> int:
+        with self.mutex:
+            return self._changes()
+
+    def wait_for_change(self, n_changes: int, timeout: float) -> int:
+        # block until something changed since n_changes was read, returns the new number of changes
+        with self.mutex:
+            self.store.flush()
+            if self.store.poll_interval is not None:
+                timeout = min(timeout, self.store.poll_interval)
+            self.mutex.wait_for(lambda: self._changes() != n_changes, timeout)
+            return self._changes()
+
     def status(self) -> TaskQueueStatus:
         with self.mutex:
-            return TaskQueueStatus(
-                len(self.tasks),
-                {c: len([t for t in self.tasks if t.task_status.code == c]) for c in TaskStatusCodes}
-            )
+            n_in_state = self.store.count_by_code()
+            return TaskQueueStatus(sum(n_in_state.values()), n_in_state)
 
     def remove(self, task_id: str) -> Optional[Task]:
         with self.mutex:
-            for i, t in enumerate(self.tasks):
-                if t.task_id == task_id:
-                    del self.tasks[i]
-                    return t
-
-            return None
+            self.shards.pop(task_id, None)
+            task = self.store.remove(task_id)
+            self._changed()
+            return task
 
-    def has(self, task_id: str, task_runner: TaskRunner):
+    def stop(self, task_id: str) -> Optional[Task]:
+        # remove the task, its processes are canceled by the dispatcher
         with self.mutex:
-            for task in self.tasks:
-                if task.task_id == task_id or self._id_by_runner(task_runner) == task.task_id:
-                    return True
+            self.shards.pop(task_id, None)
+            task = self.store.remove(task_id, stop=True)
+            self._changed()
+            return task
 
-        return False
+    def pop_stopped(self) -> List[str]:
+        with self.mutex:
+            return self.store.pop_stopped()
 
     def put(self, task_id: str, task_runner: TaskRunner, creator: 'User'):
         with self.mutex:
-            for task in self.tasks:
-                if task.task_id == task_id or self._id_by_runner(task_runner) == task.task_id:
-                    raise TaskAlreadyQueuedException(task.task_id)
-
-            self.tasks.append(Task(task_id, task_runner, TaskStatus(code=TaskStatusCodes.QUEUED),
-                                   task_result={},
-                                   creator=creator,
-                                   ))
+            self.store.put(Task(task_id, task_runner, TaskStatus(code=TaskStatusCodes.QUEUED),
+                                task_result={},
+                                creator=creator,
+                                ))
+            self._changed()
 
     def pop_result(self, task_id: str) -> dict:
         with self.mutex:
-            for i, t in enumerate(self.tasks):
-                if t.task_id == task_id:
-                    if t.task_status.code == TaskStatusCodes.QUEUED or t.task_status.code == TaskStatusCodes.RUNNING:
-                        raise TaskNotFinishedException()
+            t = self.store.get(task_id)
+            if t is None:
+                raise TaskNotFoundException()
 
-                    del self.tasks[i]
-                    return t.task_result
+            if t.task_status.code == TaskStatusCodes.QUEUED or t.task_status.code == TaskStatusCodes.RUNNING:
+                raise TaskNotFinishedException()
 
-            raise TaskNotFoundException()
+            self.shards.pop(task_id, None)
+            self.store.remove(task_id)
+            return t.task_result
+
+    def task(self, task_id: str) -> Optional[Task]:
+        with self.mutex:
+            return self.store.get(task_id)
 
     def status_of_task(self, task_id: str) -> TaskStatus:
         with self.mutex:
-            for task in self.tasks:
-                if task.task_id == task_id:
-                    return task.task_status
+            status = self.store.status(task_id)
+            if status is None:
+                raise TaskNotFoundException()
+            return status
 
-            raise TaskNotFoundException()
+    def start(self, task_id: str) -> bool:
+        with self.mutex:
+            return self.store.start(task_id)
 
-    def update_status(self, task_id: str, status: TaskStatus, result: dict = None):
+    def requeue_running(self):
         with self.mutex:
-            for task in self.tasks:
-                if task.task_id == task_id:
-                    task.task_status = status
-                    if result:
-                        task.task_result = result
-                    return
+            self.shards.clear()
+            self.store.requeue_running()
 
-            raise TaskNotFoundException()
+    def set_shards(self, task_id: str, count: int):
+        with self.mutex:
+            self.shards[task_id] = [ShardState(TaskStatus(TaskStatusCodes.RUNNING)) for _ in range(count)]
+
+    def _merge_shard_status(self, task: Task, shard: TaskShard, status: TaskStatus, result):
+        states = self.shards[task.task_id]
+        prev = states[shard.index].status
+        if status.code == TaskStatusCodes.FINISHED:
+            # keep the counts of the last progress update
+            status = replace(prev, code=TaskStatusCodes.FINISHED, progress=1, n_processed=prev.n_total)
+        states[shard.index] = ShardState(status, result)
+
+        errors = [s for s in states if s.status.code == TaskStatusCodes.ERROR]
+        if len(errors) > 0:
+            return TaskStatus(TaskStatusCodes.ERROR), errors[0].result
+
+        if all(s.status.code == TaskStatusCodes.FINISHED for s in states):
+            return TaskStatus(TaskStatusCodes.FINISHED), task.task_runner.merge_shard_results([s.result for s in states])
+
+        statuses = [s.status for s in states]
+        n_total = sum(s.n_total for s in statuses)
+        n_processed = sum(s.n_processed for s in statuses)
+        return TaskStatus(
+            TaskStatusCodes.RUNNING,
+            min(s.progress_code for s in statuses if s.code != TaskStatusCodes.FINISHED),
+            progress=n_processed / n_total if n_total > 0 else sum(max(0, s.progress) for s in statuses) / len(statuses),
+            n_processed=n_processed,
+            n_total=n_total,
+        ), None
+
+    def update_status(self, task_id: str, status: TaskStatus, result: dict = None, shard: Optional[TaskShard] = None) -> TaskStatus:
+        # returns the new status of the task, i.e. the merged status if the task is sharded
+        with self.mutex:
+            final = status.code == TaskStatusCodes.FINISHED or status.code == TaskStatusCodes.ERROR
+            task = None
+            if (shard is not None and task_id in self.shards) or final:
+                # the runner is only required to merge shards and for finished tasks
+                task = self.store.get(task_id)
+                if task is None:
+                    raise TaskNotFoundException()
+
+            if shard is not None and task_id in self.shards:
+                status, result = self._merge_shard_status(task, shard, status, result)
+
+            if status.code in (TaskStatusCodes.FINISHED, TaskStatusCodes.ERROR) and not task.task_runner.keep_result():
+                self.shards.pop(task_id, None)
+                self.store.remove(task_id)
+            elif not self.store.update(task_id, status, result):
+                raise TaskNotFoundException()
+
+            if final:
+                # the resource of the task (or shard) is about to be freed
+                self._changed()
+
+            return status
+
+    def next_queued(self, groups: List[TaskWorkerGroup]) -> Optional[Task]:
+        # the oldest queued task that can run on one of the given groups (e.g. the groups with free resources)
+        with self.mutex:
+            return self.store.next_queued(groups)
+
+    def list_tasks(self) -> List[Task]:
+        with self.mutex:
+            return self.store.tasks()
 
     def list_queued(self) -> List[Task]:
         with self.mutex:
-            return [task for task in self.tasks if task.task_status.code == TaskStatusCodes.QUEUED]
+            return self.store.tasks([TaskStatusCodes.QUEUED])
 
-    def _id_by_runner(self, task_runner: TaskRunner) -> Optional[str]:
-        for task in self.tasks:
-            if task.task_runner == task_runner or (type(task.task_runner) == type(task_runner) and task.task_runner.identifier() == task_runner.identifier()):
-                return task.task_id
-        return None
+    def list_active(self) -> List[Task]:
+        with self.mutex:
+            return self.store.tasks([TaskStatusCodes.QUEUED, TaskStatusCodes.RUNNING])
+
+    def find_active(self, runner_type: Type[TaskRunner], identifier_part: str) -> List[Task]:
+        # the queued and running tasks of the runner type whose identifier contains the given repr
+        with self.mutex:
+            return self.store.find(runner_type, identifier_part, [TaskStatusCodes.QUEUED, TaskStatusCodes.RUNNING])
 
     def id_by_runner(self, task_runner: TaskRunner) -> Optional[str]:
         with self.mutex:
-            return self._id_by_runner(task_runner)
+            return self.store.id_by_runner(task_runner)
@@ -1,14 +1,18 @@
 from dataclasses import dataclass
 from .taskworkergroup import TaskWorkerGroup
-from typing import List
+from typing import List, Optional, Dict, TYPE_CHECKING
 from multiprocessing import Value
 
+if TYPE_CHECKING:
+    from .taskworkerprocess import TaskWorkerProcess
+
 
 class TaskResource:
     def __init__(self, group: TaskWorkerGroup, gpu_id: int = -1):
         self.group = group
         self.gpu_id = gpu_id
         self._used = Value('b', False)
+        self.worker: Optional['TaskWorkerProcess'] = None   # long living process, created on demand
 
     @property
     def used(self):
@@ -25,7 +29,20 @@ ResourcesList = List[TaskResource]
 class Resources:
     def __init__(self, resources: ResourcesList = None):
         self.resources = resources if resources else []
-        
+        self.by_group: Dict[TaskWorkerGroup, ResourcesList] = {g: [] for g in TaskWorkerGroup}
+        for r in self.resources:
+            self.by_group[r.group].append(r)
+
+    def free_of_group(self, group: TaskWorkerGroup) -> Optional[TaskResource]:
+        for r in self.by_group[group]:
+            if not r.used:
+                return r
+
+        return None
+
+    def n_free_of_group(self, group: TaskWorkerGroup) -> int:
+        return len([r for r in self.by_group[group] if not r.used])
+
     def free(self) -> ResourcesList:
         return [r for r in self.resources if not r.used]
     
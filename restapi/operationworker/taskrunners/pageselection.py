@@ -1,10 +1,12 @@
 from database.database_page import DatabaseBook, DatabasePage
+from database.database_book_page_states import DatabaseBookPageStates
 from database.file_formats.pcgts import PcGts
 from typing import Optional, List, Tuple, Callable
 from enum import Enum
 from dataclasses import dataclass, field
 from mashumaro import DataClassDictMixin
 from shared.jsonparsing import JsonParseKeyNotFound, require_json
+from ..task import TaskShard
 
 
 class PageCount(Enum):
@@ -75,27 +77,34 @@ class PageSelection:
         )
 
     def identifier(self) -> Tuple:
-        return self.book, self.page_count, self.pages
+        return self.book, self.page_count, tuple(self.pages)
 
     def __eq__(self, other):
         return isinstance(other, type(self)) and self.identifier() == other.identifier()
 
-    def get_pages(self, unprocessed: Optional[Callable[[DatabasePage], bool]] = None) -> List[DatabasePage]:
+    def get_pages(self, unprocessed: Optional[Callable[[DatabasePage], bool]] = None,
+                  shard: Optional[TaskShard] = None) -> List[DatabasePage]:
         if self.pcgts:
             return [DatabasePage(self.book, 'in_memory', skip_validation=True, pcgts=pcgts) for pcgts in self.pcgts]
 
-        def page_count_pages() -> List[DatabasePage]:
-            if self.page_count == PageCount.ALL:
-                return self.book.pages()
-            elif self.page_count == PageCount.UNPROCESSED:
-                if unprocessed:
-                    return [p for p in self.book.pages() if unprocessed(p)]
-                else:
-                    return self.book.pages()
-            else:
-                return self.pages
-
-        return [page for page in page_count_pages() if not page.page_progress().verified]
+        if self.page_count == PageCount.CUSTOM:
+            pages = self.pages
+        else:
+            pages = self.book.pages()
+
+        if shard is not None:
+            # select the shard before filtering, other shards change the processing state of their pages meanwhile
+            pages = shard.select(pages)
+
+        # verified pages are skipped before the (more expensive) check of their pcgts, the states of all pages are
+        # read from the index of the book at once
+        states = DatabaseBookPageStates(self.book).page_states(pages)
+        pages = [page for page in pages if not states[page.page].verified]
+
+        if self.page_count == PageCount.UNPROCESSED and unprocessed:
+            pages = [p for p in pages if unprocessed(p)]
+
+        return pages
 
     def get_pcgts(self, unprocessed: Optional[Callable[[DatabasePage], bool]] = None) -> List[PcGts]:
         if self.pcgts:
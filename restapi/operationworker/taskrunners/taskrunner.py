@@ -25,6 +25,26 @@ class TaskRunner(ABC):
     def identifier(self) -> Tuple:
         return ()
 
+    def use_warm_worker(self) -> bool:
+        # run in a long living process of the resource instead of a new process
+        return False
+
+    def max_shards(self) -> int:
+        # number of parallel processes the task may be split into, run must then only process task.shard
+        return 1
+
+    def merge_shard_results(self, results: List[dict]) -> dict:
+        # result of the task from the results of its shards, must be overridden if max_shards() > 1
+        if len(results) == 1:
+            return results[0]
+
+        raise NotImplementedError('{} was run in {} shards (max_shards() = {}) but does not implement merge_shard_results'.format(
+            self.__class__.__name__, len(results), self.max_shards()))
+
+    def keep_result(self) -> bool:
+        # if False, the task is removed from the queue once it finished since nobody requests its result
+        return True
+
     @abstractmethod
     def run(self, task: Task, com_queue: Queue) -> dict:
         return {}
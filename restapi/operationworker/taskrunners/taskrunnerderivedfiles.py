@@ -0,0 +1,62 @@
+from ommr4all.settings import DERIVED_FILES_SETTINGS
+from .taskrunner import TaskRunner, Queue, TaskWorkerGroup, Tuple, AlgorithmTypes
+from ..taskcommunicator import TaskCommunicationData
+from ..task import Task, TaskStatus, TaskStatusCodes, TaskProgressCodes
+from .pageselection import PageSelection, DatabasePage
+from typing import List, Optional
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRunnerDerivedFiles(TaskRunner):
+    """
+    Creates the missing derived images (e.g. the preprocessed and normalized images) of pages in the background,
+    e.g. after upload, so that requests of these files do not have to create them.
+    """
+    def __init__(self,
+                 selection: PageSelection,
+                 file_ids: Optional[List[str]] = None,
+                 ):
+        super().__init__(AlgorithmTypes.PREPROCESSING, selection, [TaskWorkerGroup.NORMAL_TASKS_CPU])
+        from database.tools.derived_files import preprocessed_files
+        self.file_ids = file_ids if file_ids is not None else preprocessed_files
+
+    def identifier(self) -> Tuple:
+        return self.selection.identifier(), tuple(self.file_ids)
+
+    def keep_result(self) -> bool:
+        return False
+
+    def is_pending(self, page: DatabasePage, file_id: str) -> bool:
+        # whether the file of the page will be created by this task
+        from database.database_file import DatabaseFile
+        return page in self.selection.pages and any(file_id in level for level in DatabaseFile.dependency_levels(self.file_ids))
+
+    def run(self, task: Task, com_queue: Queue) -> dict:
+        from database.tools.derived_files import create_derived_files
+
+        def callback(n_processed: int, n_total: int):
+            com_queue.put(TaskCommunicationData(task, TaskStatus(
+                TaskStatusCodes.RUNNING,
+                TaskProgressCodes.WORKING,
+                progress=n_processed / n_total,
+                n_total=n_total,
+                n_processed=n_processed,
+            )))
+
+        pages = self.selection.get_pages()
+        logger.debug("Creating derived files of {} pages".format(len(pages)))
+        errors = create_derived_files(pages, self.file_ids, DERIVED_FILES_SETTINGS.n_processes, callback)
+        return {
+            'errors': [{'page': page.page, 'file': file_id, 'error': str(e)} for page, file_id, e in errors],
+        }
+
+
+def derived_files_pending(page: DatabasePage, file_id: str) -> bool:
+    # whether a queued or running task will create the file of the page
+    from restapi.operationworker import operation_worker
+    # only the tasks whose selection contains the page are loaded
+    return any(task.task_runner.is_pending(page, file_id)
+               for task in operation_worker.queue.find_active(TaskRunnerDerivedFiles, repr(page)))
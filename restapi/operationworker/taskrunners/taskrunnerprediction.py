@@ -1,9 +1,10 @@
 from omr.steps.algorithmpreditorparams import AlgorithmPredictorParams
+from ommr4all.settings import PREDICTOR_CACHE_SETTINGS
 from .taskrunner import TaskRunner, Queue, TaskWorkerGroup, Tuple, AlgorithmTypes
 from ..taskcommunicator import TaskCommunicationData
 from ..task import Task, TaskStatus, TaskStatusCodes, TaskProgressCodes
-from .pageselection import PageSelection, DatabasePage
-from typing import NamedTuple
+from .pageselection import PageSelection, DatabasePage, PageCount
+from typing import NamedTuple, List
 import logging
 
 
@@ -28,8 +29,26 @@ class TaskRunnerPrediction(TaskRunner):
     def identifier(self) -> Tuple:
         return self.selection.identifier(), self.algorithm_type
 
+    def use_warm_worker(self) -> bool:
+        return PREDICTOR_CACHE_SETTINGS.max_entries > 0
+
+    def max_shards(self) -> int:
+        if self.selection.single_page:
+            return 1
+        elif self.selection.page_count == PageCount.CUSTOM:
+            return len(self.selection.pages)
+        else:
+            # upper bound, the actual pages are resolved in the shards
+            return len(self.selection.book.pages())
+
+    def merge_shard_results(self, results: List[dict]) -> dict:
+        return {
+            'results': [r for shard_results in results for r in shard_results['results']]
+        }
+
     def run(self, task: Task, com_queue: Queue) -> dict:
         from omr.steps.algorithm import PredictionCallback, AlgorithmPredictor, AlgorithmPredictorSettings
+        from omr.steps.predictorcache import predictor_cache
         meta = self.algorithm_meta()
 
         class Callback(PredictionCallback):
@@ -53,19 +72,16 @@ class TaskRunnerPrediction(TaskRunner):
             model=meta.selected_model_for_book(self.selection.book),
             params=self.settings.params,
         )
-        staff_line_detector: AlgorithmPredictor = meta.create_predictor(params)
+        staff_line_detector: AlgorithmPredictor = predictor_cache.get(meta, params)
         com_queue.put(TaskCommunicationData(task, TaskStatus(TaskStatusCodes.RUNNING, TaskProgressCodes.WORKING)))
 
-        pages = self.selection.get_pages(meta.predictor().unprocessed)
+        pages = self.selection.get_pages(meta.predictor().unprocessed, task.shard)
         logger.debug("Algorithm {} processing {} pages".format(self.algorithm_type.name, len(pages)))
 
-        staves = list(staff_line_detector.predict(pages, Callback()))
-        results = [
-            page_staves.to_dict() for page_staves in staves
-        ]
-
-        if self.settings.store_to_pcgts:
-            for page_staves in staves:
+        results = []
+        for page_staves in staff_line_detector.predict(pages, Callback()):
+            results.append(page_staves.to_dict())
+            if self.settings.store_to_pcgts:
                 page_staves.store_to_page()
 
         if self.selection.single_page:
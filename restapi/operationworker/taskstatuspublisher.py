@@ -0,0 +1,185 @@
+from typing import NamedTuple, Optional, Dict, List, Tuple, Callable, TYPE_CHECKING
+from collections import OrderedDict
+from threading import Condition
+import threading
+import asyncio
+import hashlib
+import logging
+import time
+
+from .task import TaskStatus, TaskStatusCodes
+
+if TYPE_CHECKING:
+    from .taskrunners.taskrunner import TaskRunner
+    from .taskqueue import TaskQueue
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStatusUpdate(NamedTuple):
+    task_id: str
+    book: Optional[str]
+    status: TaskStatus
+
+    def message(self) -> dict:
+        # handled by TaskStatusConsumer.task_status
+        return {'type': 'task.status', 'task': self.task_id, 'book': self.book, 'status': self.status.to_dict()}
+
+
+def task_group(task_id: str) -> str:
+    return 'task_status.task.{}'.format(task_id)
+
+
+def book_group(book: str) -> str:
+    # group names must be ascii
+    return 'task_status.book.{}'.format(hashlib.sha1(book.encode('utf-8')).hexdigest())
+
+
+def book_of(task_runner: 'TaskRunner') -> Optional[str]:
+    return task_runner.selection.book.book if task_runner.selection else None
+
+
+def is_final(status: TaskStatus) -> bool:
+    return status.code in (TaskStatusCodes.FINISHED, TaskStatusCodes.ERROR, TaskStatusCodes.NOT_FOUND)
+
+
+class TaskStatusPublisher:
+    """
+    Pushes the status updates of the tasks to the subscribed WebSocket consumers via the channel layer.
+
+    The updates of a task are coalesced to at most one per interval (e.g. the progress of every training iteration),
+    changes of the status or progress code and final states are pushed immediately.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.pending: 'OrderedDict[str, TaskStatusUpdate]' = OrderedDict()
+        self.last: Dict[str, Tuple[float, TaskStatusCodes, int]] = {}   # time and codes of the last pushed update
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.mutex = Condition()
+        self.thread: Optional[threading.Thread] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        # event loop of the consumers of this process, the in-memory channel layer may only be used from it
+        self.loop = loop
+
+    def publish(self, task_id: str, book: Optional[str], status: TaskStatus):
+        with self.mutex:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, args=(), name='task_status_publisher')
+                self.thread.daemon = True       # daemon thread to stop automatically on shutdown
+                self.thread.start()
+
+            self.pending[task_id] = TaskStatusUpdate(task_id, book, status)
+            self.mutex.notify_all()
+
+    def _due(self, update: TaskStatusUpdate, now: float) -> float:
+        last = self.last.get(update.task_id)
+        if last is None or is_final(update.status) or last[1:] != (update.status.code, update.status.progress_code):
+            return now
+
+        return last[0] + self.interval
+
+    def pop_due(self, now: float) -> Tuple[List[TaskStatusUpdate], Optional[float]]:
+        # the updates to push now and the time the next pending update is due
+        due, next_due = [], None
+        for task_id, update in list(self.pending.items()):
+            t = self._due(update, now)
+            if t > now:
+                next_due = t if next_due is None else min(next_due, t)
+                continue
+
+            due.append(update)
+            del self.pending[task_id]
+            if is_final(update.status):
+                self.last.pop(task_id, None)
+            else:
+                self.last[task_id] = (now, update.status.code, update.status.progress_code)
+
+        return due, next_due
+
+    def run(self):
+        logger.info("THREAD task_status_publisher: Started")
+        while True:
+            with self.mutex:
+                due, next_due = self.pop_due(time.monotonic())
+                if len(due) == 0:
+                    self.mutex.wait(None if next_due is None else next_due - time.monotonic())
+                    continue
+
+            try:
+                self.send(due)
+            except Exception as e:
+                logger.exception(e)
+
+    def send(self, updates: List[TaskStatusUpdate]):
+        from channels.layers import get_channel_layer
+        from asgiref.sync import async_to_sync
+        layer = get_channel_layer()
+        if layer is None:
+            return
+
+        async def send_all():
+            for update in updates:
+                await layer.group_send(task_group(update.task_id), update.message())
+                if update.book:
+                    await layer.group_send(book_group(update.book), update.message())
+
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(send_all(), loop).result()
+        else:
+            async_to_sync(send_all)()
+
+
+class TaskStatusPoller:
+    """
+    Publishes the changes of the tasks of a queue shared by several processes to the consumers of this process.
+
+    The dispatcher publishes the updates of its tasks itself, the other processes poll the store of the queue (the
+    progress of running tasks is written by the dispatcher at most once per poll interval) while they are no dispatcher.
+    """
+    def __init__(self, queue: 'TaskQueue', publisher: TaskStatusPublisher, interval: float,
+                 is_dispatcher: Callable[[], bool]):
+        self.queue = queue
+        self.publisher = publisher
+        self.interval = interval
+        self.is_dispatcher = is_dispatcher
+        self.states: Optional[Dict[str, TaskStatusUpdate]] = None     # last polled state of each task
+        self.mutex = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        with self.mutex:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, args=(), name='task_status_poller')
+                self.thread.daemon = True       # daemon thread to stop automatically on shutdown
+                self.thread.start()
+
+    def poll(self):
+        if self.is_dispatcher():
+            self.states = None
+            return
+
+        states = {t.task_id: TaskStatusUpdate(t.task_id, book_of(t.task_runner), t.task_status)
+                  for t in self.queue.list_tasks()}
+        if self.states is not None:
+            for task_id, update in states.items():
+                last = self.states.get(task_id)
+                if last is None or last.status != update.status:
+                    self.publisher.publish(task_id, update.book, update.status)
+
+            for task_id, last in self.states.items():
+                if task_id not in states and not is_final(last.status):
+                    # stopped
+                    self.publisher.publish(task_id, last.book, TaskStatus())
+
+        self.states = states
+
+    def run(self):
+        logger.info("THREAD task_status_poller: Started")
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception(e)
+            time.sleep(self.interval)
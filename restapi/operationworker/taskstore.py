@@ -0,0 +1,506 @@
+from abc import ABC, abstractmethod
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Deque, Hashable, Iterable, Type, TYPE_CHECKING
+import fcntl
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import time
+
+from .task import Task, TaskStatus, TaskStatusCodes, TaskAlreadyQueuedException
+from .taskworkergroup import TaskWorkerGroup
+
+if TYPE_CHECKING:
+    from .taskrunners.taskrunner import TaskRunner
+
+logger = logging.getLogger(__name__)
+
+
+def runner_key(task_runner: 'TaskRunner') -> Hashable:
+    # two runners of the same type with the same identifier describe the same task
+    return type(task_runner), task_runner.identifier()
+
+
+class TaskStore(ABC):
+    """
+    Storage of the tasks of the queue, i.e. their runners, states and results.
+
+    A store may be shared by several processes (e.g. the workers of the server), of which only the dispatcher starts
+    the queued tasks on its resources. The others only put, stop and read tasks.
+    The store is not thread safe, the access is synchronized by the TaskQueue.
+    """
+    # interval in which changes of other processes are checked, None if the store is not shared
+    poll_interval: Optional[float] = None
+
+    @abstractmethod
+    def put(self, task: Task):
+        # raises TaskAlreadyQueuedException if a task with the same id or runner exists
+        pass
+
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Task]:
+        pass
+
+    @abstractmethod
+    def status(self, task_id: str) -> Optional[TaskStatus]:
+        pass
+
+    @abstractmethod
+    def update(self, task_id: str, status: TaskStatus, result=None) -> bool:
+        # False if the task does not exist
+        pass
+
+    @abstractmethod
+    def start(self, task_id: str) -> bool:
+        # marks a queued task as running, False if the task was removed or started meanwhile
+        pass
+
+    @abstractmethod
+    def remove(self, task_id: str, stop: bool = False) -> Optional[Task]:
+        # if stop, the running processes of the task are canceled by the dispatcher
+        pass
+
+    @abstractmethod
+    def pop_stopped(self) -> List[str]:
+        # ids of the tasks that were stopped since the last call
+        pass
+
+    @abstractmethod
+    def id_by_runner(self, task_runner: 'TaskRunner') -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def tasks(self, codes: Optional[Iterable[TaskStatusCodes]] = None) -> List[Task]:
+        # all tasks (or those with the given codes) in the order they were put
+        pass
+
+    @abstractmethod
+    def find(self, runner_type: Type['TaskRunner'], identifier_part: str,
+             codes: Optional[Iterable[TaskStatusCodes]] = None) -> List[Task]:
+        # the tasks of the runner type whose identifier contains the given repr (e.g. of a page), without loading the
+        # runners of all tasks
+        pass
+
+    @abstractmethod
+    def count_by_code(self) -> Dict[TaskStatusCodes, int]:
+        pass
+
+    @abstractmethod
+    def next_queued(self, groups: List[TaskWorkerGroup]) -> Optional[Task]:
+        # the oldest queued task that can run on one of the given groups
+        pass
+
+    @abstractmethod
+    def requeue_running(self):
+        # called by a new dispatcher, the tasks that were running in the previous one are started again
+        pass
+
+    @abstractmethod
+    def n_changes(self) -> int:
+        # incremented whenever a change could allow a new task to start (put, stop, task finished)
+        pass
+
+    @abstractmethod
+    def acquire_dispatcher(self) -> bool:
+        # whether this process is (or now became) the dispatcher of the store
+        pass
+
+    def flush(self):
+        # write the progress updates that are delayed by the store, called regularly by the dispatcher
+        pass
+
+
+class MemoryTaskStore(TaskStore):
+    """
+    Store of a single process, e.g. for tests.
+
+    Queued tasks are additionally kept in a FIFO per TaskWorkerGroup which serves as priority for the dispatching.
+    """
+    def __init__(self):
+        self._tasks: 'OrderedDict[str, Task]' = OrderedDict()
+        self._by_runner: Dict[Hashable, Task] = {}
+        self._queued: Dict[TaskWorkerGroup, Deque[Task]] = {g: deque() for g in TaskWorkerGroup}
+        self._order: Dict[str, int] = {}
+        self._stopped: List[str] = []
+        self._counter = 0
+        self._n_changes = 0
+
+    def put(self, task: Task):
+        existing = self._tasks.get(task.task_id) or self._by_runner.get(runner_key(task.task_runner))
+        if existing:
+            raise TaskAlreadyQueuedException(existing.task_id)
+
+        self._tasks[task.task_id] = task
+        self._by_runner[runner_key(task.task_runner)] = task
+        self._order[task.task_id] = self._counter
+        self._counter += 1
+        for tg in task.task_runner.task_group:
+            self._queued[tg].append(task)
+
+        self._n_changes += 1
+
+    def get(self, task_id: str) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def status(self, task_id: str) -> Optional[TaskStatus]:
+        task = self._tasks.get(task_id)
+        return task.task_status if task else None
+
+    def update(self, task_id: str, status: TaskStatus, result=None) -> bool:
+        task = self._tasks.get(task_id)
+        if task is None:
+            return False
+
+        task.task_status = status
+        if result:
+            task.task_result = result
+
+        if status.code in (TaskStatusCodes.FINISHED, TaskStatusCodes.ERROR):
+            self._n_changes += 1
+
+        return True
+
+    def start(self, task_id: str) -> bool:
+        task = self._tasks.get(task_id)
+        if task is None or task.task_status.code != TaskStatusCodes.QUEUED:
+            return False
+
+        task.task_status = TaskStatus(TaskStatusCodes.RUNNING)
+        return True
+
+    def remove(self, task_id: str, stop: bool = False) -> Optional[Task]:
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return None
+
+        self._order.pop(task_id, None)
+        key = runner_key(task.task_runner)
+        if self._by_runner.get(key) is task:
+            del self._by_runner[key]
+
+        if stop:
+            self._stopped.append(task_id)
+
+        # entries in the queued deques are dropped lazily
+        self._n_changes += 1
+        return task
+
+    def pop_stopped(self) -> List[str]:
+        stopped, self._stopped = self._stopped, []
+        return stopped
+
+    def id_by_runner(self, task_runner: 'TaskRunner') -> Optional[str]:
+        task = self._by_runner.get(runner_key(task_runner))
+        return task.task_id if task else None
+
+    def tasks(self, codes: Optional[Iterable[TaskStatusCodes]] = None) -> List[Task]:
+        if codes is None:
+            return list(self._tasks.values())
+
+        codes = set(codes)
+        return [task for task in self._tasks.values() if task.task_status.code in codes]
+
+    def find(self, runner_type: Type['TaskRunner'], identifier_part: str,
+             codes: Optional[Iterable[TaskStatusCodes]] = None) -> List[Task]:
+        return [task for task in self.tasks(codes)
+                if type(task.task_runner) is runner_type and identifier_part in repr(task.task_runner.identifier())]
+
+    def count_by_code(self) -> Dict[TaskStatusCodes, int]:
+        n_in_state = {c: 0 for c in TaskStatusCodes}
+        for task in self._tasks.values():
+            n_in_state[task.task_status.code] += 1
+        return n_in_state
+
+    def _is_queued(self, task: Task) -> bool:
+        return self._tasks.get(task.task_id) is task and task.task_status.code == TaskStatusCodes.QUEUED
+
+    def next_queued(self, groups: List[TaskWorkerGroup]) -> Optional[Task]:
+        best: Optional[Task] = None
+        for tg in groups:
+            q = self._queued[tg]
+            while len(q) > 0 and not self._is_queued(q[0]):
+                q.popleft()
+
+            if len(q) > 0 and (best is None or self._order[q[0].task_id] < self._order[best.task_id]):
+                best = q[0]
+
+        return best
+
+    def requeue_running(self):
+        pass
+
+    def n_changes(self) -> int:
+        return self._n_changes
+
+    def acquire_dispatcher(self) -> bool:
+        return True
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    runner_key TEXT NOT NULL UNIQUE,
+    code INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    task BLOB NOT NULL,
+    result BLOB
+);
+CREATE TABLE IF NOT EXISTS task_groups (
+    task_id TEXT NOT NULL,
+    task_group INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS task_groups_task_id ON task_groups (task_id);
+CREATE TABLE IF NOT EXISTS stopped (
+    task_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    n INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO changes (id, n) VALUES (0, 0);
+"""
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Store in a SQLite database that is shared by all processes of the server on one host.
+
+    The runner and the creator of a task are pickled, the status is stored as json so that it is read without the
+    runner. The dispatcher is the process that holds the lock on a sidecar file of the database, if it terminates
+    another process takes over on its next access of the queue.
+    The progress updates of running tasks are written at most once per poll interval, the latest one is kept in
+    memory meanwhile (and returned by the reads of this process) until the dispatcher flushes it.
+    """
+    def __init__(self, path: str, poll_interval: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._dispatcher_lock = None
+        self._is_dispatcher = False
+        self._pending: Dict[str, TaskStatus] = {}
+        self._written: Dict[str, float] = {}    # time of the last written progress update of a task
+
+    def _db(self) -> sqlite3.Connection:
+        # connections must not be shared with forked processes
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            # the queue is not lost on crashes of the process, only on power loss which is acceptable for the queue
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(SQLITE_SCHEMA)
+            self._pid = os.getpid()
+
+        return self._connection
+
+    @contextmanager
+    def _transaction(self, changed: bool = False):
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+            if changed:
+                db.execute('UPDATE changes SET n = n + 1')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        else:
+            db.execute('COMMIT')
+
+    @staticmethod
+    def _key(task_runner: 'TaskRunner') -> str:
+        t, identifier = runner_key(task_runner)
+        return '{}.{}{!r}'.format(t.__module__, t.__qualname__, identifier)
+
+    def _task(self, row) -> Optional[Task]:
+        task_id, status, data, result = row
+        try:
+            task_runner, creator, shard = pickle.loads(data)
+            status = self._pending.get(task_id) or TaskStatus.from_dict(json.loads(status))
+            return Task(task_id, task_runner, status,
+                        pickle.loads(result) if result is not None else {}, creator, shard)
+        except Exception as e:
+            # e.g. stored by an incompatible version of the server
+            logger.warning('Dropping task {} that can not be loaded: {}'.format(task_id, e))
+            with self._transaction(changed=True) as db:
+                self._delete(db, task_id)
+            return None
+
+    def _tasks(self, query: str, args=()) -> List[Task]:
+        rows = self._db().execute('SELECT task_id, status, task, result FROM tasks ' + query, args).fetchall()
+        return [t for t in map(self._task, rows) if t is not None]
+
+    def _delete(self, db: sqlite3.Connection, task_id: str):
+        self._pending.pop(task_id, None)
+        self._written.pop(task_id, None)
+        db.execute('DELETE FROM tasks WHERE task_id = ?', (task_id,))
+        db.execute('DELETE FROM task_groups WHERE task_id = ?', (task_id,))
+
+    def put(self, task: Task):
+        key = self._key(task.task_runner)
+        with self._transaction(changed=True) as db:
+            existing = db.execute('SELECT task_id FROM tasks WHERE task_id = ? OR runner_key = ?',
+                                  (task.task_id, key)).fetchone()
+            if existing:
+                raise TaskAlreadyQueuedException(existing[0])
+
+            db.execute('INSERT INTO tasks (task_id, runner_key, code, status, task, result) VALUES (?, ?, ?, ?, ?, ?)',
+                       (task.task_id, key, task.task_status.code.value, json.dumps(task.task_status.to_dict()),
+                        pickle.dumps((task.task_runner, task.creator, task.shard)), pickle.dumps(task.task_result)))
+            db.executemany('INSERT INTO task_groups (task_id, task_group) VALUES (?, ?)',
+                           [(task.task_id, tg.value) for tg in task.task_runner.task_group])
+
+    def get(self, task_id: str) -> Optional[Task]:
+        tasks = self._tasks('WHERE task_id = ?', (task_id,))
+        return tasks[0] if tasks else None
+
+    def status(self, task_id: str) -> Optional[TaskStatus]:
+        if task_id in self._pending:
+            return self._pending[task_id]
+
+        row = self._db().execute('SELECT status FROM tasks WHERE task_id = ?', (task_id,)).fetchone()
+        return TaskStatus.from_dict(json.loads(row[0])) if row else None
+
+    def update(self, task_id: str, status: TaskStatus, result=None) -> bool:
+        final = status.code in (TaskStatusCodes.FINISHED, TaskStatusCodes.ERROR)
+        if status.code == TaskStatusCodes.RUNNING and not result:
+            now = time.monotonic()
+            if now - self._written.get(task_id, -self.poll_interval) < self.poll_interval:
+                if self._db().execute('SELECT 1 FROM tasks WHERE task_id = ?', (task_id,)).fetchone() is None:
+                    return False
+
+                self._pending[task_id] = status
+                return True
+
+            self._written[task_id] = now
+        else:
+            self._written.pop(task_id, None)
+
+        self._pending.pop(task_id, None)
+        with self._transaction(changed=final) as db:
+            if result:
+                cursor = db.execute('UPDATE tasks SET code = ?, status = ?, result = ? WHERE task_id = ?',
+                                    (status.code.value, json.dumps(status.to_dict()), pickle.dumps(result), task_id))
+            else:
+                cursor = db.execute('UPDATE tasks SET code = ?, status = ? WHERE task_id = ?',
+                                    (status.code.value, json.dumps(status.to_dict()), task_id))
+            return cursor.rowcount > 0
+
+    def start(self, task_id: str) -> bool:
+        status = TaskStatus(TaskStatusCodes.RUNNING)
+        self._pending.pop(task_id, None)
+        with self._transaction() as db:
+            cursor = db.execute('UPDATE tasks SET code = ?, status = ? WHERE task_id = ? AND code = ?',
+                                (status.code.value, json.dumps(status.to_dict()), task_id, TaskStatusCodes.QUEUED.value))
+            return cursor.rowcount > 0
+
+    def remove(self, task_id: str, stop: bool = False) -> Optional[Task]:
+        task = self.get(task_id)
+        if task is None:
+            return None
+
+        with self._transaction(changed=True) as db:
+            self._delete(db, task_id)
+            if stop:
+                db.execute('INSERT INTO stopped (task_id) VALUES (?)', (task_id,))
+
+        return task
+
+    def pop_stopped(self) -> List[str]:
+        with self._transaction() as db:
+            stopped = [r[0] for r in db.execute('SELECT task_id FROM stopped').fetchall()]
+            db.execute('DELETE FROM stopped')
+            return stopped
+
+    def id_by_runner(self, task_runner: 'TaskRunner') -> Optional[str]:
+        row = self._db().execute('SELECT task_id FROM tasks WHERE runner_key = ?', (self._key(task_runner),)).fetchone()
+        return row[0] if row else None
+
+    def tasks(self, codes: Optional[Iterable[TaskStatusCodes]] = None) -> List[Task]:
+        if codes is None:
+            return self._tasks('ORDER BY seq')
+
+        codes = [c.value for c in codes]
+        return self._tasks('WHERE code IN ({}) ORDER BY seq'.format(', '.join('?' * len(codes))), codes)
+
+    def find(self, runner_type: Type['TaskRunner'], identifier_part: str,
+             codes: Optional[Iterable[TaskStatusCodes]] = None) -> List[Task]:
+        # the key is the qualified name of the type followed by the repr of the identifier (a tuple)
+        prefix = '{}.{}('.format(runner_type.__module__, runner_type.__qualname__)
+        query, args = 'WHERE substr(runner_key, 1, ?) = ? AND instr(runner_key, ?) > 0', [len(prefix), prefix, identifier_part]
+        if codes is not None:
+            codes = [c.value for c in codes]
+            query += ' AND code IN ({})'.format(', '.join('?' * len(codes)))
+            args += codes
+        return self._tasks(query + ' ORDER BY seq', args)
+
+    def count_by_code(self) -> Dict[TaskStatusCodes, int]:
+        n_in_state = {c: 0 for c in TaskStatusCodes}
+        for code, n in self._db().execute('SELECT code, COUNT(*) FROM tasks GROUP BY code').fetchall():
+            n_in_state[TaskStatusCodes(code)] = n
+        return n_in_state
+
+    def next_queued(self, groups: List[TaskWorkerGroup]) -> Optional[Task]:
+        if len(groups) == 0:
+            return None
+
+        tasks = self._tasks('WHERE code = ? AND task_id IN (SELECT task_id FROM task_groups WHERE task_group IN ({})) '
+                            'ORDER BY seq LIMIT 1'.format(', '.join('?' * len(groups))),
+                            [TaskStatusCodes.QUEUED.value] + [g.value for g in groups])
+        return tasks[0] if tasks else None
+
+    def requeue_running(self):
+        status = TaskStatus(TaskStatusCodes.QUEUED)
+        self._pending.clear()
+        self._written.clear()
+        with self._transaction(changed=True) as db:
+            db.execute('UPDATE tasks SET code = ?, status = ? WHERE code = ?',
+                       (status.code.value, json.dumps(status.to_dict()), TaskStatusCodes.RUNNING.value))
+            db.execute('DELETE FROM stopped')
+
+    def n_changes(self) -> int:
+        return self._db().execute('SELECT n FROM changes WHERE id = 0').fetchone()[0]
+
+    def acquire_dispatcher(self) -> bool:
+        if self._is_dispatcher:
+            return True
+
+        if self._dispatcher_lock is None:
+            lock_path = os.path.join(os.path.dirname(self.path), '.' + os.path.basename(self.path) + '.dispatcher.lock')
+            self._dispatcher_lock = open(lock_path, 'a')
+
+        try:
+            # a record lock is not inherited by the forked worker processes, it is held until this process terminates
+            fcntl.lockf(self._dispatcher_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+
+        self._is_dispatcher = True
+        return True
+
+    def flush(self):
+        if len(self._pending) == 0:
+            return
+
+        now = time.monotonic()
+        with self._transaction() as db:
+            for task_id, status in self._pending.items():
+                db.execute('UPDATE tasks SET code = ?, status = ? WHERE task_id = ?',
+                           (status.code.value, json.dumps(status.to_dict()), task_id))
+                self._written[task_id] = now
+        self._pending.clear()
+
+
+def default_task_store() -> TaskStore:
+    from ommr4all.settings import TASK_STORE_SETTINGS
+    if TASK_STORE_SETTINGS.backend == 'memory':
+        return MemoryTaskStore()
+    elif TASK_STORE_SETTINGS.backend == 'sqlite':
+        return SQLiteTaskStore(TASK_STORE_SETTINGS.path, TASK_STORE_SETTINGS.poll_interval)
+    else:
+        raise ValueError('Unknown task store backend {}'.format(TASK_STORE_SETTINGS.backend))
@@ -0,0 +1,60 @@
+from multiprocessing import Queue, Process, Value
+from .task import Task
+from .taskcommunicator import TaskCommunicationData
+import atexit
+import logging
+logger = logging.getLogger(__name__)
+
+
+class TaskWorkerProcess:
+    """
+    Long living process that is bound to a single resource and runs its tasks one after another.
+
+    In contrast to a process per task, the state of the process (e.g. loaded predictors) is kept between tasks.
+    """
+    def __init__(self, gpu_id: int, com_queue: Queue):
+        self.gpu_id = gpu_id
+        self.com_queue = com_queue
+        self.inbox = Queue()
+        self.n_submitted = 0
+        self.n_done = Value('i', 0)
+        self.process = Process(target=TaskWorkerProcess._run,
+                               args=(self.inbox, self.n_done, self.com_queue, self.gpu_id),
+                               name='task_worker_process')
+        self.process.daemon = False     # tasks may spawn child processes, stopped explicitly on shutdown
+        self.process.start()
+        atexit.register(self.terminate)
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def is_done(self, ticket: int) -> bool:
+        return self.n_done.value >= ticket
+
+    def submit(self, task: Task) -> int:
+        # tasks are processed in order, the returned ticket is done if n_done reaches it
+        self.n_submitted += 1
+        self.inbox.put(task)
+        return self.n_submitted
+
+    def terminate(self):
+        if not self.process.is_alive():
+            return
+
+        logger.info('PROCESS {}: Attempting to terminate worker process'.format(self.process.name))
+        self.process.terminate()
+        self.process.join()
+        logger.info('PROCESS {}: Worker process terminated'.format(self.process.name))
+
+    @staticmethod
+    def _run(inbox: Queue, n_done: Value, com_queue: Queue, gpu_id: int):
+        from .taskworkerthread import TaskWorkerThread
+        logger.info('PROCESS: Worker process started')
+        while True:
+            task: Task = inbox.get()
+            try:
+                TaskWorkerThread._run_task(task.task_id, task, com_queue, gpu_id)
+            finally:
+                with n_done.get_lock():
+                    n_done.value += 1
+                com_queue.put(TaskCommunicationData(task, None))
@@ -1,32 +1,67 @@
 from .taskqueue import TaskNotFinishedException
 from .taskcommunicator import TaskCommunicationData
-from .task import Task, TaskStatus, TaskStatusCodes, TaskProgressCodes
+from .task import Task, TaskStatus, TaskStatusCodes, TaskProgressCodes, TaskShard
 from multiprocessing import Queue, Process
+from dataclasses import replace
+from typing import Optional
 import time
 from omr.dataset.datafiles import EmptyDataSetException
 import logging
 from .taskresources import TaskResource
+from .taskworkerprocess import TaskWorkerProcess
 logger = logging.getLogger(__name__)
 
 
 class TaskWorkerThread:
-    def __init__(self, resource: TaskResource, task: Task, com_queue: Queue):
+    def __init__(self, resource: TaskResource, task: Task, com_queue: Queue, shard: Optional[TaskShard] = None):
         self.resource = resource
         self.task = task
         self.com_queue = com_queue
-        self.process = Process(target=TaskWorkerThread._run_task,
-                               args=(self.task.task_id, self.task, self.com_queue,
-                                     self.resource.gpu_id))
-        self.process.daemon = False     # must be stopped explicitly
-        self.process.start()
+        self.shard = shard
+        # the process only works on its shard, the status of the task is merged in the queue
+        process_task = task if shard is None else replace(task, shard=shard)
+        self.process = None
+        self.worker = None
+        self.ticket = 0
+        if task.task_runner.use_warm_worker():
+            # run in the long living process of the resource that keeps e.g. loaded models
+            if not self.resource.worker or not self.resource.worker.is_alive():
+                self.resource.worker = TaskWorkerProcess(self.resource.gpu_id, self.com_queue)
+            self.worker = self.resource.worker
+            self.ticket = self.worker.submit(process_task)
+        else:
+            self.process = Process(target=TaskWorkerThread._run_task,
+                                   args=(self.task.task_id, process_task, self.com_queue,
+                                         self.resource.gpu_id))
+            self.process.daemon = False     # must be stopped explicitly
+            self.process.start()
+
+    def reported_final_status(self, status: Optional[TaskStatus]) -> bool:
+        # the status of a sharded task is only final if all shards are done
+        return self.shard is None and status is not None and status.code in (TaskStatusCodes.FINISHED, TaskStatusCodes.ERROR)
+
+    def finished(self, status: Optional[TaskStatus]):
+        # status is the current status of the task in the queue, None if it was removed
+        if self.worker:
+            # the final status is reported before the worker counts the task as done, the next task may already be
+            # submitted since it is processed after this one
+            return not self.worker.is_alive() or self.worker.is_done(self.ticket) or self.reported_final_status(status)
+
+        if self.process and self.reported_final_status(status):
+            # the final status is the last message of the process, it is about to exit
+            self.process.join(timeout=1)
 
-    def finished(self):
         return not self.process or not self.process.is_alive()
 
     def cancel(self) -> bool:
         if self.task is None:
             return False
 
+        if self.worker:
+            # the task can not be interrupted otherwise, the process is restarted on the next task
+            self.worker.terminate()
+            return True
+
         if self.process:
             logger.info('THREAD {}: Attempting to terminate thread'.format(self.process.name))
             self.process.terminate()
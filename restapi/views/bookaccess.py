@@ -7,6 +7,7 @@ from rest_framework import status, permissions
 from django.http import FileResponse
 from database import *
 from database.database_permissions import BookPermissionFlags
+from database.database_meta_cache import meta_cache
 from database.models.permissions import DatabasePermissionFlag
 from restapi.models.auth import RestAPIUser
 from restapi.models.error import APIError, ErrorCodes
@@ -15,6 +16,7 @@ import logging
 import re
 import os
 from typing import List
+from ommr4all.settings import DERIVED_FILES_SETTINGS
 logger = logging.getLogger(__name__)
 
 
@@ -106,6 +108,7 @@ class BookUploadView(APIView):
         if not os.path.exists(book.local_path()):
             os.mkdir(book.local_path())
 
+        pages: List[DatabasePage] = []
         for type, file in request.FILES.items():
             logger.debug('Received new image of content type {}'.format(file.content_type))
             name = os.path.splitext(os.path.basename(file.name))[0]
@@ -116,9 +119,12 @@ class BookUploadView(APIView):
                 page = DatabasePage(book, page_name)
                 if not os.path.exists(page.local_path()):
                     os.mkdir(page.local_path())
+                    meta_cache.invalidate(book.local_path('pages'))
 
                 original = DatabaseFile(page, 'color_original')
                 img.save(original.local_path())
+                page.update_image_size(original, img.size)
+                pages.append(page)
                 logger.debug('Created page at {}'.format(page.local_path()))
 
             try:
@@ -138,6 +144,17 @@ class BookUploadView(APIView):
                 logger.exception(e)
                 return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        if DERIVED_FILES_SETTINGS.on_upload and len(pages) > 0:
+            # create the preprocessed images in the background, the progress is available as operation
+            from restapi.operationworker import operation_worker, TaskAlreadyQueuedException
+            from restapi.operationworker.taskrunners.pageselection import PageSelection, PageCount
+            from restapi.operationworker.taskrunners.taskrunnerderivedfiles import TaskRunnerDerivedFiles
+            try:
+                task_id = operation_worker.put(TaskRunnerDerivedFiles(PageSelection(book, PageCount.CUSTOM, pages)), request.user)
+            except TaskAlreadyQueuedException as e:
+                task_id = e.task_id
+            return Response({'task_id': task_id})
+
         return Response()
 
 
@@ -270,10 +287,13 @@ class BookDownloaderView(APIView):
         elif type == 'backup.zip':
             s = io.BytesIO()
             zf = zipfile.ZipFile(s, 'w')
+            from database.database_page import ignore_derived_files
             files_to_ignore = [re.compile(r".*\.zip$")]
             for root, dirs, files in os.walk(book.local_path()):
+                ignored = ignore_derived_files(root, dirs + files)
+                dirs[:] = [d for d in dirs if d not in ignored]
                 for file in files:
-                    if any([f.match(file) for f in files_to_ignore]):
+                    if file in ignored or any([f.match(file) for f in files_to_ignore]):
                         continue
 
                     f = os.path.join(root, file)
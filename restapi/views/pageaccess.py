@@ -13,6 +13,7 @@ import json
 import re
 import zipfile
 import datetime
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +62,15 @@ class PageContentView(APIView):
         file = DatabaseFile(page, content)
 
         if not file.exists():
-            file.create()
+            from restapi.operationworker.taskrunners.taskrunnerderivedfiles import derived_files_pending
+            if file.definition.requires and derived_files_pending(page, file.definition.id):
+                # do not block until the background task created the file
+                if file.preview:
+                    file = DatabaseFile(page, 'color_original_preview', create_if_not_existing=True)
+                else:
+                    return Response({'pending': True}, status=status.HTTP_202_ACCEPTED)
+            else:
+                file.create()
 
         return serve(request._request, file.local_request_path(), "/", False)
 
@@ -160,6 +169,30 @@ class PageProgressView(APIView):
 class PagePcGtsView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    @staticmethod
+    def _stored_json(page: DatabasePage) -> Optional[dict]:
+        # the stored pcgts as served by get, the representation the patches of the client refer to
+        file = page.file('pcgts')
+        if not file.exists():
+            return None
+        try:
+            return PcGts.from_file(file).to_json()
+        except Exception as e:
+            logger.warning('Could not load the stored pcgts of {}: {}'.format(page.local_path(), e))
+            return None
+
+    @staticmethod
+    def _save(page: DatabasePage, pcgts: PcGts, patch: Optional[list] = None, patched: Optional[dict] = None):
+        from database.database_page_pcgts_backup import PcGtsBackupLog, pcgts_stamp
+        previous_stamp = pcgts_stamp(page)
+        current = pcgts.to_json()
+        pcgts.to_file(page.file('pcgts').local_path(), current)
+
+        # add the changes to the backup log, the patch of the client unless the page was changed when loaded
+        PcGtsBackupLog(page).append(previous_stamp, current, patch if patched == current else None)
+
+        logger.debug('Successfully saved pcgts file to {}'.format(page.file('pcgts').local_path()))
+
     @require_permissions([DatabaseBookPermissionFlag.SAVE])
     @require_lock
     def put(self, request, book, page):
@@ -168,13 +201,44 @@ class PagePcGtsView(APIView):
         obj = json.loads(request.body, encoding='utf-8')
 
         pcgts = PcGts.from_json(obj, page)
-        pcgts.to_file(page.file('pcgts').local_path())
+        self._save(page, pcgts)
 
-        # add to backup archive
-        with zipfile.ZipFile(page.file('pcgts_backup').local_path(), 'a', compression=zipfile.ZIP_DEFLATED) as zf:
-            zf.writestr('pcgts_{}.json'.format(datetime.datetime.now()), json.dumps(pcgts.to_json(), indent=2))
+        return Response()
 
-        logger.debug('Successfully saved pcgts file to {}'.format(page.file('pcgts').local_path()))
+    @require_permissions([DatabaseBookPermissionFlag.SAVE])
+    @require_lock
+    def patch(self, request, book, page):
+        # json patch (RFC 6902) of the pcgts as served by get
+        from shared.jsonpatch import apply_patch, JsonPatchError, JsonPatchTestFailed
+        from database.database_page_pcgts_backup import PcGtsBackupLog, pcgts_stamp
+        book = DatabaseBook(book)
+        page = DatabasePage(book, page)
+        patch = json.loads(request.body, encoding='utf-8')
+
+        # the last saved version if unchanged since, else the stored page
+        previous = PcGtsBackupLog(page).last_version(pcgts_stamp(page))
+        if previous is None:
+            previous = self._stored_json(page)
+        if previous is None:
+            previous = page.pcgts().to_json()
+
+        try:
+            patched = apply_patch(previous, patch)
+            pcgts = PcGts.from_json(patched, page)
+        except JsonPatchTestFailed as e:
+            return APIError(status.HTTP_409_CONFLICT,
+                            'Patch does not match the stored page: {}'.format(e),
+                            'The page was changed meanwhile, please reload it.',
+                            ErrorCodes.PAGE_PATCH_CONFLICT,
+                            ).response()
+        except (JsonPatchError, KeyError, TypeError, ValueError) as e:
+            return APIError(status.HTTP_400_BAD_REQUEST,
+                            'Invalid patch: {}'.format(e),
+                            'Invalid changes of the page.',
+                            ErrorCodes.PAGE_INVALID_PATCH,
+                            ).response()
+
+        self._save(page, pcgts, patch, patched)
 
         return Response()
 
@@ -15,13 +15,13 @@ class TasksView(APIView):
                           'creator': RestAPIUser.from_user(t.creator).to_dict(),
                           'algorithmType': t.task_runner.algorithm_type.value,
                           'book': t.task_runner.selection.book.get_meta().to_dict(),
-                          } for t in operation_worker.queue.tasks])
+                          } for t in operation_worker.queue.list_tasks()])
 
 
 class TaskView(APIView):
     @require_global_permissions(DatabasePermissionFlag.TASKS_LIST)
     def get(self, request, task_id):
-        return Response(operation_worker.queue.status_of_task(task_id).to_dict())
+        return Response(operation_worker.status(task_id).to_dict())
 
     @require_global_permissions(DatabasePermissionFlag.TASKS_CANCEL)
     def delete(self, request, task_id):
@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+import uuid
+import fcntl
+import os
+
+
+@contextmanager
+def file_lock(path: str):
+    # exclusive lock on a sidecar file of path, shared by all threads and processes, released on close
+    lock_path = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.lock')
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_write(path: str):
+    # yields a temporary path (with the same extension) that replaces path once it was written successfully,
+    # so that readers never see a partially written file
+    base, ext = os.path.splitext(os.path.basename(path))
+    tmp_path = os.path.join(os.path.dirname(path), '.{}.{}{}'.format(base, uuid.uuid4().hex, ext))
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,167 @@
+"""
+Minimal implementation of JSON patch (RFC 6902) and JSON pointer (RFC 6901).
+
+Used to apply the edits of the client to a stored document and to compute the delta between two versions of a
+document (e.g. for the backups of pages).
+"""
+
+from typing import Any, List
+from copy import deepcopy
+
+
+class JsonPatchError(Exception):
+    pass
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    # a 'test' operation failed, i.e. the patch was created for a different version of the document
+    pass
+
+
+def escape(token) -> str:
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _tokens(pointer: str) -> List[str]:
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JsonPatchError("Invalid pointer '{}'".format(pointer))
+    return [unescape(t) for t in pointer[1:].split('/')]
+
+
+def _index(container: list, token: str, allow_end=False) -> int:
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JsonPatchError("Invalid array index '{}'".format(token))
+    i = int(token)
+    if i > len(container) or (i == len(container) and not allow_end):
+        raise JsonPatchError("Array index {} out of range".format(i))
+    return i
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Any:
+    for t in tokens:
+        if isinstance(doc, dict):
+            if t not in doc:
+                raise JsonPatchError("Member '{}' not found".format(t))
+            doc = doc[t]
+        elif isinstance(doc, list):
+            doc = doc[_index(doc, t)]
+        else:
+            raise JsonPatchError("Can not resolve '{}' in a value".format(t))
+    return doc
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> Any:
+    if len(tokens) == 0:
+        return value
+
+    parent, key = _resolve(doc, tokens[:-1]), tokens[-1]
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError("Can not add '{}' to a value".format(key))
+    return doc
+
+
+def _remove(doc: Any, tokens: List[str]) -> Any:
+    if len(tokens) == 0:
+        raise JsonPatchError("Can not remove the document")
+
+    parent, key = _resolve(doc, tokens[:-1]), tokens[-1]
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError("Member '{}' not found".format(key))
+        return parent.pop(key)
+    elif isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    else:
+        raise JsonPatchError("Can not remove '{}' from a value".format(key))
+
+
+def apply_patch(doc: Any, patch: List[dict], in_place=False) -> Any:
+    if not isinstance(patch, list):
+        raise JsonPatchError("A patch must be a list of operations")
+
+    if not in_place:
+        doc = deepcopy(doc)
+
+    for operation in patch:
+        try:
+            op, path = operation['op'], _tokens(operation['path'])
+            if op == 'add':
+                doc = _add(doc, path, deepcopy(operation['value']))
+            elif op == 'remove':
+                _remove(doc, path)
+            elif op == 'replace':
+                value = deepcopy(operation['value'])
+                if len(path) == 0:
+                    doc = value
+                else:
+                    _remove(doc, path)
+                    doc = _add(doc, path, value)
+            elif op == 'move':
+                from_path = _tokens(operation['from'])
+                if path[:len(from_path)] == from_path and path != from_path:
+                    raise JsonPatchError("Can not move a value into one of its children")
+                doc = _add(doc, path, _remove(doc, from_path))
+            elif op == 'copy':
+                doc = _add(doc, path, deepcopy(_resolve(doc, _tokens(operation['from']))))
+            elif op == 'test':
+                if _resolve(doc, path) != operation['value']:
+                    raise JsonPatchTestFailed("Test of '{}' failed".format(operation['path']))
+            else:
+                raise JsonPatchError("Invalid operation '{}'".format(op))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise JsonPatchError("Invalid operation {}: {}".format(operation, e))
+
+    return doc
+
+
+def make_patch(src: Any, dst: Any) -> List[dict]:
+    # patch that transforms src into dst, lists are compared element wise after skipping the common prefix and suffix
+    ops = []
+    _diff(src, dst, '', ops)
+    return ops
+
+
+def _diff(src: Any, dst: Any, path: str, ops: List[dict]):
+    if type(src) != type(dst):
+        ops.append({'op': 'replace', 'path': path, 'value': deepcopy(dst)})
+    elif isinstance(src, dict):
+        for k in src:
+            if k not in dst:
+                ops.append({'op': 'remove', 'path': path + '/' + escape(k)})
+        for k, v in dst.items():
+            if k not in src:
+                ops.append({'op': 'add', 'path': path + '/' + escape(k), 'value': deepcopy(v)})
+            else:
+                _diff(src[k], v, path + '/' + escape(k), ops)
+    elif isinstance(src, list):
+        n = min(len(src), len(dst))
+        prefix = 0
+        while prefix < n and src[prefix] == dst[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < n - prefix and src[-1 - suffix] == dst[-1 - suffix]:
+            suffix += 1
+
+        src_mid, dst_mid = src[prefix:len(src) - suffix], dst[prefix:len(dst) - suffix]
+        m = min(len(src_mid), len(dst_mid))
+        for i in range(m):
+            _diff(src_mid[i], dst_mid[i], '{}/{}'.format(path, prefix + i), ops)
+        # remove from the back to keep the indices valid
+        for i in reversed(range(m, len(src_mid))):
+            ops.append({'op': 'remove', 'path': '{}/{}'.format(path, prefix + i)})
+        for i in range(m, len(dst_mid)):
+            ops.append({'op': 'add', 'path': '{}/{}'.format(path, prefix + i), 'value': deepcopy(dst_mid[i])})
+    elif src != dst:
+        ops.append({'op': 'replace', 'path': path, 'value': dst})
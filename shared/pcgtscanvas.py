@@ -12,7 +12,7 @@ class PcGtsCanvas:
     def __init__(self, page: Page, scale_reference: PageScaleReference, no_background=False, file='color'):
         self.page = page
         self.scale_reference = scale_reference
-        self.img = np.array(Image.open(page.location.file(scale_reference.file(file)).local_path()))
+        self.img = page.location.file(scale_reference.file(file)).image().copy()
         self.avg_line_distance = int(page.page_to_image_scale(page.avg_staff_line_distance(), scale_reference))
         self.font = ImageFont.truetype('/usr/share/fonts/truetype/junicode/Junicode.ttf', 40)
 
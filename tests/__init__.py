@@ -0,0 +1,19 @@
+import atexit
+import shutil
+import tempfile
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_storage_copy = None
+
+
+def storage_copy() -> str:
+    # temporary copy of tests/storage shared by the tests of a run, so that the tests never change the fixtures
+    global _storage_copy
+    if _storage_copy is None:
+        tmp_dir = tempfile.mkdtemp(prefix='ommr4all_storage_copy_')
+        atexit.register(shutil.rmtree, tmp_dir, True)
+        _storage_copy = os.path.join(tmp_dir, 'storage')
+        shutil.copytree(os.path.join(BASE_DIR, 'tests', 'storage'), _storage_copy)
+    return _storage_copy
@@ -4,7 +4,8 @@ import os
 from unittest import TestCase
 
 import ommr4all.settings as settings
-from database import DatabaseBook
+from tests import storage_copy
+from database import DatabaseBook, DatabaseFile
 from database.file_formats.performance import LockState
 from database.file_formats.performance.pageprogress import Locks
 from restapi.operationworker.taskrunners.pageselection import PageSelection, PageSelectionParams, PageCount
@@ -14,7 +15,7 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(name)-12s %(level
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Change database to test storage
-settings.PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'tests', 'storage')
+settings.PRIVATE_MEDIA_ROOT = storage_copy()
 
 
 class TestBookOperations(TestCase):
@@ -34,6 +35,11 @@ class TestBookOperations(TestCase):
         pages = book.pages_with_lock([LockState(Locks.STAFF_LINES, False), LockState(Locks.SYMBOLS, True)])
         self.assertListEqual([p.local_path() for p in pages], [])
 
-
-
-
+    def test_file_dependency_levels(self):
+        levels = DatabaseFile.dependency_levels(['color_lowres_preproc', 'color_norm_x2'])
+        self.assertEqual([sorted(l) for l in levels], [
+            ['color_original'],
+            ['color_highres_preproc'],
+            ['color_lowres_preproc', 'color_norm'],
+            ['color_norm_x2'],
+        ])
@@ -0,0 +1,79 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+
+import ommr4all.settings as settings
+from database import DatabaseBook, DatabasePage
+from database.database_book_page_states import DatabaseBookPageStates, PAGE_STATES_FILE
+from database.file_formats.performance.pageprogress import Locks, LockState
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBookPageStates(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        for p in ['page1', 'page2']:
+            os.makedirs(os.path.join(self.tmp_dir, 'book', 'pages', p))
+            for f in ['pcgts.json', 'color_original.jpg']:
+                shutil.copy(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001', f),
+                            os.path.join(self.tmp_dir, 'book', 'pages', p, f))
+        self.book = DatabaseBook('book')
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def test_page_states(self):
+        pages = self.book.pages()
+        states = DatabaseBookPageStates(self.book).page_states(pages)
+        for page in pages:
+            page = page.pcgts().page
+            self.assertEqual(states[page.location.page].n_music_blocks, len(page.music_blocks()))
+            self.assertEqual(states[page.location.page].n_text_blocks, len(page.text_blocks()))
+            self.assertEqual(states[page.location.page].n_symbols, sum(len(l.symbols) for l in page.all_music_lines()))
+            self.assertEqual(states[page.location.page].n_connections, len(page.annotations.connections))
+            self.assertFalse(states[page.location.page].verified)
+        self.assertTrue(os.path.exists(self.book.local_path(PAGE_STATES_FILE)))
+
+    def test_update_on_write(self):
+        page = DatabasePage(self.book, 'page1')
+        index = DatabaseBookPageStates(self.book)
+        self.assertGreater(index.page_state(page).n_symbols, 0)
+
+        pcgts = page.pcgts()
+        for ml in pcgts.page.all_music_lines():
+            ml.symbols.clear()
+        pcgts.to_file(page.file('pcgts').local_path())
+        for lock in Locks:
+            page.page_progress().locked[lock] = True
+        page.page_progress().verified = True
+        page.save_page_progress()
+
+        # written by the writers, not recomputed
+        with open(self.book.local_path(PAGE_STATES_FILE)) as f:
+            stored = json.load(f)['page1']
+        self.assertEqual(stored['n_symbols'], 0)
+        self.assertTrue(stored['verified'])
+        self.assertEqual(self.book.pages_with_lock([LockState(Locks.SYMBOLS, True)]), [page])
+        self.assertEqual(index.page_state(page).n_symbols, 0)
+
+        # modified by other means
+        path = page.file('page_progress').local_path()
+        with open(path, 'w') as f:
+            f.write('{}')
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(index.page_state(page).verified)
+
+        page.delete()
+        with open(self.book.local_path(PAGE_STATES_FILE)) as f:
+            self.assertNotIn('page1', json.load(f))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import ommr4all.settings as settings
+from database import DatabaseBook, DatabasePage
+from database.database_book_page_states import PAGE_STATES_FILE
+from database.tools.book_statistics import compute_book_statistics, get_counts
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBookStatistics(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        for p in ['page1', 'page2']:
+            os.makedirs(os.path.join(self.tmp_dir, 'book', 'pages', p))
+            for f in ['pcgts.json', 'color_original.jpg']:
+                shutil.copy(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001', f),
+                            os.path.join(self.tmp_dir, 'book', 'pages', p, f))
+        self.book = DatabaseBook('book')
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def test_counts(self):
+        expected = get_counts([page.pcgts() for page in self.book.pages()])
+        self.assertGreater(expected.n_symbols, 0)
+        self.assertGreater(expected.n_clefs, 0)
+        self.assertEqual(compute_book_statistics(self.book), expected)
+        # read from the page states of the book
+        self.assertTrue(os.path.exists(self.book.local_path(PAGE_STATES_FILE)))
+
+    def test_cache_invalidation(self):
+        page = DatabasePage(self.book, 'page1')
+        counts = compute_book_statistics(self.book)
+
+        # a saved pcgts updates the page states
+        pcgts = page.pcgts()
+        n_symbols = sum(len(ml.symbols) for ml in pcgts.page.all_music_lines())
+        for ml in pcgts.page.all_music_lines():
+            ml.symbols.clear()
+        path = page.file('pcgts').local_path()
+        pcgts.to_file(path)
+        self.assertEqual(compute_book_statistics(self.book).n_symbols, counts.n_symbols - n_symbols)
+
+        # a pcgts changed otherwise is counted again
+        shutil.copy(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001', 'pcgts.json'), path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(compute_book_statistics(self.book), counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+import cv2
+
+from omr.steps.preprocessing.util.connected_compontents import ConnectedComponents, ComponentIndex
+from omr.steps.layout.correction_tools.connectedcomponentsselector.connected_component_selector import \
+    alpha_shape, polygons, reduceImageCC
+
+
+class TestConnectedComponents(unittest.TestCase):
+    def setUp(self):
+        # staff lines and notes
+        image = np.zeros((60, 80), dtype=np.uint8)
+        for y in range(10, 50, 8):
+            cv2.line(image, (2, y), (77, y + 1), 1)
+        for x in range(8, 70, 9):
+            cv2.circle(image, (x, 10 + (x * 7) % 40), 3, 1, -1)
+        self.cc = ConnectedComponents(*cv2.connectedComponentsWithStats(image, 8, cv2.CV_32S))
+        self.index = ComponentIndex.from_components(self.cc)
+
+    def test_index(self):
+        labels = self.cc.labels
+        self.assertTrue((self.index.labels(0, 0, 80, 60) == labels).all())
+        self.assertTrue((self.index.labels(13, 7, 41, 50) == labels[7:50, 13:41]).all())
+        ys, xs = np.mgrid[:60, :80]
+        self.assertTrue((self.index.labels_at(xs.ravel(), ys.ravel()) == labels.ravel()).all())
+        self.assertLess(self.index.nbytes, labels.nbytes)
+
+    def test_reduce(self):
+        line = np.array([[5, 20], [70, 21]])
+        labels = np.unique(self.cc.labels[np.interp(np.arange(5, 70), line[:, 0], line[:, 1]).astype(int), np.arange(5, 70)])
+        labels = labels[labels > 0]
+        intersection_image, offset = reduceImageCC(self.index, line, filter_sigma=0)
+        # the components that are crossed by the line
+        self.assertEqual(tuple(offset), (max(0, self.cc.stats[labels, cv2.CC_STAT_LEFT].min() - 2),
+                                         max(0, self.cc.stats[labels, cv2.CC_STAT_TOP].min() - 2)))
+        crossed = np.isin(self.cc.labels, labels)[offset[1]:offset[1] + intersection_image.shape[0], offset[0]:offset[0] + intersection_image.shape[1]]
+        self.assertTrue((intersection_image[crossed]).all())
+
+    def test_polygons(self):
+        # two separate squares of points
+        square = np.array([[x, y] for x in range(5) for y in range(5)], dtype=float) * 2
+        points = np.concatenate([square, square + 30])
+        shapes = polygons(alpha_shape(points, 2))
+        self.assertEqual(len(shapes), 2)
+        for shape in shapes:
+            # closed boundary of 16 points around a square
+            self.assertEqual(len(shape), 16)
+            self.assertEqual(len(set(shape)), 16)
+        self.assertEqual(polygons(set()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+import numpy as np
+
+from database.file_formats.pcgts import Coords, Point, Size
+
+
+class TestCoords(unittest.TestCase):
+    def test_string(self):
+        s = "0.0,1.5 1.0,2.0 6.123456789,-123.0 1e-05,12345678.25"
+        c = Coords.from_string(s)
+        np.testing.assert_array_equal(c.points, [[0, 1.5], [1, 2], [6.123456789, -123], [1e-05, 12345678.25]])
+        self.assertEqual(c.to_string(), s)
+        self.assertEqual(Coords.from_string("").points.shape, (0, 2))
+        self.assertEqual(Coords().to_string(), "")
+
+    def test_aabb(self):
+        aabb = Coords(np.array([[3, 1], [1, 2], [6, -4]])).aabb()
+        np.testing.assert_array_equal(aabb.tl.p, [1, -4])
+        np.testing.assert_array_equal(aabb.size.p, [5, 6])
+        self.assertEqual(Coords().aabb().area(), 0)
+
+    def test_rotate(self):
+        c = Coords(np.array([[1.0, 0.0], [2.0, 1.0]]))
+        c.rotate(90, (1, 1))
+        np.testing.assert_allclose(c.points, [[0, 1], [1, 0]], atol=1e-12)
+        p = Point(2.0, 1.0)
+        p.rotate(90, (1, 1))
+        np.testing.assert_allclose(p.p, c.points[1])
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Point(1, 2).z = 3
+        with self.assertRaises(AttributeError):
+            Size(1, 2).z = 3
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import numpy as np
+from unittest import mock
+
+import ommr4all.settings as settings
+from database import DatabaseBook, DatabasePage
+from database.file_formats.pcgts import Point, PcGts
+from omr.dataset import DatasetParams
+import omr.dataset.dataset_cache as dataset_cache
+from omr.dataset.dataset_cache import DATASET_CACHE_DIR, clear_dataset_cache
+from omr.steps.symboldetection.dataset import SymbolDetectionDataset
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestDatasetCache(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        shutil.copytree(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001'),
+                        os.path.join(self.tmp_dir, 'book', 'pages', 'page'))
+        self.page = DatabasePage(DatabaseBook('book'), 'page')
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def load(self, pad=(0, 10, 0, 40)):
+        dataset = SymbolDetectionDataset([self.page.pcgts()], DatasetParams(dewarp=True, pad=list(pad)))
+        return dataset, dataset.load()
+
+    def entries(self):
+        cache_dir = self.page.local_file_path(DATASET_CACHE_DIR)
+        return sorted(os.path.join(s, e) for s in os.listdir(cache_dir) for e in os.listdir(os.path.join(cache_dir, s)))
+
+    def test_cache(self):
+        dataset, computed = self.load()
+        self.assertGreater(len(computed), 0)
+        self.assertEqual(len(self.entries()), 1)
+
+        cached_dataset, cached = self.load()
+        self.assertEqual(len(cached), len(computed))
+        for c, d in zip(cached, computed):
+            self.assertIsInstance(c.line_image, np.memmap)
+            np.testing.assert_array_equal(c.line_image, d.line_image)
+            np.testing.assert_array_equal(c.region, d.region)
+            np.testing.assert_array_equal(c.mask, d.mask)
+            self.assertIs(c.operation.music_line, cached_dataset.files[0].page.line_by_id(d.operation.music_line.id))
+            p = Point(10, 20)
+            self.assertEqual(cached_dataset.local_to_global_pos(p, c.operation.params).xy(),
+                             dataset.local_to_global_pos(p, d.operation.params).xy())
+
+        # a page changed by another process creates a new entry that replaces the previous one of the dataset
+        entries = self.entries()
+        pcgts = self.page.pcgts()
+        pcgts.page.all_music_lines()[0].symbols.clear()
+        with open(self.page.file('pcgts').local_path(), 'w') as f:
+            json.dump(pcgts.to_json(), f)
+        self.page = DatabasePage(DatabaseBook('book'), 'page')
+        self.load()
+        self.assertEqual(len(self.entries()), 1)
+        self.assertNotEqual(self.entries(), entries)
+
+        # so does an unsaved page (e.g. sent by the client) that is identified by its content
+        entries = self.entries()
+        pcgts = PcGts.from_json(self.page.pcgts().to_json(), self.page)
+        pcgts.meta.creator = 'client'
+        SymbolDetectionDataset([pcgts], DatasetParams(dewarp=True, pad=[0, 10, 0, 40])).load()
+        self.assertEqual(len(self.entries()), 1)
+        self.assertNotEqual(self.entries(), entries)
+
+        # and a new version of the cache
+        entries = self.entries()
+        with mock.patch.object(dataset_cache, 'DATASET_CACHE_VERSION', dataset_cache.DATASET_CACHE_VERSION + 1):
+            self.load()
+        self.assertEqual(len(self.entries()), 1)
+        self.assertNotEqual(self.entries(), entries)
+
+        # other datasets have their own entry
+        self.load(pad=(0, 0, 0, 0))
+        self.assertEqual(len(self.entries()), 2)
+
+        clear_dataset_cache(self.page)
+        self.assertFalse(os.path.exists(self.page.local_file_path(DATASET_CACHE_DIR)))
+
+    def test_cleared_on_save(self):
+        self.load()
+        self.assertEqual(len(self.entries()), 1)
+        pcgts = self.page.pcgts()
+        pcgts.to_file(self.page.file('pcgts').local_path())
+        self.assertFalse(os.path.exists(self.page.local_file_path(DATASET_CACHE_DIR)))
+
+    def test_size_limit(self):
+        with mock.patch.object(dataset_cache, 'DATASET_CACHE_SETTINGS',
+                               dataset_cache.DATASET_CACHE_SETTINGS._replace(max_page_size_mb=0)):
+            self.load()
+            entries = self.entries()
+            # the latest dataset is kept even if it exceeds the limit
+            self.load(pad=(0, 0, 0, 0))
+            self.assertEqual(len(self.entries()), 1)
+            self.assertNotEqual(self.entries(), entries)
+
+    def test_copy_to(self):
+        # the cached datasets, locks and backups are not copied
+        from database.database_page import ignore_derived_files
+        self.load()
+        os.makedirs(os.path.join(self.tmp_dir, 'copy', 'pages'))
+        for name in ['.lock', '.pcgts.json.lock', '.pcgts.0123456789abcdef0123456789abcdef.json']:
+            open(self.page.local_file_path(name), 'w').close()
+        os.makedirs(self.page.local_file_path('pcgts_backup'))
+
+        copy = self.page.copy_to(DatabaseBook('copy'))
+        self.assertEqual(sorted(os.listdir(copy.local_path())),
+                         sorted(f for f in os.listdir(self.page.local_path()) if f not in ignore_derived_files('', [f])))
+        self.assertFalse(os.path.exists(copy.local_file_path(DATASET_CACHE_DIR)))
+        self.assertFalse(os.path.exists(copy.local_file_path('pcgts_backup')))
+        self.assertFalse(os.path.exists(copy.local_file_path('.lock')))
+        self.assertTrue(os.path.exists(copy.local_file_path('pcgts.json')))
+
+    def test_parallel(self):
+        shutil.copytree(self.page.local_path(), os.path.join(self.tmp_dir, 'book', 'pages', 'page2'))
+        pages = DatabaseBook('book').pages()
+        params = DatasetParams(dewarp=True, pad=[0, 10, 0, 40], processes=2)
+        pcgts = [p.pcgts() for p in pages]
+        parallel = SymbolDetectionDataset(pcgts, params).load()
+
+        for p in pages:
+            clear_dataset_cache(p)
+        params.processes = 1
+        sequential = SymbolDetectionDataset([p.pcgts() for p in pages], params).load()
+
+        self.assertEqual(len(parallel), len(sequential))
+        for p, s in zip(parallel, sequential):
+            self.assertIs(p.operation.pcgts.page.location, s.operation.pcgts.page.location)
+            self.assertIn(p.operation.music_line, p.operation.pcgts.page.all_music_lines())
+            np.testing.assert_array_equal(p.line_image, s.line_image)
+            np.testing.assert_array_equal(p.mask, s.mask)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import tempfile
+import shutil
+import os
+import numpy as np
+
+import ommr4all.settings as settings
+from database import DatabaseBook
+from omr.dataset import DatasetParams
+from omr.dataset.streaming import LazyLines
+from omr.steps.symboldetection.dataset import SymbolDetectionDataset
+from omr.steps.text.dataset import TextDataset
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestDatasetStreaming(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        for p in ['page1', 'page2', 'page3']:
+            shutil.copytree(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001'),
+                            os.path.join(self.tmp_dir, 'book', 'pages', p))
+        self.pages = DatabaseBook('book').pages()
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lazy_lines(self):
+        params = DatasetParams(pad=[0, 10, 0, 40], dewarp=True)
+        loaded = TextDataset([p.pcgts() for p in self.pages], params).load()
+
+        params.streaming = True
+        lines = TextDataset([p.pcgts() for p in self.pages], params).lines()
+        self.assertIsInstance(lines, LazyLines)
+        lines.buffer_size = 1
+        lines.max_buffer_memory_mb = 0
+        self.assertEqual(len(lines), len(loaded))
+        for lazy in [list(lines), [lines[i] for i in reversed(range(len(lines)))][::-1]]:
+            for l, d in zip(lazy, loaded):
+                np.testing.assert_array_equal(l.line_image, d.line_image)
+                self.assertIs(l.operation.text_line, d.operation.text_line)
+        self.assertEqual(len(lines.buffer), 1)
+
+    def test_random_access(self):
+        params = DatasetParams(pad=[0, 10, 0, 40], dewarp=True, streaming=True)
+        lines = TextDataset([p.pcgts() for p in self.pages], params).lines()
+        loaded_pages = []
+        load_page = lines._load_page
+        lines._load_page = lambda page_idx: loaded_pages.append(page_idx) or load_page(page_idx)
+
+        # shuffled access within the memory budget loads each page once
+        order = np.random.RandomState(0).permutation(len(lines))
+        for _ in range(2):
+            for i in order:
+                self.assertIsNotNone(lines[i].line_image)
+        self.assertEqual(sorted(loaded_pages), [0, 1, 2])
+        self.assertGreater(lines.buffer_bytes, 0)
+
+        # iterating uses the buffered pages
+        self.assertEqual(len(list(lines)), len(lines))
+        self.assertEqual(sorted(loaded_pages), [0, 1, 2])
+
+    def test_page_segmentation_dataset(self):
+        params = DatasetParams(pad=[0, 10, 0, 40])
+        data = SymbolDetectionDataset([p.pcgts() for p in self.pages], params).to_page_segmentation_dataset()
+        params.streaming = True
+        lazy = SymbolDetectionDataset([p.pcgts() for p in self.pages], params).to_page_segmentation_dataset()
+        self.assertEqual(len(lazy), len(data))
+        for l, d in zip(lazy, data):
+            for attr in ['image', 'binary', 'mask']:
+                np.testing.assert_array_equal(getattr(l, attr), getattr(d, attr))
+            self.assertEqual(l.original_shape, d.original_shape)
+            self.assertEqual(l.line_height_px, d.line_height_px)
+
+    def test_calamari_dataset(self):
+        params = DatasetParams(pad=[0, 10, 0, 40], dewarp=True)
+        data = TextDataset([p.pcgts() for p in self.pages], params).to_text_line_calamari_dataset(train=True)
+        params.streaming = True
+        streaming = TextDataset([p.pcgts() for p in self.pages], params).to_text_line_calamari_dataset(train=True)
+        self.assertEqual(len(streaming), len(data))
+
+        # read by the data generator process of calamari, that shuffles the samples for training
+        from calamari_ocr.ocr.datasets.input_dataset import StreamingInputDataset
+        from calamari_ocr.ocr.data_processing import NoopDataPreprocessor
+        from calamari_ocr.ocr.text_processing import NoopTextProcessor
+        with StreamingInputDataset(streaming, NoopDataPreprocessor(), NoopTextProcessor(), processes=1) as input_dataset:
+            loaded = sorted((text, image.shape, image.tobytes()) for image, text, _ in input_dataset.generator(epochs=1))
+        self.assertEqual(loaded, sorted((d['text'], d['image'].shape, d['image'].tobytes()) for d in data.samples()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+from database.file_formats.pcgts import Coords
+from omr.dewarping.dummy_dewarper import griddify, shape_to_rect, transform_grid, transform_grid_iterative, \
+    grid_to_mesh, grid_to_mesh_iterative, NoStaffsAvailable, NoStaffLinesAvailable
+
+
+def random_staves(rng: np.random.RandomState, shape, n_staves: int, n_lines: int = 4):
+    staves = []
+    for _ in range(n_staves):
+        top = rng.uniform(-20, shape[1] + 20)
+        xs = np.sort(rng.uniform(-10, shape[0] + 10, rng.randint(2, 8)))
+        staves.append([Coords(np.stack([xs, top + i * rng.uniform(5, 15) + rng.normal(0, 5, len(xs))], axis=-1))
+                       for i in range(n_lines)])
+    return staves
+
+
+class TestDewarper(unittest.TestCase):
+    def test_identical_to_iterative(self):
+        rng = np.random.RandomState(0)
+        for _ in range(20):
+            shape = (rng.randint(200, 2000), rng.randint(200, 3000))
+            dst_grid = griddify(shape_to_rect(shape), 10, 30)
+            staves = random_staves(rng, shape, rng.randint(1, 12))
+            src_grid = transform_grid(dst_grid, staves, shape)
+            np.testing.assert_array_equal(src_grid, transform_grid_iterative(dst_grid, staves, shape))
+            self.assertEqual(grid_to_mesh(src_grid, dst_grid), grid_to_mesh_iterative(src_grid, dst_grid))
+
+    def test_missing_staves(self):
+        shape = (100, 100)
+        dst_grid = griddify(shape_to_rect(shape), 10, 30)
+        self.assertRaises(NoStaffsAvailable, transform_grid, dst_grid, [], shape)
+        self.assertRaises(NoStaffLinesAvailable, transform_grid, dst_grid, [[]], shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import tempfile
+import threading
+import shutil
+import time
+import os
+from shared.filelock import file_lock, atomic_write
+
+
+class TestFileLock(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'file.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lock(self):
+        events = []
+
+        def work(name):
+            with file_lock(self.path):
+                events.append((name, 'enter'))
+                time.sleep(0.1)
+                events.append((name, 'exit'))
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # no interleaving
+        for i in range(0, len(events), 2):
+            self.assertEqual(events[i][0], events[i + 1][0])
+
+    def test_atomic_write(self):
+        with atomic_write(self.path) as path:
+            with open(path, 'w') as f:
+                f.write('first')
+            self.assertFalse(os.path.exists(self.path))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'first')
+
+        with self.assertRaises(ValueError):
+            with atomic_write(self.path) as path:
+                with open(path, 'w') as f:
+                    f.write('second')
+                raise ValueError()
+
+        # the file is unchanged and the temporary file removed
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'first')
+        self.assertListEqual(os.listdir(self.tmp_dir), ['file.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import tempfile
+import os
+import numpy as np
+from PIL import Image
+
+from database.database_image_cache import DecodedImageCache
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name: str, value: int, size=(20, 10)) -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        Image.new('L', size, value).save(path)
+        return path
+
+    def test_shared_read_only(self):
+        cache = DecodedImageCache(1)
+        path = self._write('gray.png', 7)
+        image = cache.get(path)
+        self.assertEqual(image.shape, (10, 20))
+        self.assertTrue((image == 7).all())
+        self.assertFalse(image.flags.writeable)
+        self.assertIs(cache.get(path), image)
+        self.assertEqual(cache.memory, image.nbytes)
+
+    def test_modified_file(self):
+        cache = DecodedImageCache(1)
+        path = self._write('gray.png', 7)
+        image = cache.get(path)
+        self._write('gray.png', 9)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+        reloaded = cache.get(path)
+        self.assertIsNot(reloaded, image)
+        self.assertTrue((reloaded == 9).all())
+        self.assertEqual(len(cache.entries), 1)
+
+    def test_eviction(self):
+        cache = DecodedImageCache(1)
+        # 0.4 MB each, only two fit into the budget
+        paths = [self._write('{}.png'.format(i), i, (640, 640)) for i in range(3)]
+        for p in paths:
+            cache.get(p)
+        self.assertEqual(list(cache.entries.keys()), [os.path.abspath(p) for p in paths[1:]])
+        self.assertLessEqual(cache.memory, cache.max_memory)
+
+        # too large for the budget, decoded but not cached
+        large = self._write('large.png', 1, (2048, 1024))
+        self.assertTrue((cache.get(large) == 1).all())
+        self.assertNotIn(os.path.abspath(large), cache.entries)
+
+        cache.invalidate(paths[1])
+        self.assertEqual(len(cache.entries), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
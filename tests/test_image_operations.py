@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+
+from database.file_formats.pcgts import PageScaleReference
+from database.file_formats.pcgts import Point
+from omr.imageoperations import ImageOperationData, ImageData, ImageCropToSmallestBoxOperation, ImagePadToPowerOf2, \
+    ImageOperationList, ImageRescaleToHeightOperation
+
+
+class TestImageOperations(unittest.TestCase):
+    def test_crop(self):
+        mask = np.zeros((20, 30), dtype=bool)
+        mask[5:8, 10:12] = True
+        image = np.arange(20 * 30, dtype=np.uint8).reshape((20, 30))
+        data = ImageOperationData([ImageData(mask, True), ImageData(image, False)], PageScaleReference.NORMALIZED)
+        out, = ImageCropToSmallestBoxOperation(pad=[1, 2, 3, 4]).apply_single(data)
+        self.assertEqual(tuple(out.params), (4, 11, 6, 14))
+        np.testing.assert_array_equal(out.images[1].image, image[4:11, 6:14])
+        self.assertTrue(np.shares_memory(out.images[1].image, image))
+
+    def test_operation_list(self):
+        image = np.zeros((16, 12), dtype=np.uint8)
+        image[2:5, 3:4] = 1
+        data = ImageOperationData([ImageData(image, False)], PageScaleReference.NORMALIZED)
+        ops = ImageOperationList([ImageCropToSmallestBoxOperation(pad=4), ImagePadToPowerOf2(3)])
+        out, = ops.apply_single(data)
+        self.assertEqual(out.images[0].image.shape, (16, 8))
+        self.assertEqual(len(out.params), 3)
+        self.assertIsNone(data.params)
+        self.assertIs(data.images[0].image, image)
+
+        # no padding required, the image is kept
+        out, = ops.apply_single(ImageOperationData([ImageData(np.ones((8, 16), dtype=np.uint8), False)], PageScaleReference.NORMALIZED))
+        self.assertEqual(out.params[2], ((0, 0), (0, 0)))
+        self.assertEqual(out.images[0].image.shape, (8, 16))
+
+    def test_local_to_global_points(self):
+        image = np.zeros((40, 60), dtype=np.uint8)
+        image[10:20, 15:35] = 255
+        data = ImageOperationData([ImageData(image, False)], PageScaleReference.NORMALIZED)
+        ops = ImageOperationList([ImageCropToSmallestBoxOperation(pad=2), ImageRescaleToHeightOperation(7), ImagePadToPowerOf2()])
+        out, = ops.apply_single(data)
+        points = np.array([[0, 0], [3.5, 1], [11, 7]])
+        expected = [ops.local_to_global_pos(Point(p), out.params).p for p in points]
+        np.testing.assert_allclose(ops.local_to_global_points(points, out.params), expected)
+        np.testing.assert_allclose(expected[0], [13, 8])
+        self.assertEqual(ops.local_to_global_points(np.zeros((0, 2)), out.params).shape, (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ import unittest
 from six import BytesIO
 
 import ommr4all.settings as settings
+from tests import storage_copy
 from database import DatabaseBook
 import os
 import sys
@@ -14,7 +15,7 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(name)-12s %(level
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Change database to test storage
-settings.PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'tests', 'storage')
+settings.PRIVATE_MEDIA_ROOT = storage_copy()
 
 
 class TestMEIExport(unittest.TestCase):
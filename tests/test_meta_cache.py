@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import os
+
+from database.database_meta_cache import FileStampCache
+
+
+class TestMetaCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.loads = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self, path):
+        def load():
+            self.loads += 1
+            try:
+                with open(path) as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return load
+
+    def _touch(self, path):
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+    def test_file(self):
+        cache = FileStampCache()
+        path = os.path.join(self.tmp_dir.name, 'meta.json')
+        self.assertIsNone(cache.get(path, self._read(path)))
+        with open(path, 'w') as f:
+            f.write('a')
+        self.assertEqual(cache.get(path, self._read(path)), 'a')
+        self.assertEqual(cache.get(path, self._read(path)), 'a')
+        self.assertEqual(self.loads, 2)
+
+        with open(path, 'w') as f:
+            f.write('b')
+        self._touch(path)
+        self.assertEqual(cache.get(path, self._read(path)), 'b')
+        cache.invalidate(path)
+        self.assertEqual(cache.get(path, self._read(path)), 'b')
+        self.assertEqual(self.loads, 4)
+
+    def test_directory(self):
+        cache = FileStampCache()
+        path = self.tmp_dir.name
+
+        def listing():
+            self.loads += 1
+            return sorted(os.listdir(path))
+
+        self.assertEqual(cache.get(path, listing), [])
+        os.mkdir(os.path.join(path, 'page'))
+        self._touch(path)
+        self.assertEqual(cache.get(path, listing), ['page'])
+        self.assertEqual(cache.get(path, listing), ['page'])
+        self.assertEqual(self.loads, 2)
+
+        cache.get(os.path.join(path, 'page'), listing)
+        cache.invalidate_tree(path)
+        self.assertEqual(len(cache.entries), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import tempfile
+import shutil
+import os
+from PIL import Image
+
+import ommr4all.settings as settings
+from database import DatabaseBook, DatabasePage
+from database.database_page_image_sizes import DatabasePageImageSizes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPageImageSizes(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        os.makedirs(os.path.join(self.tmp_dir, 'book', 'pages', 'page'))
+        self.page = DatabasePage(DatabaseBook('book'), 'page')
+        Image.new('RGB', (30, 20)).save(self.page.file('color_original').local_path())
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def test_manifest(self):
+        self.assertEqual(self.page.image_size('color_original'), (30, 20))
+        self.assertTrue(os.path.exists(self.page.file('image_sizes').local_path()))
+        self.assertEqual(DatabasePageImageSizes.load(self.page).sizes['color_original.jpg'].width, 30)
+
+        # the manifest is used as long as the file is unchanged
+        page = DatabasePage(DatabaseBook('book'), 'page')
+        page.image_sizes().sizes['color_original.jpg'].width = 31
+        self.assertEqual(page.image_size('color_original'), (31, 20))
+
+        # a changed file is read again
+        path = self.page.file('color_original').local_path()
+        Image.new('RGB', (40, 10)).save(path)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(page.image_size('color_original'), (40, 10))
+
+    def test_pcgts(self):
+        pcgts = self.page.pcgts()
+        self.assertEqual((pcgts.page.image_width, pcgts.page.image_height), (30, 20))
+        self.assertIn('color_original.jpg', DatabasePageImageSizes.load(self.page).sizes)
+
+
+if __name__ == '__main__':
+    unittest.main()
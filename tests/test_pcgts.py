@@ -2,6 +2,7 @@ import unittest
 import os
 import logging
 import ommr4all.settings as settings
+from tests import storage_copy
 from database.file_formats.pcgts.jsonloader import update_pcgts
 from database.file_formats.pcgts import PcGts
 import sys
@@ -13,7 +14,7 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(name)-12s %(level
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Change database to test storage
-settings.PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'tests', 'storage')
+settings.PRIVATE_MEDIA_ROOT = storage_copy()
 raw_storage = os.path.join(BASE_DIR, 'tests', 'raw_storage')
 
 
@@ -27,3 +28,38 @@ class GenericTests(unittest.TestCase):
 
         self.maxDiff = None
         self.assertEqual(json1, PcGts.from_json(json1, None).to_json())
+
+    def test_msgpack(self):
+        from database.file_formats.pcgts.msgpackloader import dumps, loads
+        pages_dir = os.path.join(settings.PRIVATE_MEDIA_ROOT, 'demo', 'pages')
+        for page in sorted(os.listdir(pages_dir)):
+            path = os.path.join(pages_dir, page, 'pcgts.json')
+            if not os.path.exists(path):
+                continue
+
+            with open(path) as f:
+                json0 = PcGts.from_json(json.load(f), None).to_json()
+
+            # the json is identical after conversion to msgpack and back
+            json1 = PcGts.from_json(loads(dumps(json0)), None).to_json()
+            self.assertEqual(json0, json1)
+
+    def test_lazy_page(self):
+        from database.file_formats.pcgts import BlockType
+        with open(os.path.join(settings.PRIVATE_MEDIA_ROOT, 'demo', 'pages', 'page_test_monodi_export_001', 'pcgts.json')) as f:
+            json0 = json.load(f)
+
+        page = PcGts.from_json(deepcopy(json0), None).page
+        music_blocks = page.music_blocks()
+        self.assertGreater(len(music_blocks), 0)
+        self.assertFalse(page.is_materialized())
+        # the text blocks are not parsed yet
+        n_text_blocks = len([b for b in json0['page']['blocks'] if b.get('type', BlockType.MUSIC.value) != BlockType.MUSIC.value])
+        self.assertGreater(n_text_blocks, 0)
+        self.assertEqual(len([b for b in page._lazy_blocks if isinstance(b, dict)]), n_text_blocks)
+
+        # the blocks that were parsed before are part of the materialized page
+        self.assertGreater(len(page.annotations.connections), 0)
+        self.assertTrue(page.is_materialized())
+        self.assertEqual([id(b) for b in music_blocks], [id(b) for b in page.music_blocks()])
+        self.assertEqual(PcGts.from_json(deepcopy(json0), None).page.to_json(), page.to_json())
@@ -0,0 +1,144 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+from copy import deepcopy
+
+import ommr4all.settings as settings
+from ommr4all.settings import PcGtsBackupSettings
+from database import DatabaseBook, DatabasePage
+from database.file_formats import PcGts
+from database.database_page_pcgts_backup import PcGtsBackupLog, pcgts_stamp, _last_versions
+from shared.jsonpatch import apply_patch, make_patch, JsonPatchError, JsonPatchTestFailed
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestJsonPatch(unittest.TestCase):
+    def test_apply(self):
+        doc = {'a': [1, 2, 3], 'b': {'c/d': 'x'}}
+        out = apply_patch(doc, [
+            {'op': 'add', 'path': '/a/1', 'value': 5},
+            {'op': 'remove', 'path': '/a/0'},
+            {'op': 'replace', 'path': '/b/c~1d', 'value': 'y'},
+            {'op': 'move', 'from': '/a/2', 'path': '/e'},
+            {'op': 'copy', 'from': '/e', 'path': '/a/-'},
+            {'op': 'test', 'path': '/a', 'value': [5, 2, 3]},
+        ])
+        self.assertEqual(out, {'a': [5, 2, 3], 'b': {'c/d': 'y'}, 'e': 3})
+        self.assertEqual(doc, {'a': [1, 2, 3], 'b': {'c/d': 'x'}})
+
+        with self.assertRaises(JsonPatchTestFailed):
+            apply_patch(doc, [{'op': 'test', 'path': '/a/0', 'value': 2}])
+        for invalid in [{'op': 'remove', 'path': '/x'}, {'op': 'add', 'path': '/a/4', 'value': 0}, {'op': 'add'}, {'op': 'foo', 'path': ''}]:
+            with self.assertRaises(JsonPatchError):
+                apply_patch(doc, [invalid])
+
+    def test_make_patch(self):
+        with open(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001', 'pcgts.json')) as f:
+            src = PcGts.from_json(json.load(f), None).to_json()
+
+        dst = deepcopy(src)
+        block = dst['page']['blocks'].pop(3)
+        dst['page']['blocks'].insert(0, block)
+        dst['page']['blocks'][5]['lines'][0]['coords'] = '0.1,0.2 0.3,0.4'
+        dst['meta']['creator'] = 'test'
+
+        patch = make_patch(src, dst)
+        self.assertLess(len(json.dumps(patch)), len(json.dumps(dst)) / 2)
+        self.assertEqual(apply_patch(src, patch), dst)
+        self.assertEqual(make_patch(src, deepcopy(src)), [])
+
+
+class TestPcGtsBackupLog(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        os.makedirs(os.path.join(self.tmp_dir, 'book', 'pages', 'page'))
+        self.page = DatabasePage(DatabaseBook('book'), 'page')
+        with open(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_monodi_export_001', 'pcgts.json')) as f:
+            self.json = PcGts.from_json(json.load(f), None).to_json()
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def _versions(self, n):
+        versions = [self.json]
+        for i in range(n):
+            v = deepcopy(versions[-1])
+            v['meta']['creator'] = str(i)
+            versions.append(v)
+        return versions
+
+    def _store(self, v):
+        path = self.page.file('pcgts').local_path()
+        with open(path, 'w') as f:
+            json.dump(v, f, separators=(',', ':'))
+        # distinct modification time of each stored version
+        self.mtime_ns = getattr(self, 'mtime_ns', os.stat(path).st_mtime_ns) + 1000
+        os.utime(path, ns=(self.mtime_ns, self.mtime_ns))
+
+    def _save(self, log, v, patch=None):
+        previous_stamp = pcgts_stamp(self.page)
+        self._store(v)
+        log.append(previous_stamp, v, patch)
+
+    def test_versions(self):
+        log = PcGtsBackupLog(self.page)
+        versions = self._versions(5)
+        for v in versions:
+            self._save(log, v)
+        self.assertEqual(log.last_version(pcgts_stamp(self.page)), versions[-1])
+
+        # unchanged saves are not listed
+        self._save(log, versions[-1])
+        self.assertEqual([v for _, v in log.versions()], versions)
+        self.assertEqual(len(log.segments()), 1)
+
+        # the stored page was changed without a backup, a new snapshot is required
+        changed = deepcopy(self.json)
+        changed['meta']['creator'] = 'algorithm'
+        self._store(changed)
+        self.assertIsNone(log.last_version(pcgts_stamp(self.page)))
+        self._save(log, versions[0])
+        self.assertEqual(len(log.segments()), 2)
+        self.assertEqual(log.versions()[-1][1], versions[0])
+
+    def test_unknown_last_version(self):
+        log = PcGtsBackupLog(self.page)
+        versions = self._versions(2)
+        self._save(log, versions[0])
+        self._save(log, versions[1])
+
+        # saved by another process, the patch is computed from the replayed log
+        _last_versions.clear()
+        self._save(log, versions[2])
+        self.assertEqual(len(log.segments()), 1)
+        self.assertEqual([v for _, v in log.versions()], versions)
+
+    def test_known_patch(self):
+        log = PcGtsBackupLog(self.page)
+        versions = self._versions(1)
+        patch = [{'op': 'replace', 'path': '/meta/creator', 'value': versions[1]['meta']['creator']}]
+        self._save(log, versions[0])
+        self._save(log, versions[1], patch)
+        with open(log.segments()[-1]) as f:
+            self.assertEqual(json.loads(f.readlines()[-1])['patch'], patch)
+        self.assertEqual([v for _, v in log.versions()], versions)
+
+    def test_retention(self):
+        log = PcGtsBackupLog(self.page, PcGtsBackupSettings(max_patch_ratio=0, max_snapshots=3))
+        versions = self._versions(5)
+        for v in versions:
+            self._save(log, v)
+
+        # every save starts a new segment, only the last three are kept
+        self.assertEqual([os.path.basename(s) for s in log.segments()], ['00000003.jsonl', '00000004.jsonl', '00000005.jsonl'])
+        self.assertEqual([v for _, v in log.versions()], versions[3:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import tempfile
+import shutil
+import os
+from omr.steps.algorithmtypes import AlgorithmTypes
+from omr.steps.predictorcache import PredictorCache
+from database.model import Model, MetaId
+
+
+class DummyParams:
+    def __init__(self, value: int = 0):
+        self.value = value
+
+    def to_json(self):
+        return '{{"value": {}}}'.format(self.value)
+
+
+class DummySettings:
+    def __init__(self, model: Model, params: DummyParams):
+        self.model = model
+        self.params = params
+
+
+class DummyPredictor:
+    def __init__(self, settings: DummySettings):
+        self.settings = settings
+
+
+class DummyMeta:
+    n_created = 0
+
+    @staticmethod
+    def type() -> AlgorithmTypes:
+        return AlgorithmTypes.SYMBOLS_PC
+
+    @classmethod
+    def create_predictor(cls, settings: DummySettings) -> DummyPredictor:
+        cls.n_created += 1
+        return DummyPredictor(settings)
+
+
+class TestPredictorCache(unittest.TestCase):
+    def setUp(self):
+        DummyMeta.n_created = 0
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model = Model(MetaId.from_custom_path(os.path.join(self.tmp_dir, 'model'), AlgorithmTypes.SYMBOLS_PC))
+        self.model.save_meta()
+        with open(self.model.local_file('model.h5'), 'w') as f:
+            f.write('weights')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reuse(self):
+        cache = PredictorCache(max_entries=2, max_memory_mb=0)
+        p1 = cache.get(DummyMeta, DummySettings(self.model, DummyParams()))
+        p2 = cache.get(DummyMeta, DummySettings(self.model, DummyParams()))
+        self.assertIs(p1, p2)
+        self.assertEqual(DummyMeta.n_created, 1)
+
+        p3 = cache.get(DummyMeta, DummySettings(self.model, DummyParams(1)))
+        self.assertIsNot(p1, p3)
+        self.assertEqual(DummyMeta.n_created, 2)
+
+    def test_evict_by_count(self):
+        cache = PredictorCache(max_entries=2, max_memory_mb=0)
+        for i in range(3):
+            cache.get(DummyMeta, DummySettings(self.model, DummyParams(i)))
+        self.assertEqual(len(cache.entries), 2)
+
+        # least recently used entry was evicted
+        cache.get(DummyMeta, DummySettings(self.model, DummyParams(0)))
+        self.assertEqual(DummyMeta.n_created, 4)
+
+    def test_invalidate(self):
+        cache = PredictorCache(max_entries=2, max_memory_mb=0)
+        cache.get(DummyMeta, DummySettings(self.model, DummyParams()))
+        cache.invalidate(self.model.id())
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_model_changed(self):
+        cache = PredictorCache(max_entries=2, max_memory_mb=0)
+        p1 = cache.get(DummyMeta, DummySettings(self.model, DummyParams()))
+        stat = os.stat(self.model.local_file('model.h5'))
+        os.utime(self.model.local_file('model.h5'), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        p2 = cache.get(DummyMeta, DummySettings(self.model, DummyParams()))
+        self.assertIsNot(p1, p2)
+
+        self.model.delete()
+        p3 = cache.get(DummyMeta, DummySettings(self.model, DummyParams()))
+        self.assertIsNot(p2, p3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ from django.http import FileResponse
 from django.test import Client
 from django.urls import reverse
 import ommr4all.settings as settings
+from tests import storage_copy
 from rest_framework import status
 from rest_framework.test import APITestCase
 import time
@@ -24,7 +25,7 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(name)-12s %(level
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Change database to test storage
-settings.PRIVATE_MEDIA_ROOT = os.path.join(BASE_DIR, 'tests', 'storage')
+settings.PRIVATE_MEDIA_ROOT = storage_copy()
 
 
 class GenericTests(APITestCase):
@@ -97,6 +98,39 @@ class OperationTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK, response)
         self.unlock_page(page)
 
+    def test_patch_page(self):
+        page = 'page_test_lock'
+
+        def patch(ops):
+            return self.client.patch('/api/book/demo/page/{}/content/pcgts'.format(page), ops, format='json')
+
+        self.lock_page(page)
+        served = self.client.get('/api/book/demo/page/{}/content/pcgts'.format(page), format='json').data
+        creator = served['meta']['creator']
+        patched = '{} (patched)'.format(creator)
+        # patches refer to the served page
+        ops = [{'op': 'test', 'path': '/meta/creator', 'value': creator},
+               {'op': 'test', 'path': '/page/imageWidth', 'value': served['page']['imageWidth']},
+               {'op': 'replace', 'path': '/meta/creator', 'value': patched}]
+        response = patch(ops)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response)
+        self.assertEqual(DatabaseBook('demo').page(page).pcgts().meta.creator, patched)
+
+        # the patch of the client is stored in the backup log, after the snapshot of the first save
+        from database.database_page_pcgts_backup import PcGtsBackupLog
+        ops = [{'op': 'replace', 'path': '/meta/creator', 'value': creator}]
+        response = patch(ops)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response)
+        with open(PcGtsBackupLog(DatabaseBook('demo').page(page)).segments()[-1]) as f:
+            self.assertEqual(json.loads(f.readlines()[-1])['patch'], ops)
+
+        # the patch was created for the previous version
+        response = patch([{'op': 'test', 'path': '/meta/creator', 'value': patched}])
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT, response)
+        response = patch([{'op': 'remove', 'path': '/unknown'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response)
+        self.unlock_page(page)
+
     def test_save_statistics_without_lock(self):
         page = 'page_test_lock'
 
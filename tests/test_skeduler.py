@@ -9,7 +9,9 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(name)-12s %(level
 
 from restapi.operationworker.taskresources import TaskResource
 from restapi.operationworker.operationworker import OperationWorker, Resources
-from restapi.operationworker.task import TaskStatusCodes, TaskNotFoundException
+from restapi.operationworker.task import TaskStatusCodes, TaskStatus, TaskNotFoundException, TaskAlreadyQueuedException
+from restapi.operationworker.taskqueue import TaskQueue
+from restapi.operationworker.taskstore import MemoryTaskStore
 from restapi.operationworker.taskrunners.taskrunner import TaskRunner
 from restapi.operationworker.taskworkergroup import TaskWorkerGroup
 
@@ -31,7 +33,30 @@ class SleepyTaskRunner(TaskRunner):
         return {}
 
 
+class ShardedSleepyTaskRunner(SleepyTaskRunner):
+    def max_shards(self) -> int:
+        return 10
+
+    def merge_shard_results(self, results: List[dict]) -> dict:
+        return {'results': [r for shard_results in results for r in shard_results['results']]}
+
+    def run(self, task, com_queue) -> dict:
+        time.sleep(self.time_s)
+        return {'results': [task.shard.index]}
+
+
+class DiscardedSleepyTaskRunner(SleepyTaskRunner):
+    def keep_result(self) -> bool:
+        return False
+
+
 class TestSkeduler(unittest.TestCase):
+    def test_merge_shard_results(self):
+        runner = SleepyTaskRunner([TaskWorkerGroup.SHORT_TASKS_CPU], 0)
+        self.assertEqual(runner.merge_shard_results([{'a': 1}]), {'a': 1})
+        with self.assertRaises(NotImplementedError):
+            runner.merge_shard_results([{}, {}])
+
     def test_skeduler(self):
         user = None
         default_resources: Resources = Resources([
@@ -41,7 +66,7 @@ class TestSkeduler(unittest.TestCase):
                     [TaskWorkerGroup.NORMAL_TASKS_CPU] * 5 +
                     [TaskWorkerGroup.SHORT_TASKS_CPU] * 3)
         ])
-        worker = OperationWorker(resources=default_resources, watcher_interval=1)
+        worker = OperationWorker(resources=default_resources, watcher_interval=1, store=MemoryTaskStore())
 
         full_gpu_tasks = [SleepyTaskRunner([TaskWorkerGroup.LONG_TASKS_GPU], 8) for i in range(3)]
         full_gpu_task_ids = [worker.put(task, user) for task in full_gpu_tasks]
@@ -89,6 +114,44 @@ class TestSkeduler(unittest.TestCase):
         time.sleep(10)
         self.assertEqual(0, worker.resources.n_used())
 
+    def test_shards(self):
+        resources = Resources([TaskResource(TaskWorkerGroup.NORMAL_TASKS_CPU) for _ in range(3)])
+        worker = OperationWorker(resources=resources, watcher_interval=0, store=MemoryTaskStore())
+        task_id = worker.put(ShardedSleepyTaskRunner([TaskWorkerGroup.NORMAL_TASKS_CPU], 1), None)
+        time.sleep(0.5)
+        self.assertEqual(3, worker.resources.n_used())
+        self.assertEqual(worker.status(task_id).code, TaskStatusCodes.RUNNING)
+
+        time.sleep(2)
+        self.assertEqual(0, worker.resources.n_used())
+        self.assertEqual(worker.status(task_id).code, TaskStatusCodes.FINISHED)
+        self.assertEqual(worker.pop_result(task_id), {'results': [0, 1, 2]})
+
+    def test_queue(self):
+        queue = TaskQueue()
+        cpu_task = SleepyTaskRunner([TaskWorkerGroup.LONG_TASKS_CPU], 0)
+        gpu_task = SleepyTaskRunner([TaskWorkerGroup.LONG_TASKS_GPU, TaskWorkerGroup.LONG_TASKS_CPU], 0)
+        queue.put('cpu', cpu_task, None)
+        queue.put('gpu', gpu_task, None)
+        with self.assertRaises(TaskAlreadyQueuedException):
+            queue.put('other', gpu_task, None)
+
+        self.assertEqual(queue.id_by_runner(gpu_task), 'gpu')
+        self.assertEqual(queue.next_queued([TaskWorkerGroup.LONG_TASKS_GPU]).task_id, 'gpu')
+        # oldest task first
+        self.assertEqual(queue.next_queued([TaskWorkerGroup.LONG_TASKS_GPU, TaskWorkerGroup.LONG_TASKS_CPU]).task_id, 'cpu')
+
+        queue.remove('cpu')
+        self.assertEqual(queue.next_queued([TaskWorkerGroup.LONG_TASKS_CPU]).task_id, 'gpu')
+        self.assertIsNone(queue.next_queued([TaskWorkerGroup.SHORT_TASKS_CPU]))
+
+        # tasks without requested result are removed once finished
+        queue.put('discarded', DiscardedSleepyTaskRunner([TaskWorkerGroup.SHORT_TASKS_CPU], 0), None)
+        self.assertEqual([t.task_id for t in queue.list_active()], ['gpu', 'discarded'])
+        queue.update_status('discarded', TaskStatus(TaskStatusCodes.FINISHED), {})
+        with self.assertRaises(TaskNotFoundException):
+            queue.status_of_task('discarded')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from types import SimpleNamespace
+import cv2
+import numpy as np
+
+from omr.imageoperations.music_line_operations import SymbolLabel
+from omr.steps.symboldetection.pixelclassifier.predictor import PCPredictor, component_labels
+
+
+class StubModel:
+    # logits of each pixel depend on its neighbourhood, the borders are zero padded like 'same' convolutions
+    name = 'fcn'
+
+    def __init__(self):
+        self.batch_shapes = []
+
+    def predict_on_batch(self, inputs):
+        from scipy.ndimage import uniform_filter
+        images, binaries = inputs
+        self.batch_shapes.append(images.shape)
+        weights = np.arange(len(SymbolLabel), dtype=np.float32)
+        features = images[..., :1].astype(np.float32) * weights + binaries[..., :1].astype(np.float32) * weights[::-1]
+        return uniform_filter(features, size=(1, 7, 7, 1), mode='constant')
+
+
+class TestSymbolPredictor(unittest.TestCase):
+    def test_component_labels(self):
+        rng = np.random.RandomState(0)
+        probs = rng.rand(40, 300, len(SymbolLabel))
+        p = (np.argmax(probs[:, :, 1:], axis=-1) + 1) * (probs[:, :, 0] < 0.5)
+        n_labels, cc, stats, centroids = cv2.connectedComponentsWithStats(p.astype(np.uint8))
+        self.assertGreater(n_labels, 10)
+
+        labels = component_labels(cc, p, n_labels)
+        for i in range(1, n_labels):
+            # label with the highest frequency of the connected component, computed per component
+            x, y, w, h = (stats[i, s] for s in [cv2.CC_STAT_LEFT, cv2.CC_STAT_TOP, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT])
+            area = p[y:y+h, x:x+w] * (cc[y:y+h, x:x+w] == i)
+            expected = int(np.argmax([np.sum(area == v + 1) for v in range(len(SymbolLabel) - 1)])) + 1
+            self.assertEqual(labels[i], expected)
+
+    def test_predict_batched(self):
+        predictor = PCPredictor.__new__(PCPredictor)
+        model = StubModel()
+        predictor.predictor = SimpleNamespace(network=SimpleNamespace(model=model))
+
+        rng = np.random.RandomState(0)
+        data = [SimpleNamespace(image=rng.randint(0, 255, (120, w), dtype=np.uint8),
+                                binary=rng.randint(0, 2, (120, w), dtype=np.uint8))
+                for w in [300, 120, 300, 310, 120, 300]]
+
+        # each line on its own
+        single = list(predictor._predict_batched(data, 1))
+        self.assertEqual(len(model.batch_shapes), len(data))
+
+        model.batch_shapes.clear()
+        batched = list(predictor._predict_batched(data, 2))
+        # only lines of the same shape are batched, none is padded
+        self.assertEqual([s[:3] for s in model.batch_shapes], [(2, 120, 300), (2, 120, 120), (1, 120, 310), (1, 120, 300)])
+
+        self.assertEqual(len(batched), len(data))
+        for d, s, b in zip(data, single, batched):
+            self.assertIs(b.data, d)
+            self.assertEqual(b.labels.shape, d.image.shape)
+            self.assertEqual(b.probabilities.shape, d.image.shape + (len(SymbolLabel),))
+            np.testing.assert_array_equal(b.labels, s.labels)
+            np.testing.assert_array_equal(b.probabilities, s.probabilities)
+
+
+if __name__ == '__main__':
+    unittest.main()
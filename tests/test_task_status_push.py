@@ -0,0 +1,167 @@
+import unittest
+import tempfile
+import shutil
+import time
+import os
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework_jwt.settings import api_settings
+
+import ommr4all.settings as settings
+from tests import storage_copy
+from restapi.consumers import TaskStatusConsumer
+from restapi.operationworker import operation_worker
+from restapi.operationworker.task import TaskStatus, TaskStatusCodes, TaskProgressCodes
+from restapi.operationworker.taskstatuspublisher import TaskStatusPublisher, TaskStatusPoller
+from restapi.operationworker.taskqueue import TaskQueue
+from restapi.operationworker.taskstore import SQLiteTaskStore
+from restapi.operationworker.taskrunners.taskrunner import TaskRunner
+from restapi.operationworker.taskrunners.pageselection import PageSelection, PageCount
+from database import DatabaseBook
+
+# the migrations of the test database change the books
+settings.PRIVATE_MEDIA_ROOT = storage_copy()
+
+
+class BookTaskRunner(TaskRunner):
+    # never dispatched since it has no task group
+    def __init__(self, book: str):
+        super().__init__(None, PageSelection(DatabaseBook(book), PageCount.ALL), [])
+
+    def identifier(self):
+        return self.selection.book.book,
+
+    def algorithm_meta(self):
+        return None
+
+    def run(self, task, com_queue) -> dict:
+        return {}
+
+
+class RecordingPublisher(TaskStatusPublisher):
+    def __init__(self, interval):
+        super().__init__(interval)
+        self.sent = []
+
+    def send(self, updates):
+        self.sent += [(u.task_id, u.status) for u in updates]
+
+
+class TestTaskStatusPublisher(unittest.TestCase):
+    def test_coalesce(self):
+        publisher = RecordingPublisher(0.5)
+        publisher.publish('task', None, TaskStatus(TaskStatusCodes.RUNNING, TaskProgressCodes.WORKING, progress=0))
+        time.sleep(0.1)
+        for i in range(1, 10):
+            publisher.publish('task', None, TaskStatus(TaskStatusCodes.RUNNING, TaskProgressCodes.WORKING, progress=i))
+        time.sleep(0.1)
+        # only the first update, the others are pending
+        self.assertEqual([s.progress for _, s in publisher.sent], [0])
+
+        # the latest update once the interval passed
+        time.sleep(0.5)
+        self.assertEqual([s.progress for _, s in publisher.sent], [0, 9])
+
+        # final states are pushed immediately
+        publisher.publish('task', None, TaskStatus(TaskStatusCodes.RUNNING, TaskProgressCodes.WORKING, progress=10))
+        publisher.publish('task', None, TaskStatus(TaskStatusCodes.FINISHED))
+        time.sleep(0.1)
+        self.assertEqual([s.code for _, s in publisher.sent][-1], TaskStatusCodes.FINISHED)
+        self.assertEqual(len(publisher.sent), 3)
+        self.assertEqual(publisher.last, {})
+
+
+class TestTaskStatusPoller(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(self.tmp_dir, 'tasks.sqlite3')
+        # queue of the dispatcher and of another process with consumers
+        self.dispatcher = TaskQueue(SQLiteTaskStore(path, 0.1))
+        self.published = []
+        publisher = TaskStatusPublisher(0.5)
+        publisher.publish = lambda task_id, book, status: self.published.append((task_id, book, status.code))
+        self.poller = TaskStatusPoller(TaskQueue(SQLiteTaskStore(path, 0.1)), publisher, 0.1, lambda: False)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_poll(self):
+        self.poller.poll()
+        self.dispatcher.put('task', BookTaskRunner('demo'), None)
+        self.dispatcher.put('other', BookTaskRunner('other_book'), None)
+        self.poller.poll()
+        self.assertEqual(sorted(self.published), [('other', 'other_book', TaskStatusCodes.QUEUED), ('task', 'demo', TaskStatusCodes.QUEUED)])
+
+        # only changes are published
+        self.published.clear()
+        self.dispatcher.start('task')
+        self.poller.poll()
+        self.assertEqual(self.published, [('task', 'demo', TaskStatusCodes.RUNNING)])
+
+        # stopped tasks are not found, finished ones once
+        self.published.clear()
+        self.dispatcher.stop('other')
+        self.dispatcher.update_status('task', TaskStatus(TaskStatusCodes.FINISHED), {})
+        self.poller.poll()
+        self.dispatcher.pop_result('task')
+        self.poller.poll()
+        self.assertEqual(sorted(self.published), [('other', 'other_book', TaskStatusCodes.NOT_FOUND), ('task', 'demo', TaskStatusCodes.FINISHED)])
+
+        # the dispatcher publishes its tasks itself
+        self.published.clear()
+        self.poller.is_dispatcher = lambda: True
+        self.dispatcher.put('task', BookTaskRunner('demo'), None)
+        self.poller.poll()
+        self.assertEqual(self.published, [])
+
+
+class TestTaskStatusConsumer(TestCase):
+    def setUp(self):
+        user = User.objects.create_superuser(username='user', email='user@mail.com', password='user')
+        self.token = api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(user))
+
+    def test_subscribe(self):
+        async def run():
+            communicator = WebsocketCommunicator(TaskStatusConsumer.as_asgi(), '/api/tasks/status?token={}'.format(self.token))
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+
+            # the current states of the tasks of the book once subscribed
+            await communicator.send_json_to({'subscribe': {'book': 'demo'}})
+            message = await communicator.receive_json_from()
+            self.assertEqual((message['task'], message['status']['code']), ('queued', TaskStatusCodes.QUEUED))
+            await communicator.send_json_to({'subscribe': {'book': 'invalid/book'}})
+            self.assertIn('error', await communicator.receive_json_from())
+
+            # pushed by the thread of the publisher
+            operation_worker.publisher.publish('task', 'demo', TaskStatus(TaskStatusCodes.RUNNING))
+            operation_worker.publisher.publish('other', 'other_book', TaskStatus(TaskStatusCodes.RUNNING))
+            message = await communicator.receive_json_from(timeout=2)
+            self.assertEqual(message['task'], 'task')
+            self.assertEqual(message['status']['code'], TaskStatusCodes.RUNNING)
+            self.assertTrue(await communicator.receive_nothing())
+
+            # unknown tasks can not be subscribed, since their permissions can not be checked
+            await communicator.send_json_to({'subscribe': {'task': 'unknown'}})
+            self.assertIn('error', await communicator.receive_json_from())
+
+            await communicator.send_json_to({'unsubscribe': {'book': 'demo'}})
+            await communicator.send_json_to({'subscribe': {'task': 'queued'}})
+            message = await communicator.receive_json_from(timeout=2)
+            self.assertEqual((message['task'], message['status']['code']), ('queued', TaskStatusCodes.QUEUED))
+            operation_worker.publisher.publish('queued', 'demo', TaskStatus(TaskStatusCodes.FINISHED))
+            message = await communicator.receive_json_from(timeout=2)
+            self.assertEqual((message['task'], message['status']['code']), ('queued', TaskStatusCodes.FINISHED))
+            self.assertTrue(await communicator.receive_nothing())
+            await communicator.disconnect()
+
+        operation_worker.queue.put('queued', BookTaskRunner('demo'), None)
+        self.addCleanup(operation_worker.queue.remove, 'queued')
+
+        async_to_sync(run)()
+
+
+if __name__ == '__main__':
+    unittest.main()
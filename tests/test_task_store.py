@@ -0,0 +1,140 @@
+import unittest
+import tempfile
+import shutil
+import os
+import time
+from multiprocessing import Process, Value
+from typing import List
+
+from restapi.operationworker.taskresources import TaskResource
+from restapi.operationworker.operationworker import OperationWorker, Resources
+from restapi.operationworker.task import TaskStatusCodes, TaskStatus, TaskNotFoundException, TaskAlreadyQueuedException
+from restapi.operationworker.taskqueue import TaskQueue
+from restapi.operationworker.taskstore import MemoryTaskStore, SQLiteTaskStore
+from restapi.operationworker.taskrunners.taskrunner import TaskRunner
+from restapi.operationworker.taskworkergroup import TaskWorkerGroup
+
+
+class NamedTaskRunner(TaskRunner):
+    def __init__(self, task_group: List[TaskWorkerGroup], name: str, time_s: float = 0):
+        super().__init__(None, None, task_group)
+        self.name = name
+        self.time_s = time_s
+
+    def algorithm_meta(self):
+        return None
+
+    def identifier(self):
+        return self.name,
+
+    def run(self, task, com_queue) -> dict:
+        time.sleep(self.time_s)
+        return {'name': self.name}
+
+
+def acquire_dispatcher(path: str, acquired: Value):
+    acquired.value = SQLiteTaskStore(path, 0.1).acquire_dispatcher()
+
+
+class TestTaskStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'tasks.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_queue(self, queue: TaskQueue):
+        cpu = NamedTaskRunner([TaskWorkerGroup.LONG_TASKS_CPU], 'cpu')
+        gpu = NamedTaskRunner([TaskWorkerGroup.LONG_TASKS_GPU, TaskWorkerGroup.LONG_TASKS_CPU], 'gpu')
+        queue.put('cpu', cpu, None)
+        queue.put('gpu', gpu, None)
+        with self.assertRaises(TaskAlreadyQueuedException):
+            queue.put('other', NamedTaskRunner([TaskWorkerGroup.SHORT_TASKS_CPU], 'gpu'), None)
+
+        self.assertEqual(queue.id_by_runner(gpu), 'gpu')
+        self.assertEqual([t.task_id for t in queue.find_active(NamedTaskRunner, repr('gpu'))], ['gpu'])
+        self.assertEqual(queue.find_active(NamedTaskRunner, repr('other')), [])
+        self.assertEqual(queue.next_queued([TaskWorkerGroup.LONG_TASKS_GPU]).task_id, 'gpu')
+        # oldest task first
+        self.assertEqual(queue.next_queued([TaskWorkerGroup.LONG_TASKS_GPU, TaskWorkerGroup.LONG_TASKS_CPU]).task_id, 'cpu')
+
+        self.assertTrue(queue.start('cpu'))
+        self.assertFalse(queue.start('cpu'))
+        self.assertEqual(queue.next_queued([TaskWorkerGroup.LONG_TASKS_CPU]).task_id, 'gpu')
+        self.assertEqual(queue.status().n_in_state[TaskStatusCodes.RUNNING], 1)
+
+        queue.update_status('cpu', TaskStatus(TaskStatusCodes.FINISHED), {'name': 'cpu'})
+        self.assertEqual(queue.pop_result('cpu'), {'name': 'cpu'})
+        with self.assertRaises(TaskNotFoundException):
+            queue.status_of_task('cpu')
+
+        queue.stop('gpu')
+        self.assertEqual(queue.pop_stopped(), ['gpu'])
+        self.assertEqual(queue.list_tasks(), [])
+
+    def test_memory(self):
+        self.check_queue(TaskQueue(MemoryTaskStore()))
+
+    def test_test_runner(self):
+        # the operation worker of the tests never uses the queue of a server
+        from restapi.operationworker import operation_worker
+        self.assertIsInstance(operation_worker.queue.store, MemoryTaskStore)
+
+    def test_sqlite(self):
+        self.check_queue(TaskQueue(SQLiteTaskStore(self.path, 0.1)))
+
+    def test_shared(self):
+        # two stores on the same database, as in two processes of the server
+        a, b = TaskQueue(SQLiteTaskStore(self.path, 0.1)), TaskQueue(SQLiteTaskStore(self.path, 0.1))
+        n_changes = b.changes()
+        a.put('task', NamedTaskRunner([TaskWorkerGroup.SHORT_TASKS_CPU], 'task'), None)
+        self.assertNotEqual(b.wait_for_change(n_changes, 1), n_changes)
+        self.assertEqual(b.status_of_task('task').code, TaskStatusCodes.QUEUED)
+        self.assertEqual(b.list_active()[0].task_runner.name, 'task')
+
+        self.assertTrue(b.start('task'))
+        b.update_status('task', TaskStatus(TaskStatusCodes.RUNNING, progress=0.5))
+        self.assertEqual(a.status_of_task('task').progress, 0.5)
+
+        # further progress is written once flushed by the dispatcher
+        b.update_status('task', TaskStatus(TaskStatusCodes.RUNNING, progress=0.7))
+        self.assertEqual(b.status_of_task('task').progress, 0.7)
+        self.assertEqual(a.status_of_task('task').progress, 0.5)
+        b.wait_for_change(b.changes(), 0)
+        self.assertEqual(a.status_of_task('task').progress, 0.7)
+
+        # a new dispatcher restarts the tasks of the previous one
+        a.requeue_running()
+        self.assertEqual(b.status_of_task('task').code, TaskStatusCodes.QUEUED)
+
+    def test_dispatcher(self):
+        store = SQLiteTaskStore(self.path, 0.1)
+        self.assertTrue(store.acquire_dispatcher())
+        acquired = Value('b', True)
+        p = Process(target=acquire_dispatcher, args=(self.path, acquired))
+        p.start()
+        p.join()
+        self.assertFalse(acquired.value)
+        self.assertTrue(store.acquire_dispatcher())
+
+    def test_operation_worker(self):
+        resources = Resources([TaskResource(TaskWorkerGroup.SHORT_TASKS_CPU)])
+        worker = OperationWorker(resources=resources, watcher_interval=0, store=SQLiteTaskStore(self.path, 0.1))
+        task_id = worker.put(NamedTaskRunner([TaskWorkerGroup.SHORT_TASKS_CPU], 'task', 0.5), None)
+        queued_id = worker.put(NamedTaskRunner([TaskWorkerGroup.SHORT_TASKS_CPU], 'queued', 0.5), None)
+        time.sleep(0.3)
+        self.assertEqual(worker.status(task_id).code, TaskStatusCodes.RUNNING)
+        self.assertEqual(worker.status(queued_id).code, TaskStatusCodes.QUEUED)
+
+        # stopped by another process
+        TaskQueue(SQLiteTaskStore(self.path, 0.1)).stop(task_id)
+        time.sleep(0.5)
+        self.assertEqual(worker.status(queued_id).code, TaskStatusCodes.RUNNING)
+        time.sleep(1)
+        self.assertEqual(worker.pop_result(queued_id), {'name': 'queued'})
+        self.assertEqual(0, worker.resources.n_used())
+
+
+if __name__ == '__main__':
+    unittest.main()
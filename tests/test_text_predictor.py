@@ -0,0 +1,95 @@
+import unittest
+import tempfile
+import shutil
+import os
+from types import SimpleNamespace
+
+import ommr4all.settings as settings
+from database import DatabaseBook
+from database.file_formats import PcGts
+from database.file_formats.pcgts.page import Annotations
+from omr.dataset import DatasetParams
+from omr.steps.algorithm import PredictionCallback
+from omr.steps.text.predictor import TextPredictor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LinePredictor(TextPredictor):
+    # yields two lines of each page that has lines and records which lines were requested
+    @staticmethod
+    def meta():
+        return None
+
+    def __init__(self, pages_with_lines):
+        self.dataset_params = DatasetParams()
+        self.pages_with_lines = pages_with_lines
+        self.requested = []
+
+    def _predict(self, dataset, callback=None):
+        for i, pcgts in enumerate(dataset.files):
+            if i not in self.pages_with_lines:
+                continue
+            for j in range(2):
+                self.requested.append((i, j))
+                yield SimpleNamespace(line=SimpleNamespace(operation=SimpleNamespace(pcgts=pcgts)), index=(i, j))
+
+
+class Callback(PredictionCallback):
+    def __init__(self):
+        super().__init__()
+        self.processed = []
+
+    def progress_updated(self, percentage: float, n_pages: int = 0, n_processed_pages: int = 0):
+        self.processed.append(n_processed_pages)
+
+
+class TestTextPredictor(unittest.TestCase):
+    def test_streaming(self):
+        pages = DatabaseBook('demo').pages()[:4]
+        predictor = LinePredictor([0, 2])
+        callback = Callback()
+        results = predictor.predict(pages, callback)
+
+        # the first page is finished once the first line of the third page is predicted
+        first = next(results)
+        self.assertIs(first.pcgts, pages[0].pcgts())
+        self.assertEqual([l.index for l in first.text_lines], [(0, 0), (0, 1)])
+        self.assertEqual(predictor.requested, [(0, 0), (0, 1), (2, 0)])
+
+        rest = list(results)
+        self.assertEqual([r.pcgts for r in rest], [p.pcgts() for p in pages[1:]])
+        self.assertEqual([len(r.text_lines) for r in rest], [0, 2, 0])
+        self.assertEqual(callback.processed, [1, 2, 3, 4])
+
+
+class TestSyllablePredictionResult(unittest.TestCase):
+    def setUp(self):
+        self.media_root = settings.PRIVATE_MEDIA_ROOT
+        self.tmp_dir = tempfile.mkdtemp()
+        settings.PRIVATE_MEDIA_ROOT = self.tmp_dir
+        shutil.copytree(os.path.join(BASE_DIR, 'tests', 'storage', 'demo', 'pages', 'page_test_syllable_detection_001'),
+                        os.path.join(self.tmp_dir, 'book', 'pages', 'page'))
+        self.page = DatabaseBook('book').page('page')
+
+    def tearDown(self):
+        settings.PRIVATE_MEDIA_ROOT = self.media_root
+        shutil.rmtree(self.tmp_dir)
+
+    def test_store_to_page(self):
+        from omr.steps.syllables.predictor import PredictionResult, PageMatchResult
+        pcgts = self.page.pcgts()
+        stored = pcgts.page.annotations.to_json()
+        self.assertGreater(len(stored['connections']), 0)
+
+        # e.g. the predicted annotations of a single connection
+        annotations = Annotations(pcgts.page, pcgts.page.annotations.connections[:1])
+        PredictionResult(annotations, PageMatchResult([], None, pcgts)).store_to_page()
+
+        saved = PcGts.from_file(self.page.file('pcgts'))
+        self.assertEqual(saved.page.annotations.to_json(), annotations.to_json())
+        self.assertEqual(len(saved.page.annotations.connections), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+if __name__ == '__main__':
+    import django
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'ommr4all.settings'
+    django.setup()
+
+from argparse import ArgumentParser
+from typing import List
+from prettytable import PrettyTable
+import numpy as np
+import timeit
+import json
+
+from database import DatabaseBook
+from database.file_formats.pcgts import PcGts, Coords
+
+
+# reference implementations of the point by point versions of Coords
+def from_string_iterative(s: str) -> Coords:
+    if len(s) == 0:
+        return Coords()
+
+    return Coords(np.array([list(map(float, p.split(','))) for p in s.split(" ")]))
+
+
+def to_string_iterative(c: Coords) -> str:
+    return " ".join(",".join(map(str, c.points[i])) for i in range(c.points.shape[0]))
+
+
+def aabb_iterative(c: Coords):
+    tl = c.points[0]
+    br = c.points[0]
+    for p in c.points[1:]:
+        tl = np.min([tl, p], axis=0)
+        br = np.max([br, p], axis=0)
+    return tl, br
+
+
+def rotate_iterative(c: Coords, degree, origin) -> np.ndarray:
+    def rotate_point(xy, radians, origin=(0, 0)):
+        x, y = xy
+        offset_x, offset_y = origin
+        adjusted_x, adjusted_y = (x - offset_x), (y - offset_y)
+        cos_rad, sin_rad = np.cos(radians), np.sin(radians)
+        qx = offset_x + cos_rad * adjusted_x + sin_rad * adjusted_y
+        qy = offset_y + -sin_rad * adjusted_x + cos_rad * adjusted_y
+
+        return qx, qy
+
+    return np.array([rotate_point(p, degree / 180 * np.pi, origin) for p in c.points])
+
+
+def coords_strings(j) -> List[str]:
+    # all polylines of a pcgts json
+    if isinstance(j, dict):
+        return sum([[v] if k == 'coords' and isinstance(v, str) else coords_strings(v) for k, v in j.items()], [])
+    elif isinstance(j, list):
+        return sum(map(coords_strings, j), [])
+    return []
+
+
+def synthetic_page(seed: int = 0) -> List[str]:
+    # polylines of a dense page: 12 staves of 4 lines with 200 points each, 300 symbol and 40 region polygons
+    rng = np.random.RandomState(seed)
+    lines = [rng.uniform(0, 1, (200, 2)) for _ in range(12 * 4)] + [rng.uniform(0, 1, (12, 2)) for _ in range(340)]
+    return [Coords(np.round(l, 8)).to_string() for l in lines]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--books", nargs="+", default=[], help="Books to take the pages from, synthetic pages if empty")
+    parser.add_argument("--n-pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.books:
+        page_jsons = [p.pcgts().to_json() for b in args.books for p in DatabaseBook(b).pages()][:args.n_pages]
+        pages = [coords_strings(j) for j in page_jsons]
+    else:
+        page_jsons = []
+        pages = [synthetic_page(i) for i in range(args.n_pages)]
+
+    print('Benchmarking {} pages with {} polylines'.format(len(pages), sum(map(len, pages))))
+    coords = [[Coords.from_string(s) for s in page if len(s) > 0] for page in pages]
+
+    # both implementations yield identical results
+    for page, page_coords in zip(pages, coords):
+        for s, c in zip([s for s in page if len(s) > 0], page_coords):
+            assert(np.array_equal(from_string_iterative(s).points, c.points))
+            assert(to_string_iterative(c) == c.to_string())
+            tl, br = aabb_iterative(c)
+            aabb = c.aabb()
+            assert(np.array_equal(tl, aabb.origin.p) and np.array_equal(br - tl, aabb.size.p))
+            rotated = Coords(c.points)
+            rotated.rotate(3, (0.5, 0.5))
+            assert(np.array_equal(rotate_iterative(c, 3, (0.5, 0.5)), rotated.points))
+
+    def run(f):
+        return 1000 * min(timeit.repeat(f, number=1, repeat=args.repeat)) / max(1, len(pages))
+
+    def rotate(c: Coords):
+        Coords(c.points).rotate(3, (0.5, 0.5))
+
+    all_strings = [s for page in pages for s in page]
+    all_coords = [c for page in coords for c in page]
+    benchmarks = [
+        ('from_string', lambda: [from_string_iterative(s) for s in all_strings], lambda: [Coords.from_string(s) for s in all_strings]),
+        ('to_string', lambda: [to_string_iterative(c) for c in all_coords], lambda: [c.to_string() for c in all_coords]),
+        ('aabb', lambda: [aabb_iterative(c) for c in all_coords], lambda: [c.aabb() for c in all_coords]),
+        ('rotate', lambda: [rotate_iterative(c, 3, (0.5, 0.5)) for c in all_coords], lambda: [rotate(c) for c in all_coords]),
+        ('scale', None, lambda: [c.scale(2.5) for c in all_coords]),
+        ('interpolate_y', None, lambda: [c.interpolate_y(np.linspace(0, 1, 100)) for c in all_coords]),
+    ]
+
+    pt = PrettyTable(['Operation', 'Iterative per page [ms]', 'Vectorized per page [ms]', 'Speedup'])
+    for name, iterative, vectorized in benchmarks:
+        t_vectorized = run(vectorized)
+        if iterative:
+            t_iterative = run(iterative)
+            pt.add_row([name, t_iterative, t_vectorized, t_iterative / t_vectorized])
+        else:
+            pt.add_row([name, '-', t_vectorized, '-'])
+
+    if page_jsons:
+        # loading and storing of complete pages
+        dumps = [json.dumps(j) for j in page_jsons]
+        pcgts = [PcGts.from_json(j, None) for j in page_jsons]
+        pt.add_row(['PcGts.from_json', '-', run(lambda: [PcGts.from_json(json.loads(d), None) for d in dumps]), '-'])
+        pt.add_row(['PcGts.to_json', '-', run(lambda: [p.to_json() for p in pcgts]), '-'])
+
+    print(pt)
@@ -0,0 +1,77 @@
+import os
+if __name__ == '__main__':
+    import django
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'ommr4all.settings'
+    django.setup()
+
+from argparse import ArgumentParser
+from typing import List, Tuple
+from prettytable import PrettyTable
+import numpy as np
+import timeit
+
+from database import DatabaseBook
+from database.file_formats.pcgts import Coords, PageScaleReference
+from omr.dewarping.dummy_dewarper import griddify, shape_to_rect, transform_grid, transform_grid_iterative, \
+    grid_to_mesh, grid_to_mesh_iterative
+
+Staves = List[List[Coords]]
+
+
+def staves_of_books(books: List[str], n_pages: int) -> List[Tuple[Tuple[int, int], Staves]]:
+    out = []
+    for book in books:
+        for page in DatabaseBook(book).pages():
+            pcgts = page.pcgts()
+            ref = PageScaleReference.NORMALIZED_X2
+            staves = [[pcgts.page.page_to_image_scale(sl.coords, ref) for sl in ml.staff_lines.sorted()]
+                      for ml in pcgts.page.all_music_lines()]
+            if len(staves) > 0:
+                out.append((page.image_size(ref.file('gray')), staves))
+            if len(out) >= n_pages:
+                return out
+    return out
+
+
+def synthetic_staves(n_pages: int, seed: int = 0) -> List[Tuple[Tuple[int, int], Staves]]:
+    # pages of the size of a normalized x2 page with 10 slightly curved staves of 4 lines
+    rng = np.random.RandomState(seed)
+    out = []
+    for _ in range(n_pages):
+        shape = (2400, 3400)
+        xs = np.linspace(100, shape[0] - 100, 20)
+        staves = [[Coords(np.stack([xs, 200 + 300 * s + 20 * l + 10 * np.sin(xs / 400 + s) + rng.normal(0, 1, len(xs))], axis=-1))
+                   for l in range(4)] for s in range(10)]
+        out.append((shape, staves))
+    return out
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--books", nargs="+", default=[], help="Books to take the staves from, synthetic pages if empty")
+    parser.add_argument("--n-pages", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+
+    pages = staves_of_books(args.books, args.n_pages) if args.books else synthetic_staves(args.n_pages)
+    print('Benchmarking {} pages'.format(len(pages)))
+
+    def run(transform, mesh):
+        for shape, staves in pages:
+            dst_grid = griddify(shape_to_rect(shape), 10, 30)
+            mesh(transform(dst_grid, staves, shape), dst_grid)
+
+    for shape, staves in pages:
+        dst_grid = griddify(shape_to_rect(shape), 10, 30)
+        src_grid = transform_grid(dst_grid, staves, shape)
+        assert(np.array_equal(src_grid, transform_grid_iterative(dst_grid, staves, shape)))
+        assert(grid_to_mesh(src_grid, dst_grid) == grid_to_mesh_iterative(src_grid, dst_grid))
+
+    t_iterative = min(timeit.repeat(lambda: run(transform_grid_iterative, grid_to_mesh_iterative), number=1, repeat=args.repeat))
+    t_vectorized = min(timeit.repeat(lambda: run(transform_grid, grid_to_mesh), number=1, repeat=args.repeat))
+
+    pt = PrettyTable(['Dewarper', 'Time per page [ms]', 'Speedup'])
+    pt.add_row(['Iterative', 1000 * t_iterative / len(pages), 1.0])
+    pt.add_row(['Vectorized', 1000 * t_vectorized / len(pages), t_iterative / t_vectorized])
+    print(pt)
@@ -0,0 +1,65 @@
+import os
+if __name__ == '__main__':
+    import django
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'ommr4all.settings'
+    django.setup()
+
+from argparse import ArgumentParser
+from prettytable import PrettyTable
+import tracemalloc
+import time
+
+from database import DatabaseBook
+from omr.dataset import DatasetParams
+from omr.imageoperations import ImageOperationData
+from omr.steps.stafflines.detection.dataset import PCDataset
+from omr.steps.symboldetection.dataset import SymbolDetectionDataset
+from omr.steps.text.dataset import TextDataset
+from omr.dewarping.dummy_dewarper import NoStaffLinesAvailable, NoStaffsAvailable
+
+
+datasets = {
+    'staff_lines': lambda: (PCDataset, DatasetParams()),
+    'symbols': lambda: (SymbolDetectionDataset, DatasetParams(pad=[0, 10, 0, 40], dewarp=False, center=True)),
+    'symbols_dewarped': lambda: (SymbolDetectionDataset, DatasetParams(pad=[0, 10, 0, 40], dewarp=True, center=True)),
+    'text': lambda: (TextDataset, DatasetParams(height=60)),
+}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument("--books", nargs="+", required=True)
+    parser.add_argument("--n-pages", type=int, default=10)
+    parser.add_argument("--datasets", nargs="+", default=list(datasets.keys()), choices=list(datasets.keys()))
+
+    args = parser.parse_args()
+
+    pcgts = [p.pcgts() for b in args.books for p in DatabaseBook(b).pages()][:args.n_pages]
+    print('Benchmarking {} pages'.format(len(pcgts)))
+
+    pt = PrettyTable(['Dataset', 'Lines', 'Time per line [ms]', 'Peak memory per page [MB]', 'Retained per line [MB]'])
+    for name in args.datasets:
+        dataset_cls, params = datasets[name]()
+        dataset = dataset_cls(pcgts, params)
+        n_lines, total_time, peaks, allocated = 0, 0, [], 0
+        for f in pcgts:
+            # apply the operations directly, the dataset cache would skip them
+            data = ImageOperationData([], params.page_scale_reference, page=f.page, pcgts=f)
+            f.page.location.file(dataset.image_ops.page_files()[0], create_if_not_existing=True)
+            tracemalloc.start()
+            start = time.time()
+            try:
+                outputs = dataset.image_ops.apply_single(data)
+            except (NoStaffsAvailable, NoStaffLinesAvailable):
+                outputs = []
+            total_time += time.time() - start
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            n_lines += len(outputs)
+            # bytes of all arrays that are reachable from the outputs, shared arrays are counted once
+            arrays = {id(a): a for o in outputs for a in [i.image for i in o.images] + [o.page_image] if a is not None}
+            allocated += sum(a.nbytes for a in arrays.values() if a.base is None)
+
+        pt.add_row([name, n_lines, 1000 * total_time / max(1, n_lines), max(peaks, default=0) / 2 ** 20, allocated / max(1, n_lines) / 2 ** 20])
+
+    print(pt)